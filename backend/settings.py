@@ -13,6 +13,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -76,11 +77,67 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# Profile chosen with DB_PROFILE:
+#   sqlite        tuned SQLite (WAL, IMMEDIATE transactions, see SQLITE_PRAGMAS) - default
+#   sqlite-plain  SQLite with its stock settings (rollback journal)
+#   postgres      PostgreSQL; DB_POOL=1 uses a psycopg connection pool
+DB_PROFILE = os.getenv("DB_PROFILE", "sqlite")
+
+if DB_PROFILE == "postgres":
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.getenv("DB_NAME", "inventory"),
+            'USER': os.getenv("DB_USER", "inventory"),
+            'PASSWORD': os.getenv("DB_PASSWORD", ""),
+            'HOST': os.getenv("DB_HOST", "localhost"),
+            'PORT': os.getenv("DB_PORT", "5432"),
+            # Keep connections open across requests
+            'CONN_MAX_AGE': int(os.getenv("DB_CONN_MAX_AGE", "60")),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
     }
+    if os.getenv("DB_POOL", "0") == "1":
+        # Pooled connections (psycopg[pool]); incompatible with CONN_MAX_AGE
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': 2,
+            'max_size': int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+        }
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+
+elif DB_PROFILE in ("sqlite", "sqlite-plain"):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.getenv("DB_NAME", BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': int(os.getenv("DB_CONN_MAX_AGE", "60")),
+            'OPTIONS': {},
+            # A file, not shared-cache memory: the concurrency tests need
+            # connections that wait for the write lock instead of failing
+            'TEST': {'NAME': os.getenv("DB_TEST_NAME", BASE_DIR / 'test_db.sqlite3')},
+        }
+    }
+    if DB_PROFILE == "sqlite":
+        # Background senders / import workers write concurrently with
+        # requests: take the write lock up front and wait for it,
+        # instead of failing with "database is locked" on upgrade
+        DATABASES['default']['OPTIONS'].update({
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        })
+
+else:
+    raise ImproperlyConfigured(f"Unknown DB_PROFILE {DB_PROFILE!r}")
+
+# Applied to every new SQLite connection (inventory.apps.tune_sqlite)
+SQLITE_PRAGMAS = {} if DB_PROFILE == "sqlite-plain" else {
+    'journal_mode': 'WAL',          # readers don't block the writer
+    'synchronous': 'NORMAL',        # fsync at checkpoints only (safe with WAL)
+    'busy_timeout': 20000,          # ms to wait for the write lock
+    'cache_size': -64000,           # 64 MB page cache per connection
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
 }
 
 
@@ -127,11 +184,53 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 EMAIL_BACKEND = "django.core.mail.backends.smtp.EmailBackend"
 
-EMAIL_HOST = "smtp.gmail.com"
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
+# Point at `python manage.py smtp_sink` locally:
+# EMAIL_HOST=localhost EMAIL_PORT=1025 EMAIL_USE_TLS=0
+EMAIL_HOST = os.getenv("EMAIL_HOST", "smtp.gmail.com")
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", "587"))
+EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "1") != "0"
+EMAIL_TIMEOUT = 30
 
 EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+
+# Import wizard staging store (uploaded files + parsed frames on disk)
+IMPORT_STAGING_DIR = BASE_DIR / "import_staging"
+IMPORT_STAGING_TTL = 60 * 60                    # seconds
+IMPORT_STAGING_MAX_BYTES = 200 * 1024 * 1024    # whole store
+
+# Background import jobs (in-process thread pool)
+IMPORT_JOB_WORKERS = 2
+IMPORT_JOB_CHUNK_SIZE = 1000
+
+# Notification outbox (sent by a background thread after commit)
+EMAIL_OUTBOX_BATCH_SIZE = 50                    # messages per SMTP connection
+EMAIL_OUTBOX_MAX_ATTEMPTS = 5
+EMAIL_OUTBOX_RETRY_SECONDS = 30                 # doubled after every failure
+
+# Short-lived stock reservations (inventory.reservations)
+STOCK_HOLD_SECONDS = 5 * 60                     # unconfirmed holds go back into stock after this
+
+# Stock ledger checkpoints (python manage.py snapshot_stock)
+STOCK_SNAPSHOT_SETTLE_SECONDS = 60              # entries younger than this wait for the next run
+
+# Valuation report (inventory.valuation), cached per data version
+VALUATION_CACHE_SECONDS = 60 * 60
+
+# Demand forecasts / reorder recommendations (python manage.py forecast_reorder)
+FORECAST_HISTORY_DAYS = 90
+FORECAST_LEAD_TIME_DAYS = 7                     # days between ordering and receiving stock
+FORECAST_COVER_DAYS = 30                        # days of demand one reorder should cover
+FORECAST_SERVICE_LEVEL = 0.95                   # chance of not running out during the lead time
+FORECAST_CHUNK_SIZE = 5000                      # item ids per worker task
+FORECAST_WORKERS = os.cpu_count() or 1          # worker processes
+
+# Issue/receive notifications as one digest per window or per N events
+NOTIFICATION_DIGEST = os.getenv("NOTIFICATION_DIGEST", "0") == "1"
+NOTIFICATION_DIGEST_WINDOW = 15 * 60            # seconds
+NOTIFICATION_DIGEST_MAX_EVENTS = 50
+
+# Issuance modal autocomplete (per-process in-memory index)
+AUTOCOMPLETE_INDEX_TTL = 300                    # seconds between full rebuilds
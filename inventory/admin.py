@@ -1,10 +1,108 @@
 from django.contrib import admin
-from .models import Item, Transaction
+from .models import Item, Transaction, SerialCounter, ImportJob, Category, OutboundEmail, StockHold, StockLedgerEntry
+from .models import ReorderRecommendation
 from .models import Issuance
+from . import reservations
 
 admin.site.register(Item)
 admin.site.register(Transaction)
 @admin.register(Issuance)
 class IssuanceAdmin(admin.ModelAdmin):
     list_display = ('id','item','quantity','issuer','user','receiver','issue_date','receive_date','component_status','received')
-    list_filter = ('issuer','component_status','received')
\ No newline at end of file
+    list_filter = ('issuer','component_status','received')
+
+
+@admin.register(SerialCounter)
+class SerialCounterAdmin(admin.ModelAdmin):
+    """
+    Read-only view of the serial counters; items created here still
+    take their serial from Item.save -> SerialCounter.allocate.
+    """
+    list_display = ('name', 'value')
+    readonly_fields = ('name', 'value')
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(ImportJob)
+class ImportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'filename', 'mode', 'dry_run', 'status', 'total_rows', 'rows_done', 'rows_created', 'rows_failed', 'created_at', 'finished_at')
+    list_filter = ('status', 'mode')
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    """
+    Categories are created from item writes; renaming one here doesn't
+    rename the category text stored on its items.
+    """
+    list_display = ('name',)
+    search_fields = ('name',)
+    readonly_fields = ('name',)
+
+    def has_add_permission(self, request):
+        return False
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ('id', 'subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at')
+    list_filter = ('status',)
+    readonly_fields = ('subject', 'body', 'html_body', 'from_email', 'recipients', 'attempts', 'last_error', 'created_at', 'sent_at')
+
+
+@admin.register(StockHold)
+class StockHoldAdmin(admin.ModelAdmin):
+    """
+    Deleting a hold here releases it, so its stock goes back.
+    """
+    list_display = ('id', 'item', 'quantity', 'reference', 'created_at', 'expires_at')
+    readonly_fields = ('item', 'quantity', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def delete_model(self, request, obj):
+        reservations.release(obj.pk)
+
+    def delete_queryset(self, request, queryset):
+        for pk in queryset.values_list('pk', flat=True):
+            reservations.release(pk)
+
+
+@admin.register(StockLedgerEntry)
+class StockLedgerEntryAdmin(admin.ModelAdmin):
+    """
+    Read-only: the ledger is append-only, so mistakes are fixed with a
+    correction entry (``python manage.py reconcile_stock --fix``).
+    """
+    list_display = ('id', 'item_id', 'delta', 'reason', 'created_at')
+    list_filter = ('reason',)
+    search_fields = ('item__id',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ReorderRecommendation)
+class ReorderRecommendationAdmin(admin.ModelAdmin):
+    """
+    Read-only: ``python manage.py forecast_reorder`` rewrites these; an
+    item's reorder level is changed on the item itself.
+    """
+    list_display = ('item', 'daily_demand', 'demand_std', 'days_observed', 'reorder_level', 'reorder_quantity', 'computed_at')
+    list_select_related = ('item',)
+    search_fields = ('item__name',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
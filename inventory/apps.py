@@ -1,6 +1,43 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_migrate
+
+
+def tune_sqlite(sender, connection, **kwargs):
+    """
+    Apply ``SQLITE_PRAGMAS`` to each new SQLite connection (most pragmas
+    are per-connection; ``journal_mode=WAL`` is stored in the file).
+    """
+    if connection.vendor != 'sqlite':
+        return
+
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', {})
+    if not pragmas:
+        return
+
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def repair_search_index(sender, using, **kwargs):
+    from django.db import connections
+
+    from .search import FTS_TABLE, install_index
+
+    conn = connections[using]
+    # Only once migration 0013 has created the index; this re-adds
+    # triggers dropped when a later migration rebuilt inventory_item
+    if conn.vendor == 'sqlite' and FTS_TABLE not in conn.introspection.table_names():
+        return
+    install_index(conn)
 
 
 class InventoryConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'inventory'
+
+    def ready(self):
+        post_migrate.connect(repair_search_index, sender=self)
+        connection_created.connect(tune_sqlite)
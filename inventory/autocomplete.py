@@ -0,0 +1,514 @@
+"""
+Per-process autocomplete index over in-stock item names.
+
+A prefix trie over the words of each name answers "starts with" queries
+and trigram postings answer substring and typo-tolerant ones, so the
+issuance modal never goes to the database while the user types. Only
+items with stock are indexed; the index is patched from Item signals and
+from ``refresh()`` after queryset-level quantity updates. Every
+``AUTOCOMPLETE_INDEX_TTL`` seconds a background thread builds a fresh
+index to pick up writes made by other processes and swaps it in, while
+requests keep using the old one.
+
+Words used by many items also keep a bitmap of those items, so a
+multi-word query intersects two frequent words with one big-integer
+AND instead of walking either posting set.
+"""
+from collections import Counter, deque
+import logging
+import re
+import threading
+import time
+import unicodedata
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# Rank tiers, best first
+EXACT, NAME_PREFIX, WORD_PREFIX, SUBSTRING, FUZZY = range(5)
+
+# Vocabulary words expanded per query word (fewer for a 1-2 character
+# prefix, which would otherwise match a large share of the vocabulary),
+# and items ranked per query
+WORD_LIMIT = 500
+SHORT_WORD_LIMIT = 32
+CANDIDATE_LIMIT = 100
+FUZZY_MIN_SIMILARITY = 0.3
+
+# Words used by at least this many items also keep a bitmap of them
+DENSE_WORD_ITEMS = 256
+
+
+def index_ttl():
+    return getattr(settings, 'AUTOCOMPLETE_INDEX_TTL', 300)
+
+
+def normalize(text):
+    """
+    Casefold, strip accents and collapse whitespace ("330  Ω" -> "330 ω").
+    """
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return ' '.join(text.casefold().split())
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _bitmap(ids):
+    """
+    Bytes with bit ``pk`` set for each of ``ids``.
+    """
+    bitmap = bytearray((max(ids) >> 3) + 1)
+    for pk in ids:
+        bitmap[pk >> 3] |= 1 << (pk & 7)
+    return bitmap
+
+
+def _bit_ids(mask, limit):
+    """
+    The first ``limit`` set bit positions of integer ``mask``.
+    """
+    if not mask:
+        return []
+    view = np.frombuffer(mask.to_bytes((mask.bit_length() + 7) // 8, 'little'), dtype=np.uint8)
+    # Every nonzero byte holds at least one id: unpack only the first ``limit``
+    offsets = np.flatnonzero(view)[:limit]
+    rows, bits = np.nonzero(np.unpackbits(view[offsets, None], axis=1, bitorder='little'))
+    return (offsets[rows] * 8 + bits)[:limit].tolist()
+
+
+class _Term:
+    """
+    A non-leading query word's matches, prepared for intersecting: the
+    item sets of its frequent words (and, on demand, one bitmap of them)
+    and one merged set for its other words.
+    """
+
+    def __init__(self, index, matched):
+        self.index = index
+        self.dense = [word for word in matched if word in index.bitmaps]
+        self.dense_sets = [index.words[word] for word in self.dense]
+        self.sparse = set().union(*(index.words[word] for word in matched if word not in index.bitmaps))
+        self._mask = None
+
+    @property
+    def mask(self):
+        if self._mask is None:
+            self._mask = 0
+            for word in self.dense:
+                self._mask |= int.from_bytes(self.index.bitmaps[word], 'little')
+        return self._mask
+
+    def within(self, ids):
+        """
+        The items of set ``ids`` that match this word (each ``&`` walks
+        the smaller side).
+        """
+        found = self.sparse & ids
+        for items in self.dense_sets:
+            found |= items & ids
+        return found
+
+    def within_mask(self, mask):
+        """
+        The items of bitmap ``mask`` that match this word, as a bitmap.
+        """
+        found = mask & self.mask
+        if self.sparse:
+            view = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+            extra = [pk for pk in self.sparse if pk >> 3 < len(view) and view[pk >> 3] >> (pk & 7) & 1]
+            if extra:
+                found |= int.from_bytes(_bitmap(extra), 'little')
+        return found
+
+
+class _Node:
+    __slots__ = ('children', 'word')
+
+    def __init__(self):
+        self.children = {}
+        self.word = None
+
+
+class AutocompleteIndex:
+    """
+    Words of every indexed name live in a prefix trie and in trigram
+    postings (both over the distinct-word vocabulary, which is far
+    smaller than the catalog); each word maps to the items using it.
+
+    ``suggest()`` requires every query word to match some word of the
+    name, by prefix, substring or trigram similarity, and ranks items as
+    exact name, name prefix, word prefix, substring, then fuzzy; closer
+    word matches and shorter names first within a tier.
+    """
+
+    def __init__(self):
+        self.root = _Node()
+        # word -> ids of items whose name contains it
+        self.words = {}
+        # trigram -> words containing it
+        self.postings = {}
+        # word -> bitmap of its item ids, for words of DENSE_WORD_ITEMS+ items
+        self.bitmaps = {}
+        # pk -> (name, category, quantity, normalized name, words)
+        self.entries = {}
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, pk, name, category, quantity):
+        with self.lock:
+            self.remove(pk)
+            if quantity <= 0:
+                return
+
+            norm = normalize(name)
+            words = tuple(dict.fromkeys(WORD_RE.findall(norm)))
+            self.entries[pk] = (name, category, quantity, norm, words)
+
+            for word in words:
+                ids = self.words.get(word)
+                if ids is None:
+                    ids = self.words[word] = set()
+                    self._add_word(word)
+                ids.add(pk)
+
+                bitmap = self.bitmaps.get(word)
+                if bitmap is not None:
+                    if pk >> 3 >= len(bitmap):
+                        bitmap.extend(bytes((pk >> 3) + 1 - len(bitmap)))
+                    bitmap[pk >> 3] |= 1 << (pk & 7)
+                elif len(ids) >= DENSE_WORD_ITEMS:
+                    self.bitmaps[word] = _bitmap(ids)
+
+    def remove(self, pk):
+        with self.lock:
+            entry = self.entries.pop(pk, None)
+            if entry is None:
+                return
+
+            for word in entry[4]:
+                ids = self.words[word]
+                ids.discard(pk)
+
+                bitmap = self.bitmaps.get(word)
+                if bitmap is not None:
+                    bitmap[pk >> 3] &= ~(1 << (pk & 7)) & 0xFF
+                    # Half the threshold, so a word near it doesn't flap
+                    if len(ids) < DENSE_WORD_ITEMS // 2:
+                        del self.bitmaps[word]
+
+                if not ids:
+                    del self.words[word]
+                    self._remove_word(word)
+
+    def _add_word(self, word):
+        node = self.root
+        for ch in word:
+            node = node.children.setdefault(ch, _Node())
+        node.word = word
+
+        for tri in trigrams(word):
+            self.postings.setdefault(tri, set()).add(word)
+
+    def _remove_word(self, word):
+        path = [self.root]
+        for ch in word:
+            path.append(path[-1].children[ch])
+        path[-1].word = None
+
+        # Prune branches that no longer lead to any word
+        for parent, ch, node in zip(reversed(path[:-1]), reversed(word), reversed(path[1:])):
+            if node.word or node.children:
+                break
+            del parent.children[ch]
+
+        for tri in trigrams(word):
+            posting = self.postings[tri]
+            posting.discard(word)
+            if not posting:
+                del self.postings[tri]
+
+    def _prefix_words(self, prefix, limit=WORD_LIMIT):
+        """
+        Up to ``limit`` vocabulary words starting with ``prefix``, shortest
+        first.
+        """
+        node = self.root
+        for ch in prefix:
+            node = node.children.get(ch)
+            if node is None:
+                return []
+
+        found = []
+        queue = deque([node])
+        while queue and len(found) < limit:
+            node = queue.popleft()
+            if node.word is not None:
+                found.append(node.word)
+            queue.extend(node.children.values())
+        return found
+
+    def _match_words(self, q):
+        """
+        ``{word: (tier, penalty)}`` for vocabulary words matching query
+        word ``q``.
+        """
+        if len(q) < 3:
+            return {w: (WORD_PREFIX, len(w) - len(q)) for w in self._prefix_words(q, SHORT_WORD_LIMIT)}
+
+        matched = {w: (WORD_PREFIX, len(w) - len(q)) for w in self._prefix_words(q)}
+        if len(matched) >= WORD_LIMIT:
+            return matched
+
+        tris = trigrams(q)
+        inner = [t for t in tris if t[0] != ' ' and t[2] != ' ']
+        postings = sorted((self.postings.get(t, ()) for t in inner), key=len)
+        if postings and postings[0]:
+            for w in postings[0].intersection(*postings[1:]):
+                if q in w and w not in matched:
+                    matched[w] = (SUBSTRING, len(w) - len(q))
+
+        # Typo tolerance only when nothing matched literally
+        if not matched:
+            shared = Counter()
+            for tri in tris:
+                shared.update(self.postings.get(tri, ()))
+            for w, common in shared.items():
+                similarity = common / (len(tris) + len(w) + 1 - common)
+                if similarity >= FUZZY_MIN_SIMILARITY:
+                    matched[w] = (FUZZY, 1 - similarity)
+        return matched
+
+    @staticmethod
+    def _quality(q, matched, name_words):
+        best = None
+        for w in name_words:
+            m = matched.get(w)
+            if m is None and w.startswith(q):
+                # Past the capped prefix expansion
+                m = (WORD_PREFIX, len(w) - len(q))
+            if m is not None and (best is None or m < best):
+                best = m
+        return best
+
+    def suggest(self, query, limit=10):
+        """
+        Best ``limit`` matches as ``[(pk, name, category, quantity)]``.
+        """
+        norm = normalize(query)
+        terms = list(dict.fromkeys(WORD_RE.findall(norm)))
+        if not terms:
+            return []
+
+        with self.lock:
+            matches = [self._match_words(q) for q in terms]
+            if not all(matches):
+                return []
+
+            # Walk the words of the most selective query word, best first,
+            # intersecting each one's items with the other words' items
+            sizes = [sum(len(self.words[w]) for w in matched) for matched in matches] if len(terms) > 1 else [0]
+            lead = min(range(len(terms)), key=sizes.__getitem__)
+            others = [(terms[i], matches[i]) for i in range(len(terms)) if i != lead]
+            narrowing = [_Term(self, matched) for _, matched in others]
+
+            found, seen = [], set()
+            for word, quality in sorted(matches[lead].items(), key=lambda kv: kv[1]):
+                if narrowing and word in self.bitmaps:
+                    mask = int.from_bytes(self.bitmaps[word], 'little')
+                    for term in narrowing:
+                        mask = term.within_mask(mask)
+                        if not mask:
+                            break
+                    hits = _bit_ids(mask, CANDIDATE_LIMIT)
+                else:
+                    hits = self.words[word]
+                    for term in narrowing:
+                        hits = term.within(hits)
+                        if not hits:
+                            break
+
+                for pk in hits:
+                    if pk not in seen:
+                        seen.add(pk)
+                        found.append((pk, quality))
+                        if len(found) >= CANDIDATE_LIMIT:
+                            break
+                if len(found) >= CANDIDATE_LIMIT:
+                    break
+
+            ranked = []
+            for pk, (tier, penalty) in found:
+                name, category, quantity, name_norm, name_words = self.entries[pk]
+                for q, matched in others:
+                    other_tier, other_penalty = self._quality(q, matched, name_words)
+                    tier, penalty = max(tier, other_tier), penalty + other_penalty
+
+                if name_norm == norm:
+                    tier = EXACT
+                elif name_norm.startswith(norm):
+                    tier = NAME_PREFIX
+                ranked.append(((tier, penalty, len(name_norm), name_norm, pk), (pk, name, category, quantity)))
+
+        ranked.sort(key=lambda r: r[0])
+        return [match for _, match in ranked[:limit]]
+
+
+_index = None
+_built_at = 0.0
+# Ids written while a rebuild is loading its snapshot (None when idle)
+_dirty = None
+_state_lock = threading.Lock()
+
+
+def _load():
+    from .models import Item
+
+    index = AutocompleteIndex()
+    rows = Item.objects.filter(quantity__gt=0).values_list('id', 'name', 'category', 'quantity')
+    for pk, name, category, quantity in rows.iterator(chunk_size=5000):
+        index.add(pk, name, category, quantity)
+    return index
+
+
+def _rebuild():
+    """
+    Build a fresh index in a background thread and swap it in.
+    """
+    global _index, _built_at, _dirty
+
+    close_old_connections()
+    try:
+        index = _load()
+        with _state_lock:
+            stale, _dirty = _dirty, None
+            _index, _built_at = index, time.monotonic()
+        # Written while the snapshot was loading: re-read into the new index
+        if stale:
+            _reload(stale)
+    except Exception:
+        logger.exception("Rebuilding the autocomplete index failed")
+        with _state_lock:
+            # Keep serving the old index; try again after another TTL
+            _dirty, _built_at = None, time.monotonic()
+    finally:
+        connection.close()
+
+
+def get_index():
+    """
+    The process-wide index. Built in the calling thread on first use;
+    after the TTL the current index keeps answering while a background
+    thread builds its replacement.
+    """
+    global _index, _built_at, _dirty
+
+    with _state_lock:
+        index = _index
+        if index is not None:
+            if _dirty is None and time.monotonic() - _built_at >= index_ttl():
+                _dirty = set()
+                threading.Thread(target=_rebuild, daemon=True, name='autocomplete-rebuild').start()
+            return index
+        if _dirty is None:
+            _dirty = set()
+
+    try:
+        index = _load()
+    except Exception:
+        with _state_lock:
+            _dirty = None
+        raise
+
+    with _state_lock:
+        stale, _dirty = _dirty, None
+        if _index is None:
+            _index, _built_at = index, time.monotonic()
+        index = _index
+
+    if stale:
+        _reload(stale)
+    return index
+
+
+def suggest(query, limit=10):
+    return get_index().suggest(query, limit)
+
+
+def _mark(ids):
+    with _state_lock:
+        if _dirty is not None:
+            _dirty.update(ids)
+
+
+def _reload(ids):
+    from .models import Item
+
+    index = _index
+    if index is None:
+        return
+
+    found = set()
+    rows = Item.objects.filter(pk__in=ids).values_list('id', 'name', 'category', 'quantity')
+    for pk, name, category, quantity in rows:
+        index.add(pk, name, category, quantity)
+        found.add(pk)
+
+    for pk in set(ids) - found:
+        index.remove(pk)
+
+
+def refresh(ids):
+    """
+    Re-read ``ids`` into the index once the current transaction commits.
+    Call after ``update()`` / ``bulk_create`` / ``bulk_update`` writes,
+    which don't send model signals.
+    """
+    ids = set(ids)
+    if not ids:
+        return
+
+    def apply():
+        _mark(ids)
+        _reload(ids)
+
+    transaction.on_commit(apply)
+
+
+def item_saved(sender, instance, **kwargs):
+    if not isinstance(instance.quantity, int):
+        # Saved with an F() expression; the new value is only in the database
+        refresh([instance.pk])
+        return
+
+    pk, name, category, quantity = instance.pk, instance.name, instance.category, instance.quantity
+
+    def apply():
+        _mark([pk])
+        if _index is not None:
+            _index.add(pk, name, category, quantity)
+
+    transaction.on_commit(apply)
+
+
+def item_deleted(sender, instance, **kwargs):
+    pk = instance.pk
+
+    def apply():
+        _mark([pk])
+        if _index is not None:
+            _index.remove(pk)
+
+    transaction.on_commit(apply)
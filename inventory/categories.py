@@ -0,0 +1,179 @@
+"""
+Per-process cache of the category lookup table.
+
+Items point at a ``Category`` row as well as carrying the category text,
+so the category dropdowns no longer run ``SELECT DISTINCT category`` over
+every item and category filters become indexed integer comparisons.
+
+Each process keeps the categories in memory, tagged with a version
+number held in a ``SerialCounter`` row. Writes that may change the set
+of categories in use bump that row when their transaction commits.
+Every process reads the row (one indexed lookup) before using its copy
+and reloads when the number has moved, so all processes see a new
+category on their next read.
+"""
+import threading
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+
+# SerialCounter row holding the version
+VERSION_COUNTER = 'category_version'
+
+
+class CategorySet:
+    """
+    One loaded version of the category table.
+    """
+
+    def __init__(self, version, rows, used):
+        self.version = version
+        # exact name -> id
+        self.ids = {name: pk for pk, name in rows}
+        # casefolded name -> ids ("resistor" matches "Resistor" and "RESISTOR")
+        self.folded = {}
+        for pk, name in rows:
+            self.folded.setdefault(name.casefold(), []).append(pk)
+        # Names of categories that have items, sorted for the dropdowns
+        self.names = used
+        self.used = frozenset(used)
+
+
+_categories = None
+_lock = threading.Lock()
+
+
+def current_version():
+    from .models import SerialCounter
+
+    return SerialCounter.current(VERSION_COUNTER)
+
+
+def _load(version):
+    from .models import Category, Item
+
+    rows = list(Category.objects.values_list('id', 'name'))
+    used = set(
+        Category.objects
+        .filter(Exists(Item.objects.filter(category_ref=OuterRef('pk'))))
+        .values_list('name', flat=True)
+    )
+    # Items never linked to a row still show up under their text
+    used.update(
+        Item.objects.filter(category_ref__isnull=True)
+        .exclude(category='')
+        .values_list('category', flat=True)
+        .distinct()
+    )
+    return CategorySet(version, rows, sorted(used))
+
+
+def get():
+    """
+    The current ``CategorySet``, reloaded when the version has moved.
+    """
+    global _categories
+
+    version = current_version()
+    categories = _categories
+    if categories is not None and categories.version == version:
+        return categories
+
+    with _lock:
+        if _categories is None or _categories.version != version:
+            _categories = _load(version)
+        return _categories
+
+
+def _bump():
+    from .models import SerialCounter
+
+    SerialCounter.allocate(name=VERSION_COUNTER)
+
+
+def invalidate():
+    """
+    Make every process reload once the current transaction commits.
+    """
+    transaction.on_commit(_bump)
+
+
+def names():
+    """
+    Sorted names of the categories that have items.
+    """
+    return get().names
+
+
+def matching(name, exact=False):
+    """
+    Ids of the categories called ``name`` (ignoring case unless
+    ``exact``); filters should go through ``condition()``.
+    """
+    categories = get()
+    if exact:
+        pk = categories.ids.get(name)
+        return [pk] if pk is not None else []
+    return categories.folded.get(name.casefold(), [])
+
+
+def condition(name, exact=False, prefix=''):
+    """
+    ``Q`` for items in the categories called ``name``; ``prefix`` is the
+    path to the item (``'item__'`` for transactions).
+
+    Items written around ``Item.save`` / ``assign()`` (raw SQL, fixtures,
+    other tools) have no ``category_ref`` and are matched on their
+    category text instead. The check for them is one indexed lookup, and
+    the plain ``category_ref__in`` filter is kept when there are none.
+    """
+    from .models import Item
+
+    lookup = 'exact' if exact else 'iexact'
+    q = Q(**{f'{prefix}category_ref__in': matching(name, exact)})
+    if Item.objects.filter(category_ref__isnull=True, **{f'category__{lookup}': name}).exists():
+        q |= Q(**{f'{prefix}category_ref__isnull': True, f'{prefix}category__{lookup}': name})
+    return q
+
+
+def resolve(names, categories=None):
+    """
+    ``{name: id}`` for ``names``, creating the categories that are missing.
+    """
+    from .models import Category
+
+    names = {name for name in names if name}
+    known = (categories or get()).ids
+    found = {name: known[name] for name in names if name in known}
+
+    missing = names - found.keys()
+    if missing:
+        Category.objects.bulk_create([Category(name=name) for name in missing], ignore_conflicts=True)
+        found.update(Category.objects.filter(name__in=missing).values_list('name', 'id'))
+        invalidate()
+    return found
+
+
+def assign(items):
+    """
+    Point each item's ``category_ref`` at the row for its ``category``
+    text, invalidating the cache if the categories in use may change.
+    """
+    items = list(items)
+    categories = get()
+    used = categories.used
+    ids = resolve((item.category for item in items), categories)
+
+    stale = False
+    for item in items:
+        pk = ids.get(item.category)
+        if item.category and item.category not in used:
+            stale = True
+        elif item.category_ref_id is not None and item.category_ref_id != pk:
+            # The old category may have lost its last item
+            stale = True
+        item.category_ref_id = pk
+
+    if stale:
+        invalidate()
@@ -0,0 +1,152 @@
+"""
+Digest mode for the head's issue / receive notifications.
+
+With ``NOTIFICATION_DIGEST`` on, ``notify_issuances`` records a
+NotificationEvent instead of queueing an email per transaction. The
+buffer is flushed as one email, grouped by item and issuer, once it
+holds ``NOTIFICATION_DIGEST_MAX_EVENTS`` events or its oldest event is
+``NOTIFICATION_DIGEST_WINDOW`` seconds old, so the number of SMTP sends
+no longer grows with the number of transactions. ``python manage.py
+flush_digest`` sends whatever is buffered right away.
+"""
+from datetime import timedelta
+import logging
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Count, Max, Min, Q, Sum
+from django.utils import timezone
+
+from .models import NotificationEvent
+from . import notifications, outbox
+
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_timer = None
+_timer_due = None
+
+
+def enabled():
+    return getattr(settings, 'NOTIFICATION_DIGEST', False)
+
+
+def window():
+    return timedelta(seconds=getattr(settings, 'NOTIFICATION_DIGEST_WINDOW', 15 * 60))
+
+
+def max_events():
+    return getattr(settings, 'NOTIFICATION_DIGEST_MAX_EVENTS', 50)
+
+
+def record(events):
+    """
+    Buffer ``[(kind, issuance)]`` in the current transaction; the flush
+    check runs after commit.
+    """
+    NotificationEvent.objects.bulk_create(
+        [NotificationEvent(kind=kind, issuance=issuance) for kind, issuance in events]
+    )
+    transaction.on_commit(check)
+
+
+def check():
+    """
+    Flush if the buffer is full or its window is over, otherwise make
+    sure a timer fires when the window ends.
+    """
+    pending = NotificationEvent.objects.filter(flushed_at__isnull=True)
+    oldest = pending.order_by('created_at').values_list('created_at', flat=True).first()
+    if oldest is None:
+        return
+
+    due = oldest + window()
+    limit = max_events()
+    if timezone.now() >= due or pending.order_by()[:limit].count() >= limit:
+        flush()
+    else:
+        _schedule(due)
+
+
+def _schedule(due):
+    global _timer, _timer_due
+
+    with _lock:
+        if _timer is not None and _timer_due <= due:
+            return
+        if _timer is not None:
+            _timer.cancel()
+        delay = max((due - timezone.now()).total_seconds(), 0)
+        _timer = threading.Timer(delay, _on_timer)
+        _timer.daemon = True
+        _timer_due = due
+        _timer.start()
+
+
+def _on_timer():
+    global _timer, _timer_due
+
+    with _lock:
+        _timer = _timer_due = None
+    try:
+        close_old_connections()
+        check()
+    except Exception:
+        logger.exception("Notification digest flush failed")
+    finally:
+        connection.close()
+
+
+def summarize(events):
+    """
+    Per (item, issuer) totals for a queryset of events, in one query.
+    """
+    issued = Q(kind=NotificationEvent.ISSUED)
+    received = Q(kind=NotificationEvent.RECEIVED)
+    return list(
+        events
+        # By item id: two items can share a name
+        .values('issuance__item', 'issuance__item__serial_no', 'issuance__item__name', 'issuance__issuer')
+        .annotate(
+            issued_count=Count('id', filter=issued),
+            issued_qty=Sum('issuance__quantity', filter=issued, default=0),
+            received_count=Count('id', filter=received),
+            received_qty=Sum('issuance__quantity', filter=received, default=0),
+            problems=Count('id', filter=received & Q(issuance__component_status__in=['faulty', 'lost'])),
+        )
+        .order_by('issuance__item__name', 'issuance__item', 'issuance__issuer')
+    )
+
+
+def flush():
+    """
+    Claim every buffered event and queue one digest email for them.
+    Returns the number of events reported.
+    """
+    from .email import HEAD_EMAIL
+
+    token = uuid.uuid4().hex
+    with transaction.atomic():
+        # Conditional claim: concurrent flushes never report an event twice
+        total = NotificationEvent.objects.filter(flushed_at__isnull=True).update(
+            batch=token, flushed_at=timezone.now(),
+        )
+        if not total:
+            return 0
+
+        events = NotificationEvent.objects.filter(batch=token)
+        rows = summarize(events)
+        span = events.aggregate(first=Min('created_at'), last=Max('created_at'))
+        first, last = timezone.localtime(span['first']), timezone.localtime(span['last'])
+
+        text, html = notifications.render_digest(rows, total, first, last)
+        outbox.enqueue(
+            subject=f"📋 Inventory digest: {total} issue/receive event(s)",
+            body=text,
+            html_body=html,
+            recipients=[HEAD_EMAIL],
+        )
+    return total
@@ -1,15 +1,47 @@
-from django.core.mail import send_mail
-from django.conf import settings
 import os
 
+from .models import NotificationEvent
+from . import digest, notifications, outbox
+
 HEAD_EMAIL = os.getenv("EMAIL_HOST_USER")
 
-def notify_head(subject, html_message):
-    send_mail(
-        subject=subject,
-        message="This email requires HTML support.",  # fallback
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        recipient_list=[HEAD_EMAIL],
-        html_message=html_message,  # ✅ THIS IS THE KEY
-        fail_silently=False,
+
+def notify_issuances(events):
+    """
+    Notify the head of ``[(NotificationEvent kind, issuance)]``: one
+    email each, or buffered for the next digest in digest mode.
+    """
+    events = list(events)
+    if not events:
+        return
+    if digest.enabled():
+        digest.record(events)
+        return
+
+    outbox.enqueue_many(
+        [(m.subject, m.text, m.html) for m in notifications.render_issuances(events)],
+        recipients=[HEAD_EMAIL],
+    )
+
+
+def notify_issuance(kind, issuance):
+    notify_issuances([(kind, issuance)])
+
+
+def notify_receipt(issuances):
+    """
+    One summary email for a batch of returned issuances (recorded as
+    usual in digest mode, where they are summarized anyway).
+    """
+    issuances = list(issuances)
+    if len(issuances) <= 1 or digest.enabled():
+        notify_issuances((NotificationEvent.RECEIVED, issuance) for issuance in issuances)
+        return
+
+    message = notifications.render_receipt(issuances)
+    outbox.enqueue(
+        subject=message.subject,
+        body=message.text,
+        html_body=message.html,
+        recipients=[HEAD_EMAIL],
     )
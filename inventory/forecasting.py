@@ -0,0 +1,216 @@
+"""
+Demand forecasts and reorder recommendations from the daily movement
+rollups.
+
+``run()`` (``python manage.py forecast_reorder``, e.g. nightly from
+cron) splits the item ids into ranges and hands each range to a process
+pool. A worker reads the range's ``ItemDailyMovement`` rows for the last
+``FORECAST_HISTORY_DAYS`` complete days into an items x days NumPy
+matrix of demand (units out + issued - returned) and forecasts every
+item in it at once (``forecast()``):
+
+- the daily rate is an exponentially weighted moving average, so recent
+  days count most; 7- and 28-day trailing averages and the standard
+  deviation of daily demand are kept alongside it;
+- reorder level = rate x lead time + safety stock, with safety stock =
+  z(service level) x std x sqrt(lead time);
+- reorder quantity covers ``FORECAST_COVER_DAYS`` of demand.
+
+Days before an item was created don't count as days without demand, and
+items observed for fewer than ``MIN_HISTORY_DAYS`` days get no
+recommendation. The parent process writes each range's results in one
+transaction as they come back, so the database sees a single writer.
+
+The rollups only go back to when they were introduced: on an older
+database run ``python manage.py backfill_movements`` first.
+"""
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from datetime import timedelta
+from itertools import repeat
+import math
+import os
+from statistics import NormalDist
+
+import django
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+import numpy as np
+
+from .models import Item, ItemDailyMovement, ReorderRecommendation
+
+
+# Weight of the newest day in the smoothed daily rate
+SMOOTHING = 0.1
+
+MIN_HISTORY_DAYS = 14
+
+WRITE_BATCH_SIZE = 500
+
+# What a worker needs besides its id range (picklable)
+Params = namedtuple('Params', 'first last lead_time cover_days z')
+
+
+def history_days():
+    return getattr(settings, 'FORECAST_HISTORY_DAYS', 90)
+
+
+def chunk_size():
+    return getattr(settings, 'FORECAST_CHUNK_SIZE', 5000)
+
+
+def default_workers():
+    return getattr(settings, 'FORECAST_WORKERS', None) or os.cpu_count() or 1
+
+
+def params(today=None):
+    """
+    ``Params`` for a run on local day ``today``: the history ends with
+    the last complete day.
+    """
+    last = (today or timezone.localdate()) - timedelta(days=1)
+    return Params(
+        first=last - timedelta(days=history_days() - 1),
+        last=last,
+        lead_time=getattr(settings, 'FORECAST_LEAD_TIME_DAYS', 7),
+        cover_days=getattr(settings, 'FORECAST_COVER_DAYS', 30),
+        z=NormalDist().inv_cdf(getattr(settings, 'FORECAST_SERVICE_LEVEL', 0.95)),
+    )
+
+
+def load_demand(low, high, first, last):
+    """
+    ``(item ids, index of each item's first observed day, demand matrix)``
+    for the items with ids in [low, high) over local days ``first`` to
+    ``last``; one row per item, one column per day.
+    """
+    days = (last - first).days + 1
+    items = list(Item.objects.filter(pk__gte=low, pk__lt=high).order_by('pk').values_list('pk', 'created_at'))
+    pks = np.fromiter((pk for pk, _ in items), dtype=np.int64, count=len(items))
+    start = np.fromiter(
+        ((timezone.localdate(created) - first).days for _, created in items), dtype=np.int64, count=len(items)
+    ).clip(0, days)
+
+    demand = np.zeros((len(items), days))
+    rows = list(
+        ItemDailyMovement.objects
+        .filter(item__gte=low, item__lt=high, day__gte=first, day__lte=last)
+        .order_by()
+        .values_list('item', 'day', 'units_out', 'issued', 'returned')
+    )
+    if rows and len(pks):
+        item_ids, day_values, out, issued, returned = zip(*rows)
+        item_ids = np.array(item_ids, dtype=np.int64)
+        offsets = np.fromiter((day.toordinal() for day in day_values), dtype=np.int64, count=len(rows))
+        units = np.array(out, dtype=np.float64) + np.array(issued) - np.array(returned)
+
+        # Rollups of deleted items have no row to go in
+        index = np.searchsorted(pks, item_ids).clip(max=len(pks) - 1)
+        found = pks[index] == item_ids
+        demand[index[found], offsets[found] - first.toordinal()] = units[found]
+
+    return pks, start, demand
+
+
+def _trailing(values, observed_days, window):
+    return values[:, -window:].sum(axis=1) / np.maximum(np.minimum(observed_days, window), 1)
+
+
+def forecast(demand, start, lead_time, cover_days, z):
+    """
+    Per-item arrays (``ReorderRecommendation`` field names) for a demand
+    matrix whose row ``i`` is observed from column ``start[i]`` on.
+    """
+    days = demand.shape[1]
+    observed = np.arange(days) >= start[:, None]
+    observed_days = observed.sum(axis=1)
+    values = np.where(observed, demand, 0.0)
+
+    mean = values.sum(axis=1) / np.maximum(observed_days, 1)
+    std = np.sqrt(np.where(observed, (demand - mean[:, None]) ** 2, 0.0).sum(axis=1) / np.maximum(observed_days, 1))
+
+    weights = (1 - SMOOTHING) ** np.arange(days - 1, -1, -1) * observed
+    total_weight = weights.sum(axis=1)
+    rate = np.maximum((values * weights).sum(axis=1) / np.where(total_weight > 0, total_weight, 1), 0)
+
+    safety = z * std * math.sqrt(lead_time)
+    return {
+        'daily_demand': rate,
+        'average_7_days': _trailing(values, observed_days, 7),
+        'average_28_days': _trailing(values, observed_days, 28),
+        'demand_std': std,
+        'days_observed': observed_days,
+        # Rounded first so float noise can't push a whole number up by one
+        'reorder_level': np.ceil(np.round(rate * lead_time + safety, 6)).astype(np.int64),
+        'reorder_quantity': np.ceil(np.round(rate * cover_days, 6)).astype(np.int64),
+    }
+
+
+def forecast_range(low, high, run_params):
+    """
+    ``(items read, [(item id, {field: value})])`` for the items with ids
+    in [low, high) that have enough history. Runs in a pool worker.
+    """
+    pks, start, demand = load_demand(low, high, run_params.first, run_params.last)
+    result = forecast(demand, start, run_params.lead_time, run_params.cover_days, run_params.z)
+
+    keep = np.flatnonzero(result['days_observed'] >= MIN_HISTORY_DAYS)
+    columns = {field: values[keep].tolist() for field, values in result.items()}
+    rows = [
+        (pk, {field: columns[field][i] for field in columns})
+        for i, pk in enumerate(pks[keep].tolist())
+    ]
+    return len(pks), rows
+
+
+def write(low, high, rows, computed_at):
+    """
+    Replace the recommendations of the items with ids in [low, high).
+    """
+    with transaction.atomic():
+        # Locked so an item deleted meanwhile can't get a recommendation
+        alive = set(Item.objects.select_for_update().filter(pk__gte=low, pk__lt=high).values_list('pk', flat=True))
+        ReorderRecommendation.objects.filter(item__gte=low, item__lt=high).delete()
+        ReorderRecommendation.objects.bulk_create(
+            [
+                ReorderRecommendation(item_id=pk, computed_at=computed_at, **fields)
+                for pk, fields in rows
+                if pk in alive
+            ],
+            batch_size=WRITE_BATCH_SIZE,
+        )
+
+
+def ranges(size):
+    top = Item.objects.aggregate(top=Max('pk'))['top'] or 0
+    return [(low, low + size) for low in range(0, top + 1, size)]
+
+
+def run(today=None, workers=None, size=None):
+    """
+    Recompute every item's recommendation, ``size`` item ids per task on
+    ``workers`` processes (1: in this process). Returns ``(items read,
+    recommendations written)``.
+    """
+    run_params = params(today)
+    chunks = ranges(size or chunk_size())
+    workers = min(workers or default_workers(), len(chunks))
+    computed_at = timezone.now()
+
+    read = written = 0
+    with ExitStack() as stack:
+        mapper = map
+        if workers > 1:
+            # Workers open their own connections instead of sharing this process's
+            connections.close_all()
+            mapper = stack.enter_context(ProcessPoolExecutor(max_workers=workers, initializer=django.setup)).map
+
+        lows, highs = zip(*chunks)
+        for (low, high), (count, rows) in zip(chunks, mapper(forecast_range, lows, highs, repeat(run_params))):
+            write(low, high, rows, computed_at)
+            read += count
+            written += len(rows)
+    return read, written
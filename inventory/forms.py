@@ -1,6 +1,7 @@
 from django import forms
 from .models import Issuance
 from .constants import COMPONENT_STATUS
+from .stock import StockBatchError, parse_lines
 
 
 class IssuanceForm(forms.ModelForm):
@@ -77,6 +78,25 @@ class ReceiveForm(forms.Form):
     )
 
 
+class StockBatchForm(forms.Form):
+    """
+    Many stock-in / stock-out lines pasted at once (e.g. a delivery note).
+    """
+    lines = forms.CharField(
+        label="Lines: serial no, IN/OUT, quantity, remark (optional)",
+        widget=forms.Textarea(attrs={
+            'rows': 14,
+            'placeholder': "1042, IN, 200, Delivery #5531\n1043, OUT, 3, Lab kit",
+        }),
+    )
+
+    def clean_lines(self):
+        try:
+            return parse_lines(self.cleaned_data['lines'])
+        except StockBatchError as e:
+            raise forms.ValidationError([f"Line {number}: {message}" for number, message in e.errors])
+
+
 class ExcelUploadForm(forms.Form):
     """
     Upload form for Excel / CSV inventory import.
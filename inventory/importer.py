@@ -0,0 +1,319 @@
+"""
+Bulk import engine for the Excel / CSV import wizard.
+
+Mapped columns are coerced and validated as whole columns with pandas /
+NumPy (no per-cell try/except), bad cells become structured rejections
+instead of silent zeros, serial numbers are reserved as one block and
+the surviving rows are written with batched ``bulk_create``.
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+import numpy as np
+import pandas as pd
+
+from .models import Item, SerialCounter, StockLedgerEntry, StockStatusCounter
+from . import autocomplete, categories, valuation
+
+
+# Fields you allow to import and their friendly labels.
+# Keys are model field names, values are display labels in mapping UI.
+IMPORTABLE_FIELDS = {
+    'id': 'Item ID (Auto)',
+    'name': 'Item Name (Required)',
+    'category': 'Item Category',
+    'quantity': 'Initial Stock',
+    'reorder_level': 'Minimum Stock Level',
+    'unit_price': 'Unit Price (₹)',
+    'location': 'Storage Location / Rack',
+    'serial_no': 'Serial No. (merge key)',
+}
+
+IMPORT_BATCH_SIZE = 500
+
+INT_FIELDS = ('id', 'serial_no', 'quantity', 'reorder_level')
+DECIMAL_FIELDS = ('unit_price',)
+
+# PositiveIntegerField / DecimalField(max_digits=10, decimal_places=2) limits
+MAX_INT = 2147483647
+MAX_PRICE = 10 ** 8
+
+# Defaults applied when a column is not mapped or a cell is blank
+ROW_DEFAULTS = {
+    'category': 'Other',
+    'quantity': 0,
+    'reorder_level': 0,
+    'unit_price': 0.0,
+    'location': '',
+}
+
+# Thousands separators and currency symbols seen in supplier sheets
+NUMBER_NOISE = r'[,\s₹$€£]'
+
+
+def rejection(row, field, value, message):
+    """
+    One structured entry of the per-row rejection report.
+    """
+    value = '' if value is None or value is pd.NA else str(value)
+    return {
+        'row': int(row),
+        'field': field,
+        'value': value if len(value) <= 60 else value[:57] + '...',
+        'message': message,
+    }
+
+
+def format_error(error):
+    """
+    Human readable ``"Row N: ..."`` line for a rejection.
+    """
+    if error.get('field'):
+        return f"Row {error['row']}: {error['field']} {error['message']} (got '{error['value']}')"
+    return f"Row {error['row']}: {error['message']}"
+
+
+def _blank(series):
+    text = series.astype('string').str.strip()
+    return (text.isna() | (text == '')).to_numpy(dtype=bool, na_value=True)
+
+
+def _coerce_number(series):
+    """
+    ``to_numeric`` over the whole column; only cells it could not parse
+    get separators / currency symbols stripped and are parsed again.
+    Returns ``(values, blank mask, not-a-number mask)``.
+    """
+    values = pd.to_numeric(series, errors='coerce').astype('float64').to_numpy(na_value=np.nan, copy=True)
+
+    retry = np.flatnonzero(np.isnan(values))
+    blank = np.zeros(len(values), dtype=bool)
+    if len(retry):
+        rest = series.iloc[retry]
+        blank[retry] = _blank(rest)
+        cleaned = rest.astype('string').str.replace(NUMBER_NOISE, '', regex=True)
+        values[retry] = pd.to_numeric(cleaned, errors='coerce').astype('float64').to_numpy(na_value=np.nan)
+
+    not_number = ~blank & np.isnan(values)
+    return values, blank, not_number
+
+
+def _coerce_int(series):
+    values, blank, not_number = _coerce_number(series)
+    number = ~blank & ~not_number
+
+    with np.errstate(invalid='ignore'):
+        checks = {
+            'is not a number': not_number,
+            'must be a whole number': number & (np.mod(values, 1) != 0),
+            'cannot be negative': number & (values < 0),
+            'is too large': number & (values > MAX_INT),
+        }
+    return values, blank, checks
+
+
+def _coerce_price(series):
+    values, blank, not_number = _coerce_number(series)
+    number = ~blank & ~not_number
+
+    with np.errstate(invalid='ignore'):
+        checks = {
+            'is not a number': not_number,
+            'cannot be negative': number & (values < 0),
+            'is too large': number & (values >= MAX_PRICE),
+        }
+    return np.round(values, 2), blank, checks
+
+
+def _coerce_text(series, max_length):
+    text = series.astype('string').str.strip().fillna('')
+
+    # Collapse inner whitespace / NFC-normalize only the cells that need it
+    messy = text.str.contains(r'\s\s|[^\x20-\x7e]', regex=True).to_numpy(dtype=bool)
+    if messy.any():
+        text[messy] = (
+            text[messy]
+            .str.normalize('NFC')
+            .str.replace(r'\s+', ' ', regex=True)
+        )
+
+    checks = {
+        f"is longer than {max_length} characters": (text.str.len() > max_length).to_numpy(dtype=bool),
+    }
+    return text.to_numpy(dtype=object), text.eq('').to_numpy(dtype=bool), checks
+
+
+def coerce_columns(df, mapping, start=1, require_name=True, fill_defaults=True):
+    """
+    Coerce and validate every mapped column at once.
+
+    ``mapping`` is ``{column label: model field}`` and ``start`` is the
+    file row number of ``df``'s first row. Returns ``(rows, rejections)``:
+    ``rows`` is a list of ``(row number, field kwargs)`` for the rows that
+    passed, ``rejections`` the structured report for the ones that didn't.
+
+    With ``fill_defaults=False`` blank cells come back as None and
+    unmapped fields are left out (merge mode only updates what the file
+    actually carries).
+    """
+    n = len(df)
+    row_numbers = np.arange(start, start + n)
+
+    # Mapping keys are the stringified column labels shown in the UI
+    columns = {str(c): c for c in df.columns}
+
+    coerced = {}
+    failed = []
+    bad = np.zeros(n, dtype=bool)
+
+    for col_name, field in mapping.items():
+        if field not in IMPORTABLE_FIELDS:
+            continue
+
+        series = df[columns[str(col_name)]]
+
+        if field in INT_FIELDS:
+            values, blank, checks = _coerce_int(series)
+        elif field in DECIMAL_FIELDS:
+            values, blank, checks = _coerce_price(series)
+        else:
+            max_length = Item._meta.get_field(field).max_length
+            values, blank, checks = _coerce_text(series, max_length)
+
+        if field == 'name' and require_name:
+            checks['is required'] = blank
+
+        for message, mask in checks.items():
+            if mask.any():
+                failed.append((field, series, message, mask))
+                bad |= mask
+
+        coerced[field] = (values, blank)
+
+    if require_name and 'name' not in coerced:
+        failed.append(('name', None, 'is required', np.ones(n, dtype=bool)))
+        bad[:] = True
+
+    # Only the rejected cells are visited one by one
+    rejections = []
+    for field, series, message, mask in failed:
+        for i in np.flatnonzero(mask):
+            value = None if series is None else series.iat[i]
+            rejections.append(rejection(row_numbers[i], field, value, message))
+    rejections.sort(key=lambda e: e['row'])
+
+    keep = np.flatnonzero(~bad)
+    columns_out = {}
+    for field, (values, blank) in coerced.items():
+        values, blank = values[keep], blank[keep]
+
+        if field in INT_FIELDS:
+            values = np.where(blank, 0, values).astype('int64').astype(object)
+        else:
+            values = values.astype(object)
+
+        if fill_defaults and field in ROW_DEFAULTS:
+            values[blank] = ROW_DEFAULTS[field]
+        else:
+            # Blank ids / serials fall back to auto-assignment
+            values[blank] = None
+
+        columns_out[field] = values.tolist()
+
+    if fill_defaults:
+        for field, default in ROW_DEFAULTS.items():
+            columns_out.setdefault(field, [default] * len(keep))
+
+    fields = list(columns_out)
+    rows = [
+        (number, dict(zip(fields, cells)))
+        for number, cells in zip(row_numbers[keep].tolist(), zip(*columns_out.values()))
+    ]
+
+    return rows, rejections
+
+
+def build_item(kw):
+    """
+    Build an unsaved Item from one coerced row (no queries).
+    Serial numbers are always allocated, never taken from the file.
+    """
+    kw = {k: v for k, v in kw.items() if k != 'serial_no'}
+    return Item(is_imported=True, **kw)
+
+
+def assign_serial_block(items):
+    """
+    Give ``items`` one reserved block of consecutive serial numbers.
+    """
+    first = SerialCounter.allocate(len(items))
+
+    for offset, (_, item) in enumerate(items):
+        item.serial_no = first + offset
+
+
+def _insert_batch(batch, errors):
+    """
+    bulk_create one batch; if the database rejects it, fall back to
+    row-by-row inserts so the failing rows can be reported.
+    """
+    try:
+        with transaction.atomic():
+            Item.objects.bulk_create([item for _, item in batch])
+    except IntegrityError:
+        pass
+    else:
+        # bulk_create bypasses Item.save, so count the new statuses and
+        # write the opening ledger entries here
+        StockStatusCounter.apply(Counter(
+            StockStatusCounter.classify(item.quantity, item.reorder_level) for _, item in batch
+        ))
+        StockLedgerEntry.record_many((item.pk, item.quantity, StockLedgerEntry.IMPORTED) for _, item in batch)
+        return len(batch)
+
+    created = 0
+    for idx, item in batch:
+        try:
+            with transaction.atomic():
+                item.save(force_insert=True)
+            created += 1
+        except Exception as e:
+            errors.append(rejection(idx, None, None, str(e)))
+    return created
+
+
+def bulk_import(rows, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Insert coerced ``(row number, kwargs)`` rows with batched bulk_create.
+
+    Returns ``(created, errors)``; ``errors`` are rejections for the rows
+    the database refused.
+    """
+    items = [(idx, build_item(kw)) for idx, kw in rows]
+    errors = []
+
+    created = 0
+    if items:
+        with StockStatusCounter.batched():
+            # bulk_create skips Item.save, which links the category rows
+            categories.assign(item for _, item in items)
+            assign_serial_block(items)
+            for offset in range(0, len(items), batch_size):
+                created += _insert_batch(items[offset:offset + batch_size], errors)
+
+        # bulk_create sends no post_save
+        autocomplete.refresh(item.pk for _, item in items if item.pk is not None)
+        valuation.invalidate()
+
+    return created, errors
+
+
+def import_frame(df, mapping, start=1):
+    """
+    Coerce and insert one DataFrame chunk.
+
+    Returns ``(created, errors)`` with every rejection sorted by row.
+    """
+    rows, rejections = coerce_columns(df, mapping, start=start)
+    created, errors = bulk_import(rows)
+    return created, sorted(rejections + errors, key=lambda e: e['row'])
@@ -0,0 +1,265 @@
+"""
+Background import jobs.
+
+Jobs are rows in ImportJob and run on a small in-process thread pool
+(no external broker). Rows are streamed from the staged file in
+fixed-size chunks; each chunk is inserted in its own transaction
+together with the job's progress counters, so ``rows_done`` is always a
+safe point to resume from if the process dies mid-import.
+
+A worker claims a job with a conditional UPDATE (pending, or running
+but silent for ``IMPORT_JOB_STALE_SECONDS``) that records its ``owner``
+token, and every chunk re-checks that token before committing. A second
+worker that picks the job up, e.g. from a poll in another process, gets
+nothing to claim; a worker whose job was taken over because it went
+quiet stops at its next chunk, which is rolled back.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .importer import import_frame
+from .merge import NaturalKeyIndex, empty_summary, merge_frame
+from .models import ImportJob
+from .readers import iter_chunks
+from . import staging
+
+
+_executor = None
+_lock = threading.Lock()
+_active = set()
+
+
+def chunk_size():
+    return getattr(settings, 'IMPORT_JOB_CHUNK_SIZE', 1000)
+
+
+def max_stored_errors():
+    return getattr(settings, 'IMPORT_JOB_MAX_ERRORS', 1000)
+
+
+def stale_after():
+    return timedelta(seconds=getattr(settings, 'IMPORT_JOB_STALE_SECONDS', 60))
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMPORT_JOB_WORKERS', 2),
+                thread_name_prefix='import-job',
+            )
+        return _executor
+
+
+def submit(job_id):
+    """
+    Queue a job on the worker pool once the current transaction commits.
+    """
+    with _lock:
+        if job_id in _active:
+            return
+        _active.add(job_id)
+
+    transaction.on_commit(lambda: get_executor().submit(_run, job_id))
+
+
+def ensure_running(job):
+    """
+    Re-queue a job whose worker went away (e.g. after a server restart).
+    Queueing is harmless if it hasn't: ``run_job`` only runs a job it can
+    claim.
+    """
+    if job.is_finished or job.pk in _active:
+        return
+    if job.status == ImportJob.PENDING or timezone.now() - job.updated_at > stale_after():
+        submit(job.pk)
+
+
+class JobLost(Exception):
+    """
+    Raised inside a chunk's transaction when another worker has claimed
+    the job.
+    """
+
+
+def claim(job_id, owner):
+    """
+    Take job ``job_id`` for ``owner`` if it is pending or its worker has
+    gone quiet. Returns the claimed job, or None.
+    """
+    now = timezone.now()
+    claimable = Q(status=ImportJob.PENDING) | Q(status=ImportJob.RUNNING, updated_at__lt=now - stale_after())
+    claimed = ImportJob.objects.filter(claimable, pk=job_id).update(
+        status=ImportJob.RUNNING,
+        owner=owner,
+        started_at=Coalesce('started_at', now),
+        updated_at=now,
+    )
+    if claimed != 1:
+        return None
+    return ImportJob.objects.get(pk=job_id)
+
+
+def _still_owned(job):
+    """
+    Refresh the claim; False if another worker has taken the job over.
+    """
+    return ImportJob.objects.filter(pk=job.pk, status=ImportJob.RUNNING, owner=job.owner).update(
+        updated_at=timezone.now(),
+    ) == 1
+
+
+def _run(job_id):
+    try:
+        close_old_connections()
+        run_job(job_id)
+    finally:
+        with _lock:
+            _active.discard(job_id)
+        connection.close()
+
+
+def _finish(job, status, message=''):
+    """
+    Record the outcome if ``job`` is still ours; returns whether it was.
+    """
+    job.status = status
+    job.message = message
+    job.finished_at = timezone.now()
+    return ImportJob.objects.filter(pk=job.pk, owner=job.owner).update(
+        status=status,
+        message=message,
+        total_rows=job.total_rows,
+        finished_at=job.finished_at,
+        updated_at=job.finished_at,
+    ) == 1
+
+
+def run_job(job_id):
+    """
+    Process a job to completion, resuming after ``rows_done``. Returns
+    the job, or None if another worker has it.
+    """
+    job = claim(job_id, uuid.uuid4().hex)
+    if job is None:
+        return None
+
+    meta = staging.load_meta(job.token)
+    if meta is None:
+        _finish(job, ImportJob.FAILED, "Uploaded file expired before the import could run.")
+        return job
+
+    chunks = iter_chunks(
+        staging.raw_path(job.token),
+        job.filename,
+        meta,
+        chunk_size=chunk_size(),
+        skip=job.rows_done,
+    )
+    limit = max_stored_errors()
+
+    index = None
+    if job.mode == ImportJob.MERGE:
+        index = NaturalKeyIndex(job.match_key)
+        job.summary = job.summary or empty_summary()
+
+    try:
+        for df in chunks:
+            with transaction.atomic():
+                # First, so the chunk rolls back if the job was taken over
+                if not _still_owned(job):
+                    raise JobLost
+                start = job.rows_done + 1
+                if index is None:
+                    created, errors = import_frame(df, job.mapping, start=start)
+                    updated = unchanged = 0
+                else:
+                    created, updated, unchanged, errors = merge_frame(
+                        df, job.mapping, index,
+                        start=start, dry_run=job.dry_run, summary=job.summary,
+                    )
+
+                job.rows_done += len(df)
+                job.total_rows = max(job.total_rows, job.rows_done)
+                job.rows_created += created
+                job.rows_updated += updated
+                job.rows_unchanged += unchanged
+                job.rows_failed += len({e['row'] for e in errors})
+                job.errors = (job.errors + errors)[:limit]
+                job.save(update_fields=[
+                    'rows_done', 'total_rows', 'rows_created', 'rows_updated',
+                    'rows_unchanged', 'rows_failed', 'errors', 'summary', 'updated_at',
+                ])
+
+            staging.touch(job.token)
+    except JobLost:
+        return None
+    except Exception as e:
+        _finish(job, ImportJob.FAILED, f"Import stopped at row {job.rows_done + 1}: {e}")
+        return job
+
+    job.total_rows = job.rows_done
+    # A dry run keeps the staged file so the merge can be applied
+    if _finish(job, ImportJob.DONE) and not job.dry_run:
+        staging.discard(job.token)
+    return job
+
+
+def apply_dry_run(job):
+    """
+    Create (and queue) the real merge job for a finished dry run. Returns
+    None if the dry run was already applied.
+    """
+    with transaction.atomic():
+        # Locked so two clicks on "Apply" can't both create a job
+        job = ImportJob.objects.select_for_update().get(pk=job.pk)
+        if job.applied_job_id is not None:
+            return None
+
+        applied = ImportJob.objects.create(
+            filename=job.filename,
+            token=job.token,
+            mapping=job.mapping,
+            mode=job.mode,
+            match_key=job.match_key,
+            total_rows=job.total_rows,
+        )
+        job.applied_job = applied
+        job.save(update_fields=['applied_job', 'updated_at'])
+        submit(applied.pk)
+    return applied
+
+
+def progress(job):
+    """
+    JSON-serialisable progress snapshot for the polling endpoint.
+    """
+    data = {
+        'id': job.pk,
+        'status': job.status,
+        'finished': job.is_finished,
+        'total_rows': job.total_rows,
+        'rows_done': job.rows_done,
+        'rows_created': job.rows_created,
+        'rows_failed': job.rows_failed,
+        'rows_updated': job.rows_updated,
+        'rows_unchanged': job.rows_unchanged,
+        'mode': job.mode,
+        'dry_run': job.dry_run,
+        'percent': job.percent,
+        'throughput': round(job.throughput, 1),
+        'message': job.message,
+        'summary': job.summary,
+    }
+    if job.is_finished:
+        data['errors'] = job.errors
+    return data
@@ -0,0 +1,217 @@
+"""
+Point-in-time stock from the append-only ledger.
+
+Every quantity change is a ``StockLedgerEntry`` written in the same
+transaction as the change. ``take_snapshots()`` (``python manage.py
+snapshot_stock``, e.g. hourly from cron) checkpoints the balance of each
+item that changed since the last run, so every item with entries before
+a run's watermark has a snapshot at that run. A read then starts at the
+latest snapshot at or before the time asked for and adds only the
+entries after it, instead of replaying the item's whole history.
+
+``reconcile()`` (``python manage.py reconcile_stock``) checks
+``Item.quantity`` against the ledger balances.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import Item, StockLedgerEntry, StockSnapshot
+
+
+# Items per IN (...) list / per reconciliation transaction
+CHUNK_SIZE = 500
+RECONCILE_CHUNK_SIZE = 2000
+
+
+def snapshot_settle():
+    """
+    Entries younger than this are left for the next snapshot run, so a
+    writer that hasn't committed yet can't end up under a checkpoint.
+    """
+    return timedelta(seconds=getattr(settings, 'STOCK_SNAPSHOT_SETTLE_SECONDS', 60))
+
+
+def _chunks(ids, size=CHUNK_SIZE):
+    ids = list(ids)
+    for offset in range(0, len(ids), size):
+        yield ids[offset:offset + size]
+
+
+def _watermark(at=None):
+    """
+    ``(taken_at, entry id)`` of the latest snapshot run at or before
+    ``at`` (None: the latest run), or ``(None, 0)`` before the first run.
+    """
+    runs = StockSnapshot.objects.order_by('-taken_at', '-id')
+    if at is not None:
+        runs = runs.filter(taken_at__lte=at)
+    return runs.values_list('taken_at', 'entry_id').first() or (None, 0)
+
+
+def _snapshot_quantities(at=None, **items):
+    """
+    ``{item id: quantity}`` from each item's latest snapshot at or before
+    ``at``; ``items`` are lookups on ``item`` (e.g. ``item__in=``).
+    """
+    snapshots = StockSnapshot.objects.filter(**items)
+    if at is not None:
+        snapshots = snapshots.filter(taken_at__lte=at)
+    latest = snapshots.values('item').annotate(last=Max('id')).values('last')
+    return dict(StockSnapshot.objects.filter(pk__in=latest).values_list('item', 'quantity'))
+
+
+def _balances(at=None, replay=False, **items):
+    """
+    ``{item id: ledger balance}`` at ``at`` (None: everything recorded),
+    from the snapshots plus the entries after their run, or from every
+    entry if ``replay``.
+    """
+    if replay:
+        balances, watermark = {}, 0
+    else:
+        balances = _snapshot_quantities(at, **items)
+        _, watermark = _watermark(at)
+
+    entries = StockLedgerEntry.objects.filter(pk__gt=watermark, **items)
+    if at is not None:
+        entries = entries.filter(created_at__lte=at)
+    for item_id, delta in entries.values('item').annotate(total=Sum('delta')).values_list('item', 'total'):
+        balances[item_id] = balances.get(item_id, 0) + delta
+    return balances
+
+
+def quantity_at(item_id, at):
+    """
+    Quantity of item ``item_id`` at time ``at``: its latest snapshot plus
+    its entries after that snapshot.
+    """
+    quantity, entry_id = (
+        StockSnapshot.objects
+        .filter(item=item_id, taken_at__lte=at)
+        .order_by('-taken_at', '-id')
+        .values_list('quantity', 'entry_id')
+        .first()
+    ) or (0, 0)
+
+    tail = (
+        StockLedgerEntry.objects
+        .filter(item=item_id, pk__gt=entry_id, created_at__lte=at)
+        .aggregate(total=Sum('delta'))['total']
+    )
+    return quantity + (tail or 0)
+
+
+def quantities_at(at, item_ids=None):
+    """
+    ``{item id: quantity}`` at time ``at`` for every item with ledger
+    history (or just ``item_ids``). Deleted items read as 0 after their
+    deletion.
+    """
+    if item_ids is None:
+        return _balances(at)
+
+    balances = {}
+    for chunk in _chunks(item_ids):
+        balances.update(_balances(at, item__in=chunk))
+    return balances
+
+
+def history(item_id, start, end=None):
+    """
+    ``(opening quantity, [entry dict])`` for item ``item_id`` between
+    ``start`` (exclusive) and ``end`` (inclusive; None: now). Each entry
+    dict carries the running ``quantity`` after it.
+    """
+    quantity = quantity_at(item_id, start)
+    opening = quantity
+
+    entries = StockLedgerEntry.objects.filter(item=item_id, created_at__gt=start)
+    if end is not None:
+        entries = entries.filter(created_at__lte=end)
+
+    rows = []
+    for at, delta, reason in entries.order_by('created_at', 'id').values_list('created_at', 'delta', 'reason'):
+        quantity += delta
+        rows.append({'at': at, 'delta': delta, 'reason': reason, 'quantity': quantity})
+    return opening, rows
+
+
+def take_snapshots(now=None, settle=None):
+    """
+    Checkpoint every item with entries since the last run; returns the
+    number of snapshots written. Entries younger than ``settle`` (default
+    ``snapshot_settle()``) wait for the next run.
+    """
+    now = now or timezone.now()
+    cutoff = now - (snapshot_settle() if settle is None else settle)
+
+    with transaction.atomic():
+        previous, watermark = _watermark()
+        last = (
+            StockLedgerEntry.objects
+            .filter(pk__gt=watermark, created_at__lte=cutoff)
+            .aggregate(last=Max('id'))['last']
+        )
+        if last is None:
+            return 0
+
+        # Everything up to ``last`` by id, so no entry is ever skipped
+        changed = dict(
+            StockLedgerEntry.objects
+            .filter(pk__gt=watermark, pk__lte=last)
+            .values('item').annotate(total=Sum('delta'))
+            .values_list('item', 'total')
+        )
+        taken_at = max(cutoff, previous) if previous else cutoff
+
+        written = 0
+        for chunk in _chunks(changed):
+            base = _snapshot_quantities(item__in=chunk)
+            StockSnapshot.objects.bulk_create([
+                StockSnapshot(item_id=pk, quantity=base.get(pk, 0) + changed[pk], entry_id=last, taken_at=taken_at)
+                for pk in chunk
+            ])
+            written += len(chunk)
+    return written
+
+
+def reconcile(fix=False, replay=False, chunk_size=RECONCILE_CHUNK_SIZE):
+    """
+    ``[(item id, Item.quantity or None if deleted, ledger balance)]`` for
+    each item whose stored quantity doesn't match the ledger. ``replay``
+    sums every entry instead of starting from the snapshots. With
+    ``fix``, a ``correction`` entry brings the ledger to ``Item.quantity``
+    (the stored quantity is what the conditional updates protect).
+    """
+    top = max(
+        Item.objects.aggregate(top=Max('pk'))['top'] or 0,
+        StockLedgerEntry.objects.aggregate(top=Max('item'))['top'] or 0,
+    )
+
+    drift = []
+    for low in range(0, top + 1, chunk_size):
+        high = low + chunk_size
+        with transaction.atomic():
+            # Locked so a concurrent stock movement can't land between the two reads
+            stored = dict(
+                Item.objects.select_for_update()
+                .filter(pk__gte=low, pk__lt=high)
+                .values_list('pk', 'quantity')
+            )
+            balances = _balances(replay=replay, item__gte=low, item__lt=high)
+
+            found = [
+                (pk, stored.get(pk), balances.get(pk, 0))
+                for pk in sorted(stored.keys() | balances.keys())
+                if stored.get(pk, 0) != balances.get(pk, 0)
+            ]
+            if fix:
+                StockLedgerEntry.record_many(
+                    (pk, (have or 0) - balance, StockLedgerEntry.CORRECTION) for pk, have, balance in found
+                )
+        drift.extend(found)
+    return drift
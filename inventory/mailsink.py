@@ -0,0 +1,135 @@
+"""
+Local SMTP stand-in for development and tests.
+
+``MailSink`` accepts any login and any message and keeps what it
+receives in memory instead of delivering it, so the outbox can be run
+against a real SMTP session without a mail account. ``fail_next``
+makes it reject the next few messages with a temporary error, to
+exercise retries. Run it with ``python manage.py smtp_sink``.
+"""
+from email import message_from_bytes, policy
+import socketserver
+import threading
+
+
+class _Session(socketserver.StreamRequestHandler):
+
+    def reply(self, *lines):
+        # Multi-line replies use "250-" on all but the last line
+        for i, line in enumerate(lines):
+            code, text = line.split(' ', 1)
+            sep = ' ' if i == len(lines) - 1 else '-'
+            self.wfile.write(f"{code}{sep}{text}\r\n".encode())
+
+    def read_line(self):
+        return self.rfile.readline().decode('utf-8', 'replace').rstrip('\r\n')
+
+    def read_data(self):
+        lines = []
+        while True:
+            line = self.rfile.readline()
+            if not line or line in (b'.\r\n', b'.\n'):
+                return b''.join(lines)
+            if line.startswith(b'..'):
+                line = line[1:]
+            lines.append(line)
+
+    def handle(self):
+        sink = self.server
+        sink.count_connection()
+        self.reply("220 localhost inventory mail sink")
+        sender, recipients = None, []
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command.split(' ', 1)[0].upper()
+            argument = command.split(':', 1)[1].strip() if ':' in command else ''
+
+            if verb == 'EHLO':
+                self.reply("250 localhost", "250 AUTH PLAIN", "250 8BITMIME")
+            elif verb == 'HELO':
+                self.reply("250 localhost")
+            elif verb == 'AUTH':
+                if len(command.split()) == 2:
+                    self.reply("334 ")
+                    self.read_line()
+                self.reply("235 Authentication successful")
+            elif verb == 'MAIL':
+                sender, recipients = argument, []
+                self.reply("250 OK")
+            elif verb == 'RCPT':
+                recipients.append(argument)
+                self.reply("250 OK")
+            elif verb == 'DATA':
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                data = self.read_data()
+                if sink.take_failure():
+                    self.reply("451 Temporary failure (simulated)")
+                else:
+                    sink.deliver(sender, recipients, data)
+                    self.reply("250 OK")
+                sender, recipients = None, []
+            elif verb in ('RSET', 'NOOP'):
+                sender, recipients = None, []
+                self.reply("250 OK")
+            elif verb == 'QUIT':
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class MailSink(socketserver.ThreadingTCPServer):
+    """
+    SMTP server on ``(host, port)`` that stores messages in ``messages``.
+    Port 0 picks a free port (see ``port``).
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='localhost', port=1025, on_message=None):
+        super().__init__((host, port), _Session)
+        self.messages = []
+        self.connections = 0
+        self.fail_next = 0
+        self.on_message = on_message
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def count_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def take_failure(self):
+        with self._lock:
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                return True
+            return False
+
+    def deliver(self, sender, recipients, data):
+        message = message_from_bytes(data, policy=policy.default)
+        with self._lock:
+            self.messages.append(message)
+        if self.on_message:
+            self.on_message(sender, recipients, message)
+
+    def start(self):
+        """
+        Serve on a background thread (for use from tests / scripts).
+        """
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
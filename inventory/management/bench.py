@@ -0,0 +1,34 @@
+"""
+Small helpers shared by the ``bench_*`` management commands.
+"""
+from contextlib import contextmanager
+import time
+
+from django.db import transaction
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def rolled_back():
+    """
+    Run the block inside a transaction that is always rolled back,
+    so benchmarks never leave rows behind.
+    """
+    try:
+        with transaction.atomic():
+            yield
+            raise _Rollback
+    except _Rollback:
+        pass
+
+
+def timed(fn, *args, **kwargs):
+    """
+    Call ``fn`` and return ``(result, seconds)``.
+    """
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
@@ -0,0 +1,64 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+import numpy as np
+
+from inventory.autocomplete import AutocompleteIndex, normalize
+from inventory.management.bench import timed
+
+
+KINDS = ["Resistor", "Capacitor", "Sensor", "Connector", "Arduino Uno", "ESP32 DevKit", "LED", "Relay Module"]
+UNITS = ["Ω", "kΩ", "µF", "nF", "V", "mm", ""]
+
+QUERIES = ["res", "330", "esp32 dev", "capacitr", "relay mod", "sens 4", "kω", "uno r"]
+
+
+def make_names(count):
+    rng = np.random.default_rng(7)
+    kinds = rng.integers(0, len(KINDS), count)
+    values = rng.integers(1, 1000, count)
+    units = rng.integers(0, len(UNITS), count)
+    return [
+        f"{KINDS[k]} {v}{UNITS[u]} #{i}"
+        for i, (k, v, u) in enumerate(zip(kinds.tolist(), values.tolist(), units.tolist()))
+    ]
+
+
+def linear_scan(names, query, limit=10):
+    """
+    What ``name__icontains`` does: test every name.
+    """
+    q = normalize(query)
+    return [n for n in names if q in normalize(n)][:limit]
+
+
+class Command(BaseCommand):
+    help = "Benchmark the in-memory autocomplete index against a linear substring scan."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100_000)
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        names = make_names(options['items'])
+
+        index = AutocompleteIndex()
+        _, build = timed(lambda: [index.add(pk, n, 'Other', 1) for pk, n in enumerate(names, 1)])
+        self.stdout.write(f"         build: {len(index)} items in {build:.2f}s")
+
+        for query in QUERIES:
+            samples = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                matches = index.suggest(query)
+                samples.append(time.perf_counter() - start)
+
+            samples.sort()
+            p50 = statistics.median(samples) * 1e6
+            p99 = samples[int(len(samples) * 0.99) - 1] * 1e6
+            top = matches[0][1] if matches else '-'
+            self.stdout.write(f"  {query!r:>12}: p50 {p50:7.0f}µs  p99 {p99:7.0f}µs  top: {top}")
+
+        _, scan = timed(linear_scan, names, QUERIES[0])
+        self.stdout.write(f"   linear scan: {scan * 1e6:.0f}µs per query")
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+import numpy as np
+import pandas as pd
+
+from inventory.importer import coerce_columns
+from inventory.management.bench import timed
+from inventory.management.commands.bench_import import MAPPING, per_cell_convert
+
+
+def make_text_frame(rows, bad_every=50):
+    """
+    A streamed-CSV-like chunk: every cell is text, with some junk values.
+    """
+    i = np.arange(rows)
+    qty = (i % 50).astype(str).astype(object)
+    qty[::bad_every] = 'n/a'
+    price = np.char.add((1 + i % 100).astype(str), '.25').astype(object)
+    price[1::bad_every] = '12,5O'
+
+    return pd.DataFrame({
+        'Name': np.char.add('  Part ', i.astype(str)).astype(object),
+        'Category': np.array(["Sensor", "Resistor", "", "Connector"], dtype=object)[i % 4],
+        'Qty': qty,
+        'Min': np.full(rows, '5', dtype=object),
+        'Price': price,
+        'Rack': np.char.add('R', (i % 20).astype(str)).astype(object),
+    })
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-cell conversion against vectorized column coercion."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=100_000)
+
+    def handle(self, *args, **options):
+        df = make_text_frame(options['rows'])
+
+        rows, per_cell = timed(per_cell_convert, df, MAPPING)
+        # Prices are never legitimately 0 in this frame
+        zeros = sum(1 for r in rows if r['unit_price'] == 0.0)
+        self.stdout.write(f"      per-cell: {len(rows)} rows in {per_cell:.3f}s ({zeros} prices silently zeroed)")
+
+        (rows, rejections), vectorized = timed(coerce_columns, df, MAPPING)
+        self.stdout.write(
+            f"    vectorized: {len(rows)} rows in {vectorized:.3f}s "
+            f"({len(rejections)} rejections)"
+        )
+        self.stdout.write(f"       speedup: {per_cell / vectorized:.1f}x")
@@ -0,0 +1,124 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, transaction
+
+from inventory import categories
+from inventory.models import Item, Transaction
+
+
+def stock_writer(item_ids, operations, seed, errors):
+    """
+    What add/remove stock does: adjust one item and log the transaction.
+    """
+    rng = random.Random(seed)
+    done = 0
+    try:
+        for _ in range(operations):
+            item_id = rng.choice(item_ids)
+            qty = rng.randint(1, 5)
+            try:
+                with transaction.atomic():
+                    Item.adjust_stock(item_id, qty)
+                    Transaction.objects.create(item_id=item_id, transaction_type='IN', quantity=qty)
+                done += 1
+            except OperationalError as e:
+                errors.append(str(e))
+    finally:
+        connection.close()
+    return done
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark concurrent stock writes under each database profile "
+        "(each runs in its own process against a scratch database)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='sqlite-plain,sqlite', help="Comma-separated DB_PROFILE values.")
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--operations', type=int, default=200, help="Writes per thread.")
+        parser.add_argument('--items', type=int, default=200)
+        parser.add_argument('--run', action='store_true', help="Internal: benchmark the configured database.")
+
+    def handle(self, *args, **options):
+        if options['run']:
+            return self.run_here(options)
+
+        self.stdout.write(
+            f"{options['threads']} threads x {options['operations']} writes "
+            f"(adjust_stock + Transaction) per profile"
+        )
+        self.stdout.write(f"  {'profile':<14} {'writes/s':>10} {'ok':>7} {'locked':>7}")
+        for profile in options['profiles'].split(','):
+            result = self.run_profile(profile.strip(), options)
+            self.stdout.write(
+                f"  {profile:<14} {result['ops_per_sec']:>10.0f} {result['done']:>7} {result['errors']:>7}"
+            )
+            if result['sample_error']:
+                self.stdout.write(f"    e.g. {result['sample_error']}")
+
+    def run_profile(self, profile, options):
+        with tempfile.TemporaryDirectory() as scratch:
+            env = {**os.environ, 'DB_PROFILE': profile}
+            if profile.startswith('sqlite'):
+                env['DB_NAME'] = os.path.join(scratch, 'bench.sqlite3')
+            # Postgres runs against DB_NAME from the environment: use a scratch database
+
+            manage = [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py')]
+            subprocess.run(manage + ['migrate', '-v0'], env=env, check=True)
+            out = subprocess.run(
+                manage + [
+                    'bench_db_writes', '--run',
+                    '--threads', str(options['threads']),
+                    '--operations', str(options['operations']),
+                    '--items', str(options['items']),
+                ],
+                env=env, check=True, capture_output=True, text=True,
+            )
+        lines = out.stdout.strip().splitlines()
+        if not lines:
+            raise CommandError(f"No result from profile {profile}: {out.stderr}")
+        return json.loads(lines[-1])
+
+    def run_here(self, options):
+        items = [
+            Item(name=f"Bench item {i}", category="Bench", quantity=10, reorder_level=2, unit_price=1, serial_no=i + 1)
+            for i in range(options['items'])
+        ]
+        # bulk_create skips Item.save, which links the category rows
+        categories.assign(items)
+        items = Item.objects.bulk_create(items)
+        item_ids = [item.pk for item in items]
+        connection.close()
+
+        errors = []
+        results = [0] * options['threads']
+
+        def worker(n):
+            results[n] = stock_writer(item_ids, options['operations'], n, errors)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(options['threads'])]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        done = sum(results)
+        self.stdout.write(json.dumps({
+            'done': done,
+            'errors': len(errors),
+            'sample_error': errors[0] if errors else '',
+            'ops_per_sec': done / elapsed if elapsed else 0,
+        }))
@@ -0,0 +1,137 @@
+from datetime import timedelta
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+import numpy as np
+
+from inventory import categories, forecasting
+from inventory.management.bench import timed
+from inventory.models import Item, ItemDailyMovement, ReorderRecommendation
+
+
+SEED_BATCH_SIZE = 5000
+
+# Share of days on which a seeded item moves
+ACTIVE_DAYS = 0.1
+
+
+def seed(count, days):
+    """
+    ``count`` items created before the history window, each moving on
+    about ``ACTIVE_DAYS`` of the last ``days`` days.
+    """
+    rng = np.random.default_rng(25)
+    categories.resolve(["Resistor"])
+    for offset in range(0, count, SEED_BATCH_SIZE):
+        batch = [
+            Item(serial_no=i + 1, name=f"Part #{i}", category="Resistor", quantity=100, reorder_level=10, unit_price=1)
+            for i in range(offset, min(offset + SEED_BATCH_SIZE, count))
+        ]
+        categories.assign(batch)
+        Item.objects.bulk_create(batch)
+    Item.objects.update(created_at=timezone.now() - timedelta(days=days + 1))
+
+    today = timezone.localdate()
+    pks = np.array(Item.objects.order_by('pk').values_list('pk', flat=True), dtype=np.int64)
+    # Each item's typical daily demand; busy items are rare
+    scale = rng.lognormal(1, 1, len(pks))
+    for offset in range(0, len(pks), SEED_BATCH_SIZE):
+        chunk = slice(offset, offset + SEED_BATCH_SIZE)
+        active = rng.random((len(pks[chunk]), days)) < ACTIVE_DAYS
+        rows, cols = np.nonzero(active)
+        units = rng.poisson(scale[chunk][rows] / ACTIVE_DAYS)
+        ItemDailyMovement.objects.bulk_create(
+            [
+                ItemDailyMovement(item_id=pk, day=today - timedelta(days=int(col) + 1), units_out=int(n))
+                for pk, col, n in zip(pks[chunk][rows].tolist(), cols.tolist(), units.tolist())
+            ],
+            batch_size=1000,
+        )
+    return ItemDailyMovement.objects.count()
+
+
+def fingerprint():
+    digest = hashlib.sha256()
+    for row in ReorderRecommendation.objects.order_by('item').values_list(
+        'item', 'reorder_level', 'reorder_quantity', 'days_observed'
+    ).iterator(chunk_size=10_000):
+        digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark forecast_reorder on a scratch database (--items items, 100k by default) "
+        "with each --workers count, and check they all write the same recommendations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=100_000)
+        parser.add_argument('--days', type=int, default=90, help="Days of seeded movement history.")
+        parser.add_argument('--workers', default='', help="Comma-separated worker counts (default: 1 and the CPU count).")
+        parser.add_argument('--run', action='store_true', help="Internal: run on the configured database.")
+
+    def handle(self, *args, **options):
+        workers = options['workers'] or f"1,{os.cpu_count() or 1}"
+        try:
+            counts = sorted({int(n) for n in workers.split(',')})
+        except ValueError:
+            raise CommandError(f"--workers: expected comma-separated numbers, got {workers!r}")
+        if options['run']:
+            return self.run_here(options, counts)
+
+        with tempfile.TemporaryDirectory() as scratch:
+            env = dict(os.environ)
+            if env.get('DB_PROFILE', 'sqlite').startswith('sqlite'):
+                env['DB_NAME'] = os.path.join(scratch, 'bench.sqlite3')
+            # Postgres runs against DB_NAME from the environment: use a scratch database
+
+            manage = [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py')]
+            subprocess.run(manage + ['migrate', '-v0'], env=env, check=True)
+            out = subprocess.run(
+                manage + ['bench_forecast', '--run', '--items', str(options['items']), '--days', str(options['days']),
+                          '--workers', ','.join(map(str, counts))],
+                env=env, check=True, capture_output=True, text=True,
+            )
+
+        lines = out.stdout.strip().splitlines()
+        if not lines:
+            raise CommandError(f"No result: {out.stderr}")
+        r = json.loads(lines[-1])
+
+        self.stdout.write(
+            f"{r['items']} items, {r['movements']} item-day rows over {options['days']} days "
+            f"(seeded in {r['seed']:.1f}s, DB_PROFILE={os.getenv('DB_PROFILE', 'sqlite')}, {os.cpu_count()} CPUs)"
+        )
+        for count, seconds, written in r['runs']:
+            self.stdout.write(
+                f"  {count:>2} worker(s)  {seconds:>8.1f} s  {r['items'] / seconds:>10,.0f} items/s  "
+                f"{written} recommendation(s)"
+            )
+
+        if len(set(r['fingerprints'])) > 1:
+            raise CommandError("Worker counts wrote different recommendations.")
+
+    def run_here(self, options, counts):
+        seeded_rows, seeded = timed(seed, options['items'], options['days'])
+
+        runs, fingerprints = [], []
+        for count in counts:
+            (read, written), seconds = timed(forecasting.run, workers=count)
+            runs.append((count, seconds, written))
+            fingerprints.append(fingerprint())
+
+        self.stdout.write(json.dumps({
+            'items': options['items'],
+            'movements': seeded_rows,
+            'seed': seeded,
+            'runs': runs,
+            'fingerprints': fingerprints,
+        }))
@@ -0,0 +1,101 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+import pandas as pd
+
+from inventory.importer import IMPORTABLE_FIELDS, import_frame
+from inventory.management.bench import rolled_back, timed
+from inventory.models import Item
+
+
+MAPPING = {
+    'Name': 'name',
+    'Category': 'category',
+    'Qty': 'quantity',
+    'Min': 'reorder_level',
+    'Price': 'unit_price',
+    'Rack': 'location',
+}
+
+
+def make_frame(rows):
+    return pd.DataFrame({
+        'Name': [f"Part {i}" for i in range(rows)],
+        'Category': [("Sensor", "Resistor", "", "Connector")[i % 4] for i in range(rows)],
+        'Qty': [i % 50 for i in range(rows)],
+        'Min': [5] * rows,
+        'Price': [round(1 + (i % 100) * 0.25, 2) for i in range(rows)],
+        'Rack': [f"R{i % 20}" for i in range(rows)],
+    })
+
+
+def per_cell_convert(df, mapping):
+    """
+    The old conversion loop: per-cell int()/float() inside try/except,
+    bad values silently become 0.
+    """
+    rows = []
+    for _, row in df.iterrows():
+        item_kwargs = {}
+        for col_name, model_field in mapping.items():
+            raw_value = row.get(col_name)
+            if pd.isna(raw_value):
+                raw_value = None
+
+            if model_field in ('quantity', 'reorder_level'):
+                try:
+                    item_kwargs[model_field] = int(raw_value) if raw_value is not None else 0
+                except Exception:
+                    item_kwargs[model_field] = 0
+            elif model_field == 'unit_price':
+                try:
+                    item_kwargs[model_field] = float(raw_value) if raw_value is not None else 0.0
+                except Exception:
+                    item_kwargs[model_field] = 0.0
+            else:
+                item_kwargs[model_field] = str(raw_value).strip() if raw_value is not None else ''
+
+        rows.append(item_kwargs)
+    return rows
+
+
+def legacy_import(df):
+    """
+    The old path: one Item.objects.create (and one serial lookup) per row.
+    """
+    created = 0
+    errors = []
+    for idx, kw in enumerate(per_cell_convert(df, MAPPING), start=1):
+        item_data = {k: v for k, v in kw.items() if k in IMPORTABLE_FIELDS}
+        if 'category' in item_data and not item_data['category']:
+            item_data['category'] = 'Other'
+        item_data['is_imported'] = True
+        try:
+            Item.objects.create(**item_data)
+            created += 1
+        except Exception as e:
+            errors.append(f"Row {idx}: {e}")
+    return created, errors
+
+
+class Command(BaseCommand):
+    help = "Benchmark the per-row import against the bulk import engine (rolled back)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        df = make_frame(options['rows'])
+
+        for label, fn in (
+            ('per-row create', lambda: legacy_import(df)),
+            ('bulk_create', lambda: import_frame(df, MAPPING)),
+        ):
+            connection.queries_log.clear()
+            with rolled_back(), CaptureQueriesContext(connection) as ctx:
+                (created, errors), seconds = timed(fn)
+
+            self.stdout.write(
+                f"{label:>15}: {created} rows in {seconds:.3f}s "
+                f"({len(ctx.captured_queries)} queries, {len(errors)} errors)"
+            )
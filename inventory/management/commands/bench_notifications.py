@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.formats import date_format
+
+from inventory.management.bench import timed
+from inventory.models import Issuance, Item, NotificationEvent
+from inventory import notifications
+
+
+def make_events(count):
+    """
+    Unsaved issuances alternating issue / receive (no database access).
+    """
+    events = []
+    for i in range(count):
+        item = Item(name=f"Resistor 330Ω <{i}>", category="Resistor", quantity=10, reorder_level=2, unit_price=1)
+        issuance = Issuance(
+            item=item,
+            quantity=i % 5 + 1,
+            user="Lab user",
+            receiver="R & D bench",
+            issuer="Harsh",
+            issue_condition="returnable",
+            component_status="ok",
+            remark="" if i % 3 else "Returned with bent leads",
+        )
+        kind = NotificationEvent.ISSUED if i % 2 == 0 else NotificationEvent.RECEIVED
+        events.append((kind, issuance))
+    return events
+
+
+def render_each(events, now):
+    """
+    One ``render_to_string`` pair per message through the project engine,
+    with a fresh context and timestamp each time.
+    """
+    out = []
+    for kind, issuance in events:
+        base = notifications.TEMPLATES[kind]
+        context = {'issuance': issuance, 'time': date_format(timezone.localtime(now), 'd M Y, H:i')}
+        out.append((render_to_string(f'{base}.txt', context), render_to_string(f'{base}.html', context)))
+    return out
+
+
+class Command(BaseCommand):
+    help = "Benchmark notification email rendering: per-message render_to_string vs the cached bulk renderer."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        count = options['messages']
+        events = make_events(count)
+        now = timezone.now()
+
+        # Compile outside the timings
+        notifications.render_issuances(events[:2], now)
+
+        rows = [
+            ('render_to_string per message', lambda: render_each(events, now)),
+            ('cached templates, one at a time', lambda: [notifications.render_issuance(k, i, now) for k, i in events]),
+            ('cached templates, bulk', lambda: notifications.render_issuances(events, now)),
+        ]
+
+        self.stdout.write(f"Rendering {count} messages (HTML + plain text)")
+        for label, fn in rows:
+            result, seconds = timed(fn)
+            assert len(result) == count
+            self.stdout.write(f"  {label:<34} {seconds:8.3f}s  {seconds * 1e6 / count:8.1f} µs/message")
+
+        sample = notifications.render_issuances(events[:1], now)[0]
+        self.stdout.write(f"HTML size {len(sample.html)} bytes, text size {len(sample.text)} bytes")
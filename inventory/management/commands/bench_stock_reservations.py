@@ -0,0 +1,226 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F, Sum
+
+from inventory import categories, reservations
+from inventory.models import Item, StockStatusCounter, Transaction
+
+
+STRATEGIES = ('check-then-act', 'row-lock', 'conditional', 'hold')
+
+
+def request_work(work_ms):
+    # Stands in for the rest of a request: form validation, rendering, notification
+    time.sleep(work_ms / 1000)
+
+
+def check_then_act(item_id, qty, work_ms):
+    """
+    The old remove_stock: read, check in Python, then write.
+    """
+    quantity = Item.objects.filter(pk=item_id).values_list('quantity', flat=True).get()
+    request_work(work_ms)
+    if quantity < qty:
+        return False
+    with transaction.atomic():
+        # What adjust_stock used to do: lock, then an unconditional decrement
+        row = Item.objects.select_for_update().filter(pk=item_id).values_list('quantity', 'reorder_level').get()
+        Item.objects.filter(pk=item_id).update(quantity=F('quantity') - qty)
+        StockStatusCounter.track(row, (row[0] - qty, row[1]))
+        Transaction.objects.create(item_id=item_id, transaction_type='OUT', quantity=qty)
+    return True
+
+
+def row_lock(item_id, qty, work_ms):
+    """
+    The old issue_item: the row stays locked for the whole request.
+    """
+    with transaction.atomic():
+        item = Item.objects.select_for_update().get(pk=item_id)
+        request_work(work_ms)
+        if item.quantity < qty:
+            return False
+        item.quantity -= qty
+        item.save(update_fields=['quantity'])
+        Transaction.objects.create(item_id=item_id, transaction_type='OUT', quantity=qty)
+    return True
+
+
+def conditional(item_id, qty, work_ms):
+    """
+    The reservation engine: request work outside, one conditional UPDATE.
+    """
+    request_work(work_ms)
+    with transaction.atomic():
+        if reservations.take(item_id, qty) is None:
+            return False
+        Transaction.objects.create(item_id=item_id, transaction_type='OUT', quantity=qty)
+    return True
+
+
+def hold_then_confirm(item_id, qty, work_ms, abandon):
+    """
+    Hold while the "form" is open; one in ``abandon`` is given up.
+    """
+    held = reservations.hold(item_id, qty)
+    if held is None:
+        return False
+    request_work(work_ms)
+    if abandon:
+        reservations.release(held.pk)
+        return False
+    with transaction.atomic():
+        if reservations.confirm(held.pk) is None:
+            return False
+        Transaction.objects.create(item_id=item_id, transaction_type='OUT', quantity=qty)
+    return True
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress concurrent stock removals on a few hot items under each strategy "
+        "(scratch database per strategy) and check that nothing was oversold."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strategies', default=','.join(STRATEGIES))
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--attempts', type=int, default=150, help="Removals per thread.")
+        parser.add_argument('--items', type=int, default=4, help="Hot items everyone competes for.")
+        parser.add_argument('--stock', type=int, default=400, help="Starting quantity per item.")
+        parser.add_argument('--work-ms', type=float, default=2.0, help="Simulated request work per removal.")
+        parser.add_argument('--run', default='', help="Internal: run one strategy on the configured database.")
+
+    def handle(self, *args, **options):
+        if options['run']:
+            return self.run_here(options)
+
+        self.stdout.write(
+            f"{options['threads']} threads x {options['attempts']} removals of 1-4 units from "
+            f"{options['items']} items x {options['stock']} units, {options['work_ms']}ms request work "
+            f"(DB_PROFILE={os.getenv('DB_PROFILE', 'sqlite')})"
+        )
+        self.stdout.write(
+            f"  {'strategy':<15} {'attempts/s':>10} {'removed':>8} {'rejected':>9} "
+            f"{'errors':>7} {'oversold':>9} {'consistent':>11}"
+        )
+        failed = []
+        for strategy in options['strategies'].split(','):
+            r = self.run_strategy(strategy.strip(), options)
+            self.stdout.write(
+                f"  {strategy:<15} {r['per_sec']:>10.0f} {r['removed']:>8} {r['rejected']:>9} "
+                f"{r['errors']:>7} {r['oversold']:>9} {'yes' if r['consistent'] else 'NO':>11}"
+            )
+            if r['sample_error']:
+                self.stdout.write(f"    e.g. {r['sample_error']}")
+            if strategy in ('conditional', 'hold') and (r['oversold'] or r['errors'] or not r['consistent']):
+                failed.append(strategy)
+
+        if failed:
+            raise CommandError(f"Reservation engine failed the stress test: {', '.join(failed)}")
+
+    def run_strategy(self, strategy, options):
+        if strategy not in STRATEGIES:
+            raise CommandError(f"Unknown strategy {strategy!r}; choose from {', '.join(STRATEGIES)}")
+
+        with tempfile.TemporaryDirectory() as scratch:
+            env = dict(os.environ)
+            if env.get('DB_PROFILE', 'sqlite').startswith('sqlite'):
+                env['DB_NAME'] = os.path.join(scratch, 'bench.sqlite3')
+            # Postgres runs against DB_NAME from the environment: use a scratch database
+
+            manage = [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py')]
+            subprocess.run(manage + ['migrate', '-v0'], env=env, check=True)
+            out = subprocess.run(
+                manage + ['bench_stock_reservations', '--run', strategy] + [
+                    arg for name in ('threads', 'attempts', 'items', 'stock', 'work_ms')
+                    for arg in (f"--{name.replace('_', '-')}", str(options[name]))
+                ],
+                env=env, check=True, capture_output=True, text=True,
+            )
+        lines = out.stdout.strip().splitlines()
+        if not lines:
+            raise CommandError(f"No result from {strategy}: {out.stderr}")
+        return json.loads(lines[-1])
+
+    def run_here(self, options):
+        strategy = options['run']
+        items = [
+            Item(name=f"Hot item {i}", category="Bench", quantity=options['stock'], reorder_level=10,
+                 unit_price=1, serial_no=i + 1)
+            for i in range(options['items'])
+        ]
+        # bulk_create skips Item.save, which links the category rows
+        categories.assign(items)
+        items = Item.objects.bulk_create(items)
+        StockStatusCounter.rebuild()
+        item_ids = [item.pk for item in items]
+        connection.close()
+
+        counts = {'removed': 0, 'rejected': 0}
+        errors = []
+        lock = threading.Lock()
+
+        def worker(n):
+            rng = random.Random(n)
+            try:
+                for i in range(options['attempts']):
+                    item_id, qty = rng.choice(item_ids), rng.randint(1, 4)
+                    try:
+                        if strategy == 'check-then-act':
+                            ok = check_then_act(item_id, qty, options['work_ms'])
+                        elif strategy == 'row-lock':
+                            ok = row_lock(item_id, qty, options['work_ms'])
+                        elif strategy == 'conditional':
+                            ok = conditional(item_id, qty, options['work_ms'])
+                        else:
+                            ok = hold_then_confirm(item_id, qty, options['work_ms'], abandon=(i % 10 == 0))
+                    except DatabaseError as e:
+                        # e.g. the CHECK (quantity >= 0) constraint catching an oversell
+                        errors.append(f"{type(e).__name__}: {e}")
+                        continue
+                    with lock:
+                        counts['removed' if ok else 'rejected'] += 1
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(options['threads'])]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - start
+
+        # Every unit that left must be accounted for by a Transaction row
+        taken = dict(
+            Transaction.objects.filter(transaction_type='OUT')
+            .values_list('item').annotate(total=Sum('quantity'))
+        )
+        final = dict(Item.objects.values_list('pk', 'quantity'))
+        consistent = all(
+            final[pk] == options['stock'] - taken.get(pk, 0) and final[pk] >= 0 for pk in item_ids
+        )
+        oversold = sum(max(taken.get(pk, 0) - options['stock'], 0) for pk in item_ids)
+        counters = StockStatusCounter.snapshot()
+        consistent = consistent and {k: v for k, v in counters.items() if k != 'total'} == StockStatusCounter.rebuild()
+
+        attempts = counts['removed'] + counts['rejected'] + len(errors)
+        self.stdout.write(json.dumps({
+            **counts,
+            'errors': len(errors),
+            'sample_error': errors[0] if errors else '',
+            'oversold': oversold,
+            'consistent': consistent,
+            'per_sec': attempts / elapsed if elapsed else 0,
+        }))
@@ -0,0 +1,160 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+import numpy as np
+
+from inventory import categories, valuation
+from inventory.management.bench import timed
+from inventory.models import Item
+
+
+CATEGORIES = ["Resistor", "Capacitor", "Sensor", "Connector", "Microcontroller", "LED", "Relay", "Cable"]
+LOCATIONS = [f"Rack {r}-{s}" for r in "ABCDEFGH" for s in range(1, 26)] + [None]
+
+SEED_BATCH_SIZE = 5000
+
+
+def seed(count):
+    """
+    ``count`` items with skewed prices (a few expensive, many cheap).
+    """
+    rng = np.random.default_rng(24)
+    cats = rng.integers(0, len(CATEGORIES), count)
+    locs = rng.integers(0, len(LOCATIONS), count)
+    quantities = rng.integers(0, 500, count)
+    reorder = rng.integers(1, 50, count)
+    cents = np.rint(rng.lognormal(3, 1.5, count) * 100).astype(np.int64)
+
+    categories.resolve(CATEGORIES)
+    for offset in range(0, count, SEED_BATCH_SIZE):
+        batch = []
+        for i in range(offset, min(offset + SEED_BATCH_SIZE, count)):
+            category = CATEGORIES[cats[i]]
+            batch.append(Item(
+                serial_no=i + 1, name=f"{category} #{i}", category=category,
+                location=LOCATIONS[locs[i]], quantity=int(quantities[i]), reorder_level=int(reorder[i]),
+                unit_price=Decimal(int(cents[i])) / 100,
+            ))
+        categories.assign(batch)
+        Item.objects.bulk_create(batch)
+
+
+def row_by_row():
+    """
+    The same figures through the ORM, one model instance at a time.
+    """
+    total = 0
+    by_category, by_location, values = {}, {}, []
+    short, restock = 0, 0
+    for item in Item.objects.iterator(chunk_size=2000):
+        value = item.quantity * item.unit_price
+        total += value
+        by_category[item.category] = by_category.get(item.category, 0) + value
+        by_location[item.location] = by_location.get(item.location, 0) + value
+        values.append(value)
+        if item.quantity <= item.reorder_level:
+            short += 1
+            restock += (item.reorder_level - item.quantity) * item.unit_price
+
+    values.sort(reverse=True)
+    running, classes = 0, {'A': 0, 'B': 0, 'C': 0}
+    for value in values:
+        share = running / total if total else 1
+        classes['A' if value and share < 0.8 else 'B' if value and share < 0.95 else 'C'] += 1
+        running += value
+    return {
+        'total_value': float(total),
+        'by_category': {name: float(v) for name, v in by_category.items()},
+        'abc': classes,
+        'short': short,
+        'restock_cost': float(restock),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the NumPy valuation report against a row-by-row ORM loop "
+        "(scratch database with --items items, 1M by default)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--items', type=int, default=1_000_000)
+        parser.add_argument('--repeat', type=int, default=3)
+        parser.add_argument('--run', action='store_true', help="Internal: run on the configured database.")
+
+    def handle(self, *args, **options):
+        if options['run']:
+            return self.run_here(options)
+
+        with tempfile.TemporaryDirectory() as scratch:
+            env = dict(os.environ)
+            if env.get('DB_PROFILE', 'sqlite').startswith('sqlite'):
+                env['DB_NAME'] = os.path.join(scratch, 'bench.sqlite3')
+            # Postgres runs against DB_NAME from the environment: use a scratch database
+
+            manage = [sys.executable, os.path.join(settings.BASE_DIR, 'manage.py')]
+            subprocess.run(manage + ['migrate', '-v0'], env=env, check=True)
+            out = subprocess.run(
+                manage + ['bench_valuation', '--run', '--items', str(options['items']),
+                          '--repeat', str(options['repeat'])],
+                env=env, check=True, capture_output=True, text=True,
+            )
+
+        lines = out.stdout.strip().splitlines()
+        if not lines:
+            raise CommandError(f"No result: {out.stderr}")
+        r = json.loads(lines[-1])
+
+        self.stdout.write(f"{r['items']} items (seeded in {r['seed']:.1f}s, DB_PROFILE={os.getenv('DB_PROFILE', 'sqlite')})")
+        for label, seconds in r['timings']:
+            rate = r['items'] / seconds if seconds else 0
+            self.stdout.write(f"  {label:<34} {seconds * 1000:>10.1f} ms  {rate:>12,.0f} items/s")
+        self.stdout.write(f"  speed-up, numpy report vs row by row: {r['timings'][0][1] / r['timings'][3][1]:.1f}x")
+
+        if r['mismatch']:
+            raise CommandError(f"NumPy and row-by-row results differ: {r['mismatch']}")
+
+    def run_here(self, options):
+        _, seeded = timed(seed, options['items'])
+
+        def best(fn):
+            results = [timed(fn) for _ in range(options['repeat'])]
+            return results[0][0], min(seconds for _, seconds in results)
+
+        expected, rows_seconds = timed(row_by_row)
+        columns, load_seconds = best(valuation.load_columns)
+        summary, compute_seconds = best(lambda: valuation.summarize(columns))
+        _, report_seconds = best(lambda: valuation.summarize(valuation.load_columns()))
+        valuation.report()
+        _, cached_seconds = best(valuation.report)
+
+        mismatch = []
+        if abs(summary['total_value'] - expected['total_value']) > 0.01:
+            mismatch.append(f"total {summary['total_value']} != {expected['total_value']}")
+        for group in summary['by_category']:
+            if abs(group['value'] - expected['by_category'].get(group['name'], 0)) > 0.01:
+                mismatch.append(f"category {group['name']}")
+        if {row['class']: row['items'] for row in summary['abc']} != expected['abc']:
+            mismatch.append(f"abc {summary['abc']} != {expected['abc']}")
+        short = summary['exposure']['low_stock_items'] + summary['exposure']['out_of_stock_items']
+        if short != expected['short'] or abs(summary['exposure']['restock_cost'] - expected['restock_cost']) > 0.01:
+            mismatch.append("low-stock exposure")
+
+        self.stdout.write(json.dumps({
+            'items': options['items'],
+            'seed': seeded,
+            'timings': [
+                ("row by row (ORM instances)", rows_seconds),
+                ("numpy: load columns", load_seconds),
+                ("numpy: compute", compute_seconds),
+                ("numpy: report (load + compute)", report_seconds),
+                ("cached report", cached_seconds),
+            ],
+            'mismatch': mismatch,
+        }))
@@ -0,0 +1,169 @@
+from datetime import timedelta
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from inventory.models import (
+    CategoryDailyMovement, Issuance, Item, ItemDailyMovement, NotificationEvent, OutboundEmail, StockHold,
+    StockLedgerEntry, StockSnapshot, Transaction,
+)
+from inventory.search import search_items
+
+
+# A whole-table scan: SQLite "SCAN inventory_item" without "USING ... INDEX",
+# PostgreSQL "Seq Scan on inventory_item"
+SQLITE_FULL_SCAN = re.compile(r'\bSCAN (\w+)$')
+PG_FULL_SCAN = re.compile(r'Seq Scan on (\w+)')
+SORT = re.compile(r'USE TEMP B-TREE FOR ORDER BY|\bSort\b')
+
+PAGE = 51
+
+
+def hot_queries():
+    """
+    ``(label, queryset, sort allowed)`` for the main query of each view,
+    built the way the views build them.
+    """
+    # The list views show each item's reorder recommendation
+    listed = Item.objects.select_related('reorder_recommendation')
+    return [
+        ("dashboard / inventory list", listed.order_by('serial_no')[:PAGE], False),
+        ("inventory list, next page", listed.filter(serial_no__gt=1000).order_by('serial_no')[:PAGE], False),
+        (
+            "inventory list, low stock",
+            listed.filter(quantity__gt=0, quantity__lte=F('reorder_level')).order_by('serial_no')[:PAGE],
+            False,
+        ),
+        ("inventory list, out of stock", listed.filter(quantity=0).order_by('serial_no')[:PAGE], False),
+        ("inventory list, category", listed.filter(category_ref__in=[1]).order_by('serial_no')[:PAGE], False),
+        (
+            "category filter, unlinked items",
+            Item.objects.filter(category_ref__isnull=True, category__iexact='Resistor').values('id')[:1],
+            False,
+        ),
+        # Ranked results are sorted by relevance after the index lookup
+        ("inventory search", search_items(listed, "res")[:PAGE], True),
+        ("delete imported items", Item.objects.filter(is_imported=True).values('id'), False),
+        ("transaction history", Transaction.objects.select_related('item').order_by('-date', '-id')[:11], False),
+        # Driven from the category's items; only their transactions get sorted
+        (
+            "transaction history, category",
+            Transaction.objects.select_related('item')
+            .filter(item__category_ref__in=[1]).order_by('-date', '-id')[:11],
+            True,
+        ),
+        ("issuance list", Issuance.objects.select_related('item').order_by('-issue_date', '-id')[:25], False),
+        # Driven from the category's items, as for the transaction history
+        (
+            "issuance list, category",
+            Issuance.objects.select_related('item')
+            .filter(item__category_ref__in=[1]).order_by('-issue_date', '-id')[:25],
+            True,
+        ),
+        (
+            "outstanding issuances",
+            Issuance.objects.select_related('item')
+            .filter(received=False, issue_condition='returnable').order_by('-issue_date', '-id')[:25],
+            False,
+        ),
+        (
+            "email outbox, due messages",
+            OutboundEmail.objects.filter(status=OutboundEmail.PENDING, next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at', 'id')[:50],
+            True,
+        ),
+        (
+            "stock holds, expired",
+            StockHold.objects.filter(expires_at__lte=timezone.now()).values_list('pk', flat=True)[:200],
+            False,
+        ),
+        (
+            "stock ledger, item snapshot",
+            StockSnapshot.objects.filter(item=1, taken_at__lte=timezone.now()).order_by('-taken_at', '-id')[:1],
+            False,
+        ),
+        (
+            "stock ledger, item tail",
+            StockLedgerEntry.objects.filter(item=1, pk__gt=1000, created_at__lte=timezone.now()).values('delta'),
+            False,
+        ),
+        (
+            "stock ledger, item history",
+            StockLedgerEntry.objects.filter(item=1, created_at__gt=timezone.now() - timedelta(days=30))
+            .order_by('created_at', 'id'),
+            False,
+        ),
+        ("stock ledger, latest snapshot run", StockSnapshot.objects.order_by('-taken_at', '-id')[:1], False),
+        # Grouped by day after the range read: at most days x categories rows
+        (
+            "movement chart, all items",
+            CategoryDailyMovement.objects.filter(day__gte=timezone.localdate() - timedelta(days=29))
+            .values('day').annotate(units=Sum('units_in')),
+            True,
+        ),
+        (
+            "movement chart, category",
+            CategoryDailyMovement.objects.filter(category='Resistor', day__gte=timezone.localdate() - timedelta(days=29))
+            .values('day').annotate(units=Sum('units_in')),
+            True,
+        ),
+        (
+            "movement chart, item",
+            ItemDailyMovement.objects.filter(item=1, day__gte=timezone.localdate() - timedelta(days=29))
+            .values('day').annotate(units=Sum('units_in')),
+            True,
+        ),
+        (
+            "reorder forecast, movements of an id range",
+            ItemDailyMovement.objects.filter(
+                item__gte=1, item__lt=5001, day__gte=timezone.localdate() - timedelta(days=90)
+            ).order_by().values_list('item', 'day', 'units_out', 'issued', 'returned'),
+            False,
+        ),
+        (
+            "digest, buffered events",
+            NotificationEvent.objects.filter(flushed_at__isnull=True).order_by('created_at')[:1],
+            False,
+        ),
+    ]
+
+
+def explain(queryset):
+    if connection.vendor == 'postgresql':
+        with transaction.atomic():
+            # Tiny dev tables make a seq scan cheapest; ask whether an index *can* serve the query
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+            return queryset.explain()
+    return queryset.explain()
+
+
+def problems(plan, sort_allowed):
+    pattern = PG_FULL_SCAN if connection.vendor == 'postgresql' else SQLITE_FULL_SCAN
+    found = [f"full scan of {m.group(1)}" for line in plan.splitlines() if (m := pattern.search(line.strip()))]
+    if not sort_allowed and SORT.search(plan):
+        found.append("sorts instead of reading in index order")
+    return found
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN the main query of each view and fail if one scans a whole table instead of using an index."
+
+    def handle(self, *args, **options):
+        failures = 0
+        for label, queryset, sort_allowed in hot_queries():
+            plan = explain(queryset)
+            found = problems(plan, sort_allowed)
+            failures += bool(found)
+
+            status = "FAIL" if found else "ok"
+            self.stdout.write(f"{status:>4}  {label}" + (f": {'; '.join(found)}" if found else ""))
+            if found or options['verbosity'] > 1:
+                for line in plan.splitlines():
+                    self.stdout.write(f"        {line}")
+
+        if failures:
+            raise CommandError(f"{failures} query plan(s) don't use an index.")
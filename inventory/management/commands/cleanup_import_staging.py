@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from inventory.staging import cleanup
+
+
+class Command(BaseCommand):
+    help = "Remove expired or over-quota files from the import staging store."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ttl', type=int, default=None, help="Override IMPORT_STAGING_TTL (seconds).")
+
+    def handle(self, *args, **options):
+        removed = cleanup(ttl=options['ttl'])
+        self.stdout.write(f"Removed {removed} staged file(s).")
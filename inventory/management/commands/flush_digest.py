@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from inventory.digest import flush
+
+
+class Command(BaseCommand):
+    help = "Send the buffered issue/receive notifications as one digest email now."
+
+    def handle(self, *args, **options):
+        count = flush()
+        self.stdout.write(f"Queued a digest of {count} event(s)." if count else "No buffered events.")
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory import forecasting
+
+
+class Command(BaseCommand):
+    help = (
+        "Forecast every item's daily demand from the movement rollups and rewrite its "
+        "recommended reorder level and quantity (e.g. nightly from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: FORECAST_WORKERS).")
+        parser.add_argument(
+            '--chunk-size', type=int, default=None, help="Item ids per worker task (default: FORECAST_CHUNK_SIZE).",
+        )
+
+    def handle(self, *args, **options):
+        for option in ('workers', 'chunk_size'):
+            if options[option] is not None and options[option] < 1:
+                raise CommandError(f"--{option.replace('_', '-')} must be at least 1.")
+
+        started = time.perf_counter()
+        read, written = forecasting.run(workers=options['workers'], size=options['chunk_size'])
+        self.stdout.write(
+            f"Recommended reorder levels for {written} of {read} item(s) "
+            f"in {time.perf_counter() - started:.1f}s."
+        )
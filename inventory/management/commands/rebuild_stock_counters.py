@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from inventory.models import StockStatusCounter, stock_summary
+
+
+class Command(BaseCommand):
+    help = "Compare the stock-status counters with a full recount and rebuild them."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report drift (exit status 1 if any), don't rewrite the counters.",
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stored = dict(StockStatusCounter.objects.select_for_update().values_list('status', 'count'))
+            actual = stock_summary()
+
+            drift = False
+            for status, label in StockStatusCounter.STATUS_CHOICES:
+                have, want = stored.get(status), actual[status]
+                mark = "ok" if have == want else "DRIFT"
+                drift |= have != want
+                self.stdout.write(f"{label:>13}: stored {have if have is not None else '-':>8}  actual {want:>8}  {mark}")
+
+            if options['check']:
+                if drift:
+                    raise CommandError("Stock-status counters are out of date; run without --check to rebuild.")
+                return
+
+            StockStatusCounter.rebuild()
+
+        self.stdout.write(f"Rebuilt counters ({actual['total']} items).")
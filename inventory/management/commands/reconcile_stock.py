@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from inventory.ledger import reconcile
+from inventory.models import Item
+
+# Mismatches listed individually
+SHOWN = 50
+
+
+class Command(BaseCommand):
+    help = "Check every item's stored quantity against its stock ledger balance."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--replay', action='store_true',
+            help="Sum the whole ledger instead of starting from the snapshots (also checks the snapshots).",
+        )
+        parser.add_argument(
+            '--fix', action='store_true',
+            help="Append correction entries so the ledger matches the stored quantities.",
+        )
+
+    def handle(self, *args, **options):
+        drift = reconcile(fix=options['fix'], replay=options['replay'])
+        names = dict(Item.objects.filter(pk__in=[pk for pk, _, _ in drift[:SHOWN]]).values_list('pk', 'name'))
+
+        for pk, have, balance in drift[:SHOWN]:
+            label = names.get(pk, '(deleted)')
+            stored = '-' if have is None else have
+            self.stdout.write(f"  item {pk:>8} {label[:40]:<40} stored {stored:>8}  ledger {balance:>8}")
+        if len(drift) > SHOWN:
+            self.stdout.write(f"  ... and {len(drift) - SHOWN} more")
+
+        if not drift:
+            self.stdout.write("Ledger matches every item.")
+        elif options['fix']:
+            self.stdout.write(f"Wrote {len(drift)} correction entr{'y' if len(drift) == 1 else 'ies'}.")
+        else:
+            raise CommandError(f"{len(drift)} item(s) don't match the ledger; run with --fix to record corrections.")
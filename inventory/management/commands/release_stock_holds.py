@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from inventory.models import StockHold
+from inventory.reservations import release_expired
+
+
+class Command(BaseCommand):
+    help = "Put the stock of expired holds back (e.g. from cron; holds are also swept as new ones are made)."
+
+    def handle(self, *args, **options):
+        released = release_expired()
+        active = StockHold.objects.count()
+        self.stdout.write(f"Released {released} expired hold(s), {active} still active.")
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from inventory.models import OutboundEmail
+from inventory.outbox import drain
+
+
+class Command(BaseCommand):
+    help = "Send the due messages in the email outbox (e.g. from cron or after a restart)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help="Queue messages that used up their attempts again.")
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            requeued = OutboundEmail.objects.filter(status=OutboundEmail.FAILED).update(
+                status=OutboundEmail.PENDING, attempts=0, next_attempt_at=timezone.now(),
+            )
+            self.stdout.write(f"Requeued {requeued} failed message(s).")
+
+        sent, failed = drain()
+        waiting = OutboundEmail.objects.filter(status=OutboundEmail.PENDING).count()
+        self.stdout.write(f"Sent {sent}, failed {failed}, {waiting} waiting for retry.")
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from inventory.mailsink import MailSink
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a local SMTP stand-in that accepts and prints messages instead of "
+        "delivering them. Point the app at it with "
+        "EMAIL_HOST=localhost EMAIL_PORT=1025 EMAIL_USE_TLS=0."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='localhost')
+        parser.add_argument('--port', type=int, default=1025)
+        parser.add_argument('--fail-next', type=int, default=0, help="Reject the first N messages with a temporary error.")
+
+    def handle(self, *args, **options):
+        def show(sender, recipients, message):
+            self.stdout.write(f"{sender} -> {', '.join(recipients)}: {message['Subject']}")
+
+        sink = MailSink(options['host'], options['port'], on_message=show)
+        sink.fail_next = options['fail_next']
+        self.stdout.write(f"SMTP sink listening on {options['host']}:{sink.port} (Ctrl+C to stop)")
+        try:
+            sink.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            sink.server_close()
@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from inventory.ledger import take_snapshots
+from inventory.models import StockSnapshot
+
+
+class Command(BaseCommand):
+    help = "Checkpoint the ledger balance of every item that changed since the last run (e.g. hourly from cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--settle', type=float, default=None,
+            help="Leave entries younger than this many seconds for the next run "
+                 "(default: STOCK_SNAPSHOT_SETTLE_SECONDS).",
+        )
+
+    def handle(self, *args, **options):
+        settle = None if options['settle'] is None else timedelta(seconds=options['settle'])
+        written = take_snapshots(settle=settle)
+        self.stdout.write(f"Wrote {written} snapshot(s), {StockSnapshot.objects.count()} in total.")
@@ -0,0 +1,252 @@
+"""
+Merge (upsert) mode for the import wizard.
+
+Rows are matched to existing items on a natural key through an
+in-memory index built with a single query. New rows go through the bulk
+importer, changed rows through ``bulk_update`` and unchanged rows are
+only counted. A dry run computes the same diff without writing.
+
+The index is a snapshot taken when the job starts. Stock keeps moving
+while a job runs, so matched rows are read again under a row lock when
+a chunk is applied. The final diff, ledger entries and status counters
+come from those locked values.
+"""
+from collections import Counter
+from decimal import Decimal
+
+from django.db import transaction
+
+from .importer import ROW_DEFAULTS, bulk_import, coerce_columns, rejection
+from .models import Item, StockLedgerEntry, StockStatusCounter
+from . import autocomplete, categories, valuation
+
+
+MATCH_KEYS = {
+    'name_category': 'Name + Category',
+    'serial_no': 'Serial No.',
+}
+
+# Fields a merge may overwrite on an existing item
+UPDATABLE_FIELDS = ('name', 'category', 'quantity', 'reorder_level', 'unit_price', 'location')
+
+UPDATE_BATCH_SIZE = 500
+PREVIEW_SAMPLES = 20
+
+
+def normalize_text(value):
+    return ' '.join(str(value or '').split()).casefold()
+
+
+def row_key(match_key, kw):
+    """
+    Natural key of a coerced row, or None when the row has no key.
+    """
+    if match_key == 'serial_no':
+        return kw.get('serial_no')
+
+    if not kw.get('name'):
+        return None
+    return (normalize_text(kw['name']), normalize_text(kw.get('category') or ROW_DEFAULTS['category']))
+
+
+def _same(field, current, new):
+    if field == 'unit_price':
+        return Decimal(str(current or 0)).quantize(Decimal('0.01')) == Decimal(str(new)).quantize(Decimal('0.01'))
+    if field == 'location':
+        return (current or '') == (new or '')
+    return current == new
+
+
+class NaturalKeyIndex:
+    """
+    ``natural key -> (item id, {field: value})`` for the whole catalog,
+    loaded with one ``values_list`` query.
+    """
+
+    def __init__(self, match_key):
+        if match_key not in MATCH_KEYS:
+            raise ValueError(f"Unknown match key: {match_key}")
+
+        self.match_key = match_key
+        self.entries = {}
+        # key -> file row number, to reject duplicate keys across chunks
+        self.seen = {}
+
+        columns = ('id', 'serial_no') + UPDATABLE_FIELDS
+        for row in Item.objects.values_list(*columns).iterator(chunk_size=5000):
+            pk, serial_no = row[0], row[1]
+            values = dict(zip(UPDATABLE_FIELDS, row[2:]))
+            key = row_key(match_key, {'serial_no': serial_no, **values})
+            if key is not None:
+                # Keep the oldest item if the catalog already holds duplicates
+                self.entries.setdefault(key, (pk, values))
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def add(self, key, pk, values):
+        self.entries[key] = (pk, values)
+
+    def claim(self, key, number):
+        """
+        Record that file row ``number`` uses ``key``; return the earlier
+        row number if the key was already used in this file.
+        """
+        earlier = self.seen.get(key)
+        if earlier is None:
+            self.seen[key] = number
+        return earlier
+
+
+def locked_values(pks):
+    """
+    ``{item id: {field: value}}`` for ``pks``, locked for the rest of the
+    transaction.
+    """
+    pks = list(pks)
+    stored = {}
+    for offset in range(0, len(pks), UPDATE_BATCH_SIZE):
+        rows = (
+            Item.objects.select_for_update()
+            .filter(pk__in=pks[offset:offset + UPDATE_BATCH_SIZE])
+            .values_list('id', *UPDATABLE_FIELDS)
+        )
+        stored.update((row[0], dict(zip(UPDATABLE_FIELDS, row[1:]))) for row in rows)
+    return stored
+
+
+def empty_summary():
+    return {
+        'inserts': 0,
+        'updates': 0,
+        'unchanged': 0,
+        'insert_samples': [],
+        'update_samples': [],
+    }
+
+
+def merge_frame(df, mapping, index, start=1, dry_run=False, summary=None):
+    """
+    Diff one DataFrame chunk against ``index`` and (unless ``dry_run``)
+    apply it. Returns ``(created, updated, unchanged, errors)`` and adds
+    counts and preview samples to ``summary``.
+    """
+    summary = summary if summary is not None else empty_summary()
+    match_key = index.match_key
+
+    rows, errors = coerce_columns(
+        df, mapping, start=start,
+        require_name=(match_key != 'serial_no'),
+        fill_defaults=False,
+    )
+
+    mapped = [f for f in UPDATABLE_FIELDS if f in mapping.values()]
+    # Key fields already match (after normalisation); don't churn their casing
+    compared = [f for f in mapped if match_key != 'name_category' or f not in ('name', 'category')]
+    inserts = []
+    updates = []
+    unchanged = 0
+
+    for number, kw in rows:
+        key = row_key(match_key, kw)
+
+        earlier = index.claim(key, number) if key is not None else None
+        if earlier is not None:
+            errors.append(rejection(number, None, None, f"duplicate of row {earlier} in this file"))
+            continue
+
+        match = index.get(key) if key is not None else None
+
+        if match is None:
+            if not kw.get('name'):
+                errors.append(rejection(number, 'name', '', "is required for new items"))
+                continue
+
+            new = {f: kw.get(f) for f in UPDATABLE_FIELDS}
+            for field, default in ROW_DEFAULTS.items():
+                if new.get(field) is None:
+                    new[field] = default
+            inserts.append((number, key, new))
+            continue
+
+        pk, current = match
+        changes = {
+            f: (current[f], kw[f])
+            for f in compared
+            if kw.get(f) is not None and not _same(f, current[f], kw[f])
+        }
+
+        if not changes:
+            unchanged += 1
+            continue
+
+        updates.append((number, key, pk, current, changes, kw))
+
+    summary['inserts'] += len(inserts)
+    summary['updates'] += len(updates)
+    summary['unchanged'] += unchanged
+
+    for number, _, new in inserts[:PREVIEW_SAMPLES - len(summary['insert_samples'])]:
+        summary['insert_samples'].append({'row': number, 'name': new['name'], 'category': new['category']})
+
+    for number, _, pk, current, changes, _ in updates[:PREVIEW_SAMPLES - len(summary['update_samples'])]:
+        summary['update_samples'].append({
+            'row': number,
+            'item_id': pk,
+            'name': current['name'],
+            'changes': {f: [str(old), str(new)] for f, (old, new) in changes.items()},
+        })
+
+    if dry_run:
+        errors.sort(key=lambda e: e['row'])
+        return 0, 0, unchanged, errors
+
+    with transaction.atomic():
+        created, insert_errors = bulk_import(
+            [(number, new) for number, _, new in inserts]
+        )
+        errors.extend(insert_errors)
+
+        # The index is a snapshot from the start of the job: diff against
+        # the rows as they are now, locked so no stock movement lands in between
+        stored = locked_values(pk for _, _, pk, _, _, _ in updates)
+
+        objs = []
+        statuses = Counter()
+        moves = []
+        for number, key, pk, _, _, kw in updates:
+            current = stored.get(pk)
+            if current is None:
+                errors.append(rejection(number, None, None, "matched item was deleted during the import"))
+                continue
+
+            changes = {f: kw[f] for f in compared if kw.get(f) is not None and not _same(f, current[f], kw[f])}
+            values = {**current, **changes}
+            index.add(key, pk, values)
+            if not changes:
+                unchanged += 1
+                continue
+
+            objs.append(Item(pk=pk, **values))
+            # From the locked row: the snapshot may show a status the item has since left
+            statuses[StockStatusCounter.classify(current['quantity'], current['reorder_level'])] -= 1
+            statuses[StockStatusCounter.classify(values['quantity'], values['reorder_level'])] += 1
+            if 'quantity' in changes:
+                moves.append((pk, values['quantity'] - current['quantity'], StockLedgerEntry.MERGED))
+
+        if objs:
+            fields = list(compared)
+            if 'category' in compared:
+                categories.assign(objs)
+                fields.append('category_ref')
+                # The old categories aren't known here
+                categories.invalidate()
+
+            Item.objects.bulk_update(objs, fields, batch_size=UPDATE_BATCH_SIZE)
+            StockStatusCounter.apply(statuses)
+            StockLedgerEntry.record_many(moves)
+            autocomplete.refresh(obj.pk for obj in objs)
+            valuation.invalidate()
+
+    errors.sort(key=lambda e: e['row'])
+    return created, len(objs), unchanged, errors
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-18 02:47
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_item_serial(apps, schema_editor):
+    Item = apps.get_model('inventory', 'Item')
+    SerialCounter = apps.get_model('inventory', 'SerialCounter')
+
+    last_serial = Item.objects.aggregate(max_serial=Max('serial_no'))['max_serial'] or 0
+    SerialCounter.objects.update_or_create(
+        name='item_serial',
+        defaults={'value': last_serial},
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0009_alter_issuance_component_status_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SerialCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_item_serial, migrations.RunPython.noop),
+    ]
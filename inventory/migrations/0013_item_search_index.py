@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from inventory.search import drop_index, install_index
+
+
+def create_search_index(apps, schema_editor):
+    install_index(schema_editor.connection)
+
+
+def remove_search_index(apps, schema_editor):
+    drop_index(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0012_importjob_merge_mode'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, remove_search_index),
+    ]
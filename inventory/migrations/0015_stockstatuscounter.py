@@ -0,0 +1,38 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:15
+
+from django.db import migrations, models
+from django.db.models import Count, F, Q
+
+
+def seed_stock_counters(apps, schema_editor):
+    Item = apps.get_model('inventory', 'Item')
+    StockStatusCounter = apps.get_model('inventory', 'StockStatusCounter')
+
+    summary = Item.objects.aggregate(
+        total=Count('id'),
+        out_of_stock=Count('id', filter=Q(quantity=0)),
+        low_stock=Count('id', filter=Q(quantity__gt=0, quantity__lte=F('reorder_level'))),
+    )
+    summary['in_stock'] = summary['total'] - summary['out_of_stock'] - summary['low_stock']
+
+    for status in ('in_stock', 'low_stock', 'out_of_stock'):
+        StockStatusCounter.objects.update_or_create(status=status, defaults={'count': summary[status]})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0014_itemsearchentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('in_stock', 'In Stock'), ('low_stock', 'Low Stock'), ('out_of_stock', 'Out of Stock')], max_length=20, unique=True)),
+                ('count', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_stock_counters, migrations.RunPython.noop),
+    ]
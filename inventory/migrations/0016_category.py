@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_categories(apps, schema_editor):
+    Item = apps.get_model('inventory', 'Item')
+    Category = apps.get_model('inventory', 'Category')
+
+    names = (
+        Item.objects.exclude(category='')
+        .values_list('category', flat=True)
+        .distinct()
+    )
+    Category.objects.bulk_create([Category(name=name) for name in names], ignore_conflicts=True)
+
+    # One UPDATE per category, not per item
+    for pk, name in Category.objects.values_list('id', 'name'):
+        Item.objects.filter(category=name).update(category_ref=pk)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0015_stockstatuscounter'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Category',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'verbose_name_plural': 'categories',
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='category_ref',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='items', to='inventory.category'),
+        ),
+        migrations.RunPython(link_categories, migrations.RunPython.noop),
+    ]
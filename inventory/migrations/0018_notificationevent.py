@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0017_outboundemail'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('issued', 'Issued'), ('received', 'Received')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('flushed_at', models.DateTimeField(blank=True, null=True)),
+                ('batch', models.CharField(blank=True, db_index=True, max_length=32)),
+                ('issuance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notification_events', to='inventory.issuance')),
+            ],
+            options={
+                'ordering': ['created_at'],
+                'indexes': [models.Index(fields=['flushed_at', 'created_at'], name='inventory_notify_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0018_notificationevent'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='item',
+            name='category_ref',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='items', to='inventory.category'),
+        ),
+        migrations.AddIndex(
+            model_name='issuance',
+            index=models.Index(fields=['issue_date', 'id'], name='inventory_issuance_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issuance',
+            index=models.Index(condition=models.Q(('received', False)), fields=['issue_date', 'id'], name='inventory_issuance_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['category_ref', 'serial_no'], name='inventory_item_cat_serial_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('quantity__gt', 0), ('quantity__lte', models.F('reorder_level'))), fields=['serial_no'], name='inventory_item_low_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('quantity', 0)), fields=['serial_no'], name='inventory_item_out_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(condition=models.Q(('is_imported', True)), fields=['id'], name='inventory_item_imported_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='transaction',
+            index=models.Index(fields=['date', 'id'], name='inventory_txn_date_idx'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def open_ledger(apps, schema_editor):
+    # Existing stock has no history: start every item's ledger at its current quantity
+    Item = apps.get_model('inventory', 'Item')
+    StockLedgerEntry = apps.get_model('inventory', 'StockLedgerEntry')
+
+    entries = (
+        StockLedgerEntry(item_id=pk, delta=quantity, reason='opening')
+        for pk, quantity in Item.objects.filter(quantity__gt=0).values_list('pk', 'quantity').iterator()
+    )
+    StockLedgerEntry.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0021_stock_hold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockLedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.BigIntegerField()),
+                ('reason', models.CharField(choices=[('opening', 'Opening balance'), ('created', 'Created'), ('imported', 'Imported'), ('edited', 'Edited'), ('merged', 'Merged from import'), ('stock_in', 'Stock in'), ('stock_out', 'Stock out'), ('issued', 'Issued'), ('received', 'Received back'), ('held', 'Held'), ('released', 'Hold released'), ('batch', 'Batch adjustment'), ('adjusted', 'Adjusted'), ('deleted', 'Deleted'), ('correction', 'Reconciliation correction')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('item', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='ledger_entries', to='inventory.item')),
+            ],
+            options={
+                'verbose_name_plural': 'stock ledger entries',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['item', 'id'], name='inventory_ledger_item_idx'), models.Index(fields=['item', 'created_at'], name='inventory_ledger_item_time_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.BigIntegerField()),
+                ('entry_id', models.BigIntegerField()),
+                ('taken_at', models.DateTimeField()),
+                ('item', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='snapshots', to='inventory.item')),
+            ],
+            options={
+                'ordering': ['taken_at', 'id'],
+                'indexes': [models.Index(fields=['item', 'taken_at'], name='inventory_snapshot_item_idx'), models.Index(fields=['taken_at'], name='inventory_snapshot_time_idx')],
+            },
+        ),
+        migrations.RunPython(open_ledger, migrations.RunPython.noop),
+    ]
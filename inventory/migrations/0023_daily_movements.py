@@ -0,0 +1,49 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0022_stock_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CategoryDailyMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('units_in', models.BigIntegerField(default=0)),
+                ('units_out', models.BigIntegerField(default=0)),
+                ('issued', models.BigIntegerField(default=0)),
+                ('returned', models.BigIntegerField(default=0)),
+                ('lost', models.BigIntegerField(default=0)),
+                ('category', models.CharField(blank=True, max_length=100)),
+            ],
+            options={
+                'ordering': ['day'],
+                'indexes': [models.Index(fields=['day'], name='inventory_movement_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('category', 'day'), name='inventory_category_day_movement')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ItemDailyMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('units_in', models.BigIntegerField(default=0)),
+                ('units_out', models.BigIntegerField(default=0)),
+                ('issued', models.BigIntegerField(default=0)),
+                ('returned', models.BigIntegerField(default=0)),
+                ('lost', models.BigIntegerField(default=0)),
+                ('item', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='daily_movements', to='inventory.item')),
+            ],
+            options={
+                'ordering': ['day'],
+                'constraints': [models.UniqueConstraint(fields=('item', 'day'), name='inventory_item_day_movement')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-18 03:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0023_daily_movements'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReorderRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('daily_demand', models.FloatField()),
+                ('average_7_days', models.FloatField()),
+                ('average_28_days', models.FloatField()),
+                ('demand_std', models.FloatField()),
+                ('days_observed', models.PositiveIntegerField()),
+                ('reorder_level', models.PositiveIntegerField()),
+                ('reorder_quantity', models.PositiveIntegerField()),
+                ('computed_at', models.DateTimeField()),
+                ('item', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='reorder_recommendation', to='inventory.item')),
+            ],
+        ),
+    ]
@@ -0,0 +1,42 @@
+from django.db import migrations, models
+from django.db.models import Max
+
+
+BATCH_SIZE = 1000
+
+
+def backfill_serials(apps, schema_editor):
+    """
+    Give items saved before serial numbers existed the next serials from
+    the counter, in id order.
+    """
+    Item = apps.get_model('inventory', 'Item')
+    SerialCounter = apps.get_model('inventory', 'SerialCounter')
+
+    missing = list(Item.objects.filter(serial_no__isnull=True).order_by('pk'))
+    if not missing:
+        return
+
+    counter = SerialCounter.objects.filter(name='item_serial').values_list('value', flat=True).first() or 0
+    last = max(counter, Item.objects.aggregate(max_serial=Max('serial_no'))['max_serial'] or 0)
+    for offset, item in enumerate(missing, 1):
+        item.serial_no = last + offset
+    Item.objects.bulk_update(missing, ['serial_no'], batch_size=BATCH_SIZE)
+
+    SerialCounter.objects.update_or_create(name='item_serial', defaults={'value': last + len(missing)})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0024_reorder_recommendations'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_serials, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='item',
+            name='serial_no',
+            field=models.PositiveIntegerField(editable=False, unique=True),
+        ),
+    ]
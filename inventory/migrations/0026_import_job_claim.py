@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 04:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0025_item_serial_not_null'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='applied_job',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='inventory.importjob'),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='owner',
+            field=models.CharField(blank=True, max_length=32),
+        ),
+    ]
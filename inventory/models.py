@@ -1,9 +1,249 @@
-from django.db import models, transaction
-from django.db.models import Max, F
+from contextlib import contextmanager
+import threading
+
+from django.db import models, transaction, IntegrityError, connections, router
+from django.db.models import Count, Max, F, Q
 from django.utils import timezone
-from django.db.models.signals import post_delete
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
+from . import autocomplete, categories, valuation
+
+
+class SerialCounter(models.Model):
+    """
+    Named counter row used to hand out serial numbers, and to hold the
+    version numbers that tell every process to reload a cached table
+    (``inventory.categories``, ``inventory.valuation``).
+
+    Allocation is a single ``UPDATE ... SET value = value + n RETURNING value``
+    on one row, so it costs O(1) no matter how large the items table grows.
+    Concurrent writers serialize on that one row only, and a reserved range
+    is never handed out twice.
+    """
+
+    name = models.CharField(max_length=50, unique=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    ITEM_SERIAL = 'item_serial'
+
+    def __str__(self):
+        return f"{self.name} = {self.value}"
+
+    @classmethod
+    def current(cls, name):
+        """
+        Value of counter ``name`` (0 before its first allocation).
+        """
+        return cls.objects.filter(name=name).values_list('value', flat=True).first() or 0
+
+    @classmethod
+    def allocate(cls, count=1, name=ITEM_SERIAL):
+        """
+        Reserve ``count`` consecutive numbers and return the first one.
+        """
+        if count < 1:
+            raise ValueError("count must be at least 1")
+
+        last = cls._bump(name, count)
+        if last is None:
+            cls._seed(name)
+            last = cls._bump(name, count)
+
+        return last - count + 1
+
+    @classmethod
+    def _bump(cls, name, count):
+        """
+        Increment the counter and return its new value (None if missing).
+        """
+        conn = connections[router.db_for_write(cls)]
+
+        # UPDATE ... RETURNING does it in one statement where supported
+        if conn.features.can_return_columns_from_insert:
+            table = conn.ops.quote_name(cls._meta.db_table)
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"UPDATE {table} SET value = value + %s WHERE name = %s RETURNING value",
+                    [count, name],
+                )
+                row = cursor.fetchone()
+            return row[0] if row else None
+
+        with transaction.atomic(using=conn.alias):
+            if not cls.objects.filter(name=name).update(value=F('value') + count):
+                return None
+            return cls.objects.filter(name=name).values_list('value', flat=True).get()
+
+    @classmethod
+    def _seed(cls, name):
+        """
+        Create a missing counter, starting after the current max serial.
+        """
+        start = 0
+        if name == cls.ITEM_SERIAL:
+            start = Item.objects.aggregate(max_serial=Max('serial_no'))['max_serial'] or 0
+
+        try:
+            with transaction.atomic():
+                cls.objects.create(name=name, value=start)
+        except IntegrityError:
+            # Another writer created it first
+            pass
+
+
+class StockStatusCounter(models.Model):
+    """
+    Number of items per stock status, so the dashboard reads three rows
+    instead of scanning the items table.
+
+    Every path that changes ``quantity`` / ``reorder_level`` reports the
+    status transition through ``track()`` / ``apply()`` in the same
+    transaction; most stock movements don't change status and write
+    nothing here. ``rebuild()`` recomputes the rows from scratch.
+    """
+
+    IN_STOCK = 'in_stock'
+    LOW_STOCK = 'low_stock'
+    OUT_OF_STOCK = 'out_of_stock'
+
+    STATUS_CHOICES = [
+        (IN_STOCK, 'In Stock'),
+        (LOW_STOCK, 'Low Stock'),
+        (OUT_OF_STOCK, 'Out of Stock'),
+    ]
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, unique=True)
+    count = models.BigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.status} = {self.count}"
+
+    @classmethod
+    def classify(cls, quantity, reorder_level):
+        if quantity == 0:
+            return cls.OUT_OF_STOCK
+        if quantity <= reorder_level:
+            return cls.LOW_STOCK
+        return cls.IN_STOCK
+
+    # Deltas collected inside ``batched()`` blocks, per thread
+    _batch = threading.local()
+
+    @classmethod
+    @contextmanager
+    def batched(cls):
+        """
+        Sum the changes recorded inside the block (e.g. the per-object
+        delete signals of a bulk delete) and apply them as one update.
+        """
+        if getattr(cls._batch, 'deltas', None) is not None:
+            yield
+            return
+
+        cls._batch.deltas = {}
+        try:
+            with transaction.atomic():
+                yield
+                deltas, cls._batch.deltas = cls._batch.deltas, None
+                cls.apply(deltas)
+        finally:
+            cls._batch.deltas = None
+
+    @classmethod
+    def apply(cls, deltas):
+        """
+        Add ``{status: delta}`` to the counters.
+        """
+        deltas = {status: delta for status, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        pending = getattr(cls._batch, 'deltas', None)
+        if pending is not None:
+            for status, delta in deltas.items():
+                pending[status] = pending.get(status, 0) + delta
+            return
+
+        with transaction.atomic():
+            for status, delta in deltas.items():
+                if not cls.objects.filter(status=status).update(count=F('count') + delta):
+                    # Counters were never seeded (or were flushed): the
+                    # table already holds this change, so count it fresh
+                    cls.rebuild()
+                    return
+
+    @classmethod
+    def track(cls, old, new):
+        """
+        Record one item going from ``old`` to ``new`` ``(quantity,
+        reorder_level)``; ``None`` means created / deleted.
+        """
+        deltas = {}
+        if old is not None:
+            status = cls.classify(*old)
+            deltas[status] = deltas.get(status, 0) - 1
+        if new is not None:
+            status = cls.classify(*new)
+            deltas[status] = deltas.get(status, 0) + 1
+        cls.apply(deltas)
+
+    @classmethod
+    def snapshot(cls):
+        """
+        ``{'total', 'in_stock', 'low_stock', 'out_of_stock'}`` from the
+        counter rows (one tiny query).
+        """
+        counts = dict(cls.objects.values_list('status', 'count'))
+        if len(counts) < len(cls.STATUS_CHOICES):
+            counts = cls.rebuild()
+        return {**counts, 'total': sum(counts.values())}
+
+    @classmethod
+    def rebuild(cls):
+        """
+        Recount from the items table and overwrite the counter rows.
+        """
+        summary = stock_summary()
+        counts = {status: summary[status] for status, _ in cls.STATUS_CHOICES}
+
+        with transaction.atomic():
+            for status, count in counts.items():
+                cls.objects.update_or_create(status=status, defaults={'count': count})
+        return counts
+
+
+def stock_summary(queryset=None):
+    """
+    Item totals per stock status in a single conditional-aggregate query.
+    """
+    queryset = Item.objects.all() if queryset is None else queryset
+    summary = queryset.aggregate(
+        total=Count('id'),
+        out_of_stock=Count('id', filter=Q(quantity=0)),
+        low_stock=Count('id', filter=Q(quantity__gt=0, quantity__lte=F('reorder_level'))),
+    )
+    summary['in_stock'] = summary['total'] - summary['out_of_stock'] - summary['low_stock']
+    return summary
+
+
+class Category(models.Model):
+    """
+    Lookup row for an item category. ``Item.category`` keeps the text
+    for display and search; ``Item.category_ref`` points here so the
+    category list and filters don't scan the items table. Rows are
+    created on demand through ``inventory.categories``.
+    """
+
+    name = models.CharField(max_length=100, unique=True)
+
+    class Meta:
+        ordering = ['name']
+        verbose_name_plural = 'categories'
+
+    def __str__(self):
+        return self.name
+
 
 class Item(models.Model):
     """
@@ -12,12 +252,19 @@ class Item(models.Model):
 
     serial_no = models.PositiveIntegerField(
         unique=True,
-        null=True,          # kept nullable ONLY for existing rows
         editable=False
     )
 
     name = models.CharField(max_length=200)
     category = models.CharField(max_length=100)
+    category_ref = models.ForeignKey(
+        Category,
+        on_delete=models.PROTECT,
+        related_name='items',
+        null=True,          # items without a category
+        editable=False,
+        db_index=False,     # covered by inventory_item_cat_serial_idx
+    )
 
     quantity = models.PositiveIntegerField(default=0)
     reorder_level = models.PositiveIntegerField()
@@ -29,34 +276,202 @@ class Item(models.Model):
 
     is_imported = models.BooleanField(default=False)
 
+    class Meta:
+        # Each list view filters, then reads in serial_no order
+        indexes = [
+            models.Index(fields=['category_ref', 'serial_no'], name='inventory_item_cat_serial_idx'),
+            models.Index(
+                fields=['serial_no'],
+                name='inventory_item_low_idx',
+                condition=Q(quantity__gt=0, quantity__lte=F('reorder_level')),
+            ),
+            models.Index(fields=['serial_no'], name='inventory_item_out_idx', condition=Q(quantity=0)),
+            models.Index(fields=['id'], name='inventory_item_imported_idx', condition=Q(is_imported=True)),
+        ]
+
     def save(self, *args, **kwargs):
         """
         Auto-generate a unique, sequential serial number.
         Concurrency-safe (Excel import, multi-user safe).
+        Keeps the category link and stock-status counters in step with
+        the change.
         """
         if self.serial_no is None:
-            with transaction.atomic():
-                last_serial = (
-                    Item.objects
-                    .select_for_update()
-                    .aggregate(max_serial=Max('serial_no'))
-                    ['max_serial']
+            self.serial_no = SerialCounter.allocate()
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'category' in update_fields:
+            categories.assign([self])
+            if update_fields is not None:
+                kwargs['update_fields'] = update_fields = {*update_fields, 'category_ref'}
+
+        if update_fields is not None and not {'quantity', 'reorder_level'} & set(update_fields):
+            super().save(*args, **kwargs)
+            return
+
+        with transaction.atomic():
+            old = None
+            if not self._state.adding and not kwargs.get('force_insert'):
+                old = (
+                    Item.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values_list('quantity', 'reorder_level')
+                    .first()
                 )
-                self.serial_no = (last_serial or 0) + 1
 
-        super().save(*args, **kwargs)
+            super().save(*args, **kwargs)
+
+            if not isinstance(self.quantity, int) or not isinstance(self.reorder_level, int):
+                # Saved with F() expressions: read back the stored values
+                self.refresh_from_db(fields=['quantity', 'reorder_level'])
+            StockStatusCounter.track(old, (self.quantity, self.reorder_level))
+
+            if old is not None:
+                reason = StockLedgerEntry.EDITED
+            else:
+                reason = StockLedgerEntry.IMPORTED if self.is_imported else StockLedgerEntry.CREATED
+            StockLedgerEntry.record(self.pk, self.quantity - (old[0] if old else 0), reason)
+
+    def delete(self, *args, **kwargs):
+        """
+        Delete with the stored quantity, so the delete signals write off
+        what is really in stock rather than a stale in-memory copy.
+        """
+        with transaction.atomic():
+            stored = (
+                Item.objects.select_for_update()
+                .filter(pk=self.pk)
+                .values_list('quantity', 'reorder_level')
+                .first()
+            )
+            if stored is not None:
+                self.quantity, self.reorder_level = stored
+            return super().delete(*args, **kwargs)
+
+    @classmethod
+    def _apply_delta(cls, pk, delta):
+        """
+        One conditional UPDATE: a decrement only matches while the item
+        still has ``-delta`` in stock, so concurrent removals can never
+        oversell and no lock is taken before the write. True if applied.
+        """
+        rows = cls.objects.filter(pk=pk)
+        if delta < 0:
+            rows = rows.filter(quantity__gte=-delta)
+        return bool(rows.update(quantity=F('quantity') + delta))
+
+    @classmethod
+    def adjust_stock(cls, pk, delta, reason='adjusted'):
+        """
+        Atomically add ``delta`` (negative to remove) to an item's
+        quantity, keeping the status counters, stock ledger (``reason`` is
+        one of ``StockLedgerEntry.REASON_CHOICES``) and autocomplete index
+        in step. Returns the new quantity, or None if the item is gone or
+        has less than ``-delta`` in stock (nothing is changed then).
+        """
+        with transaction.atomic():
+            if not cls._apply_delta(pk, delta):
+                return None
+
+            # Our UPDATE holds the row until commit: this reads our own write
+            quantity, reorder_level = cls.objects.filter(pk=pk).values_list('quantity', 'reorder_level').get()
+            StockStatusCounter.track((quantity - delta, reorder_level), (quantity, reorder_level))
+            StockLedgerEntry.record(pk, delta, reason)
+
+        autocomplete.refresh([pk])
+        return quantity
+
+    @classmethod
+    def adjust_stock_many(cls, deltas, reason='adjusted'):
+        """
+        ``adjust_stock()`` for ``{pk: delta}``: one conditional UPDATE per
+        item with its summed delta. Returns ``{pk: new quantity}`` for the
+        items changed; items that are gone or short of stock are left out
+        and unchanged, so callers that need all-or-nothing compare the
+        keys and roll back.
+        """
+        deltas = {pk: delta for pk, delta in deltas.items() if delta}
+        if not deltas:
+            return {}
+
+        with StockStatusCounter.batched():
+            applied = [pk for pk, delta in deltas.items() if cls._apply_delta(pk, delta)]
+            rows = cls.objects.filter(pk__in=applied).values_list('pk', 'quantity', 'reorder_level')
+            quantities = {}
+            for pk, quantity, reorder_level in rows:
+                StockStatusCounter.track((quantity - deltas[pk], reorder_level), (quantity, reorder_level))
+                quantities[pk] = quantity
+            StockLedgerEntry.record_many((pk, deltas[pk], reason) for pk in quantities)
+
+        autocomplete.refresh(quantities)
+        return quantities
 
     def stock_status(self):
-        if self.quantity == 0:
-            return "Out of Stock"
-        elif self.quantity <= self.reorder_level:
-            return "Low Stock"
-        return "In Stock"
+        return dict(StockStatusCounter.STATUS_CHOICES)[
+            StockStatusCounter.classify(self.quantity, self.reorder_level)
+        ]
 
     def __str__(self):
         return f"{self.serial_no} - {self.name}"
 
 
+@receiver(post_save, sender=Item)
+def index_item_name(sender, instance, **kwargs):
+    autocomplete.item_saved(sender, instance, **kwargs)
+
+
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def revalue_item(sender, instance, **kwargs):
+    # Quantity changes move the ledger; price / category / location edits don't
+    valuation.invalidate()
+
+
+@receiver(post_delete, sender=Item)
+def unindex_item_name(sender, instance, **kwargs):
+    autocomplete.item_deleted(sender, instance, **kwargs)
+
+
+@receiver(post_delete, sender=Item)
+def uncount_item(sender, instance, **kwargs):
+    StockStatusCounter.track((instance.quantity, instance.reorder_level), None)
+
+
+@receiver(post_delete, sender=Item)
+def write_off_item(sender, instance, **kwargs):
+    # The ledger outlives the item: its balance goes back to zero
+    StockLedgerEntry.record(instance.pk, -instance.quantity, StockLedgerEntry.DELETED)
+
+
+@receiver(post_delete, sender=Item)
+def forget_item_category(sender, instance, **kwargs):
+    # Its category may have lost its last item
+    categories.invalidate()
+
+
+class ItemSearchEntry(models.Model):
+    """
+    Row of the SQLite FTS5 index over item text (see ``inventory.search``).
+    Read-only: the table is created by migration and kept in sync by
+    triggers; ``rank`` is only meaningful in a query that filters on
+    ``document__match``.
+    """
+    item = models.OneToOneField(
+        Item,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_entry',
+    )
+    # FTS5's hidden column named after the table, the left side of MATCH
+    document = models.TextField(db_column='inventory_item_fts')
+    rank = models.FloatField()
+
+    class Meta:
+        managed = False
+        db_table = 'inventory_item_fts'
+
+
 class Transaction(models.Model):
     TRANSACTION_TYPES = [
         ('IN', 'Stock In'),
@@ -69,6 +484,12 @@ class Transaction(models.Model):
     date = models.DateTimeField(auto_now_add=True)
     remarks = models.TextField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            # History is read newest first: ORDER BY date DESC, id DESC
+            models.Index(fields=['date', 'id'], name='inventory_txn_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.transaction_type} - {self.item.name}"
 
@@ -118,6 +539,15 @@ class Issuance(models.Model):
 
     class Meta:
         ordering = ['-issue_date']
+        indexes = [
+            models.Index(fields=['issue_date', 'id'], name='inventory_issuance_date_idx'),
+            # Outstanding (not yet returned) issuances, newest first
+            models.Index(
+                fields=['issue_date', 'id'],
+                name='inventory_issuance_open_idx',
+                condition=Q(received=False),
+            ),
+        ]
 
     def mark_received(self, status: str, remark: str = ''):
         """
@@ -126,13 +556,449 @@ class Issuance(models.Model):
         if self.received:
             return
 
+        from . import rollups
+
         self.component_status = status
         self.remark = (self.remark + "\n" + remark).strip() if remark else self.remark
         self.receive_date = timezone.now()
         self.received = True
-        self.save(update_fields=['component_status', 'remark', 'receive_date', 'received'])
 
-        if status in ('ok', 'faulty'):
-            Item.objects.filter(pk=self.item.pk).update(
-                quantity=F('quantity') + self.quantity
-            )
+        with transaction.atomic():
+            self.save(update_fields=['component_status', 'remark', 'receive_date', 'received'])
+
+            if status in ('ok', 'faulty'):
+                Item.adjust_stock(self.item_id, self.quantity, StockLedgerEntry.RECEIVED)
+            rollups.record_received([self])
+
+
+class ImportJob(models.Model):
+    """
+    Background import of a staged upload, processed in chunks.
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    CREATE = 'create'
+    MERGE = 'merge'
+
+    MODE_CHOICES = [
+        (CREATE, 'Create new items'),
+        (MERGE, 'Merge into existing items'),
+    ]
+
+    filename = models.CharField(max_length=255)
+    token = models.CharField(max_length=64)
+    mapping = models.JSONField(default=dict)
+
+    mode = models.CharField(max_length=10, choices=MODE_CHOICES, default=CREATE)
+    match_key = models.CharField(max_length=20, blank=True)
+    dry_run = models.BooleanField(default=False)
+    # The merge job created from this dry run (at most one)
+    applied_job = models.ForeignKey('self', null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    # Token of the worker that claimed the job (inventory.jobs.claim)
+    owner = models.CharField(max_length=32, blank=True)
+
+    total_rows = models.PositiveIntegerField(default=0)
+    rows_done = models.PositiveIntegerField(default=0)
+    rows_created = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+    rows_updated = models.PositiveIntegerField(default=0)
+    rows_unchanged = models.PositiveIntegerField(default=0)
+    # Merge diff: insert/update/unchanged counts plus preview samples
+    summary = models.JSONField(default=dict, blank=True)
+    # Structured rejections: [{"row", "field", "value", "message"}, ...]
+    errors = models.JSONField(default=list, blank=True)
+    message = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Import #{self.pk} ({self.filename}) - {self.status}"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    @property
+    def throughput(self):
+        """
+        Rows processed per second so far.
+        """
+        if not self.started_at or not self.rows_done:
+            return 0.0
+        end = self.finished_at or timezone.now()
+        elapsed = (end - self.started_at).total_seconds()
+        return self.rows_done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def percent(self):
+        if self.is_finished:
+            return 100
+        if not self.total_rows:
+            return 0
+        # total_rows is an estimate until the job finishes
+        return min(int(self.rows_done * 100 / self.total_rows), 99)
+
+
+class StockHold(models.Model):
+    """
+    Stock set aside for a short time, e.g. while an issue form is filled in.
+
+    The held quantity is already taken off ``Item.quantity`` (by the same
+    conditional decrement as any other removal), so availability reads
+    need no join. A hold is either confirmed (the stock stays out) or
+    released / expired (the stock goes back); ``inventory.reservations``
+    deletes the row first, so each hold is settled exactly once.
+    """
+
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name='holds')
+    quantity = models.PositiveIntegerField()
+    reference = models.CharField(max_length=100, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['expires_at']
+        indexes = [
+            models.Index(fields=['expires_at'], name='inventory_hold_expiry_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.item_id} until {self.expires_at:%H:%M:%S}"
+
+
+class StockLedgerEntry(models.Model):
+    """
+    One change to an item's quantity.
+
+    Append-only: every path that changes ``Item.quantity`` records its
+    delta here in the same transaction (``record()`` / ``record_many()``),
+    and a wrong balance is fixed by a ``correction`` entry, never by
+    editing rows. Entries outlive their item; deleting it is itself an
+    entry that takes the balance to zero. ``inventory.ledger`` answers
+    point-in-time questions from these rows and ``StockSnapshot``
+    checkpoints.
+    """
+
+    OPENING = 'opening'
+    CREATED = 'created'
+    IMPORTED = 'imported'
+    EDITED = 'edited'
+    MERGED = 'merged'
+    STOCK_IN = 'stock_in'
+    STOCK_OUT = 'stock_out'
+    ISSUED = 'issued'
+    RECEIVED = 'received'
+    HELD = 'held'
+    RELEASED = 'released'
+    BATCH = 'batch'
+    ADJUSTED = 'adjusted'
+    DELETED = 'deleted'
+    CORRECTION = 'correction'
+
+    REASON_CHOICES = [
+        (OPENING, 'Opening balance'),
+        (CREATED, 'Created'),
+        (IMPORTED, 'Imported'),
+        (EDITED, 'Edited'),
+        (MERGED, 'Merged from import'),
+        (STOCK_IN, 'Stock in'),
+        (STOCK_OUT, 'Stock out'),
+        (ISSUED, 'Issued'),
+        (RECEIVED, 'Received back'),
+        (HELD, 'Held'),
+        (RELEASED, 'Hold released'),
+        (BATCH, 'Batch adjustment'),
+        (ADJUSTED, 'Adjusted'),
+        (DELETED, 'Deleted'),
+        (CORRECTION, 'Reconciliation correction'),
+    ]
+
+    INSERT_BATCH_SIZE = 500
+
+    # History is kept for deleted items: no FK constraint, no cascade
+    item = models.ForeignKey(
+        Item,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,     # covered by inventory_ledger_item_idx
+        related_name='ledger_entries',
+    )
+    delta = models.BigIntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name_plural = 'stock ledger entries'
+        indexes = [
+            # Replaying one item's tail after its snapshot
+            models.Index(fields=['item', 'id'], name='inventory_ledger_item_idx'),
+            # One item's history over a date range
+            models.Index(fields=['item', 'created_at'], name='inventory_ledger_item_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.delta:+} x {self.item_id} ({self.reason})"
+
+    # Rows collected inside ``batched()`` blocks, per thread
+    _batch = threading.local()
+
+    @classmethod
+    @contextmanager
+    def batched(cls):
+        """
+        Collect the entries recorded inside the block (e.g. the per-object
+        delete signals of a bulk delete) and insert them with one
+        ``bulk_create``.
+        """
+        if getattr(cls._batch, 'rows', None) is not None:
+            yield
+            return
+
+        cls._batch.rows = []
+        try:
+            with transaction.atomic():
+                yield
+                rows, cls._batch.rows = cls._batch.rows, None
+                cls.record_many(rows)
+        finally:
+            cls._batch.rows = None
+
+    @classmethod
+    def record(cls, item_id, delta, reason):
+        """
+        Append one entry (nothing for a zero ``delta``).
+        """
+        cls.record_many([(item_id, delta, reason)])
+
+    @classmethod
+    def record_many(cls, rows):
+        """
+        Append ``(item id, delta, reason)`` rows; zero deltas are skipped.
+        """
+        rows = [(pk, delta, reason) for pk, delta, reason in rows if delta]
+        if not rows:
+            return
+
+        pending = getattr(cls._batch, 'rows', None)
+        if pending is not None:
+            pending.extend(rows)
+            return
+
+        cls.objects.bulk_create(
+            [cls(item_id=pk, delta=delta, reason=reason) for pk, delta, reason in rows],
+            batch_size=cls.INSERT_BATCH_SIZE,
+        )
+
+
+class StockSnapshot(models.Model):
+    """
+    Checkpoint of an item's ledger balance: ``quantity`` is the sum of its
+    entries up to and including ``entry_id``. ``inventory.ledger.
+    take_snapshots()`` writes one row per item that changed since the
+    last run, all with the same ``taken_at`` / ``entry_id``, so a
+    point-in-time read is the latest snapshot plus a short tail of
+    entries.
+    """
+
+    item = models.ForeignKey(
+        Item,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,     # covered by inventory_snapshot_item_idx
+        related_name='snapshots',
+    )
+    quantity = models.BigIntegerField()
+    entry_id = models.BigIntegerField()
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['taken_at', 'id']
+        indexes = [
+            models.Index(fields=['item', 'taken_at'], name='inventory_snapshot_item_idx'),
+            models.Index(fields=['taken_at'], name='inventory_snapshot_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} = {self.quantity} at {self.taken_at:%Y-%m-%d %H:%M}"
+
+
+class DailyMovement(models.Model):
+    """
+    Units moved on one local day: stock in / out (``Transaction``),
+    issued, returned to stock and reported lost (``Issuance``). Kept up
+    to date by ``inventory.rollups`` in the same transaction as each
+    movement, so trend charts read a few rows per day instead of the
+    raw history.
+    """
+
+    day = models.DateField()
+    units_in = models.BigIntegerField(default=0)
+    units_out = models.BigIntegerField(default=0)
+    issued = models.BigIntegerField(default=0)
+    returned = models.BigIntegerField(default=0)
+    lost = models.BigIntegerField(default=0)
+
+    class Meta:
+        abstract = True
+
+
+class ItemDailyMovement(DailyMovement):
+    # Trends outlive the item, like the stock ledger
+    item = models.ForeignKey(
+        Item,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,     # covered by the (item, day) constraint
+        related_name='daily_movements',
+    )
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['item', 'day'], name='inventory_item_day_movement'),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} on {self.day}"
+
+
+class CategoryDailyMovement(DailyMovement):
+    # The item's category text at the time ('' for none)
+    category = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        ordering = ['day']
+        constraints = [
+            models.UniqueConstraint(fields=['category', 'day'], name='inventory_category_day_movement'),
+        ]
+        indexes = [
+            # Dashboard totals: every category over a date range
+            models.Index(fields=['day'], name='inventory_movement_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.category or '(none)'} on {self.day}"
+
+
+class ReorderRecommendation(models.Model):
+    """
+    Reorder level and quantity suggested for an item from its recent
+    daily demand (units out + issued - returned). Rewritten by every
+    ``python manage.py forecast_reorder`` run (``inventory.forecasting``);
+    the item's own ``reorder_level`` stays as a person set it.
+    """
+
+    item = models.OneToOneField(Item, on_delete=models.CASCADE, related_name='reorder_recommendation')
+
+    # Units per day: smoothed forecast, trailing averages and their spread
+    daily_demand = models.FloatField()
+    average_7_days = models.FloatField()
+    average_28_days = models.FloatField()
+    demand_std = models.FloatField()
+    days_observed = models.PositiveIntegerField()
+
+    reorder_level = models.PositiveIntegerField()
+    reorder_quantity = models.PositiveIntegerField()
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.item_id}: reorder at {self.reorder_level}, order {self.reorder_quantity}"
+
+
+class OutboundEmail(models.Model):
+    """
+    Notification email waiting to be sent (transactional outbox).
+
+    Rows are written in the same transaction as the change they report,
+    so a rolled-back issuance sends nothing and a slow or failing mail
+    server can't hold locks or roll the change back. ``inventory.outbox``
+    sends them after commit and retries failures with backoff.
+    """
+
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=255, blank=True)
+    recipients = models.JSONField(default=list)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    # Due time for pending rows; pushed forward while a sender holds the row
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='inventory_outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.recipients)} ({self.status})"
+
+
+class NotificationEvent(models.Model):
+    """
+    Issue / receive event buffered for the head's digest email
+    (``NOTIFICATION_DIGEST`` mode, see ``inventory.digest``). Events are
+    claimed by a flush through ``batch`` / ``flushed_at`` and reported
+    together in one email.
+    """
+
+    ISSUED = 'issued'
+    RECEIVED = 'received'
+
+    KIND_CHOICES = [
+        (ISSUED, 'Issued'),
+        (RECEIVED, 'Received'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    issuance = models.ForeignKey(Issuance, on_delete=models.CASCADE, related_name='notification_events')
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    flushed_at = models.DateTimeField(null=True, blank=True)
+    # Token of the flush that reported this event
+    batch = models.CharField(max_length=32, blank=True, db_index=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['flushed_at', 'created_at'], name='inventory_notify_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.issuance_id}"
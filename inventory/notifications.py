@@ -0,0 +1,120 @@
+"""
+Rendering of the head's notification emails.
+
+The messages are Django templates under ``inventory/emails/`` (HTML plus
+a plain-text alternative), compiled once per process by a private engine
+with the cached loader, whatever the project's ``DEBUG`` / loader
+settings are. ``render_issuances()`` renders a whole list of events
+through one reused context for bulk sends.
+"""
+from collections import namedtuple
+import threading
+
+from django.template import Context, Engine, engines
+from django.utils import timezone
+from django.utils.formats import date_format
+
+from .models import NotificationEvent
+
+
+Message = namedtuple('Message', 'subject text html')
+
+SUBJECTS = {
+    NotificationEvent.ISSUED: "📤 Component Issued",
+    NotificationEvent.RECEIVED: "📥 Component Received",
+}
+
+TEMPLATES = {
+    NotificationEvent.ISSUED: 'inventory/emails/issued',
+    NotificationEvent.RECEIVED: 'inventory/emails/received',
+}
+
+_engine = None
+_templates = {}
+_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    with _lock:
+        if _engine is None:
+            project = engines['django'].engine
+            _engine = Engine(
+                dirs=project.dirs,
+                app_dirs=False,
+                loaders=[('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ])],
+            )
+        return _engine
+
+
+def get_template(name):
+    """
+    Compiled template ``name``, parsed on first use only.
+    """
+    template = _templates.get(name)
+    if template is None:
+        template = _templates[name] = get_engine().get_template(name)
+    return template
+
+
+def _render_pair(base, html_context, text_context):
+    return (
+        get_template(f'{base}.txt').render(text_context),
+        get_template(f'{base}.html').render(html_context),
+    )
+
+
+def render_issuances(events, now=None):
+    """
+    ``[Message]`` for ``[(kind, issuance)]``, rendered through one pair
+    of contexts (issuances should come with ``select_related('item')``).
+    """
+    # Same timestamp for the whole batch: format it once
+    time = date_format(timezone.localtime(now), 'd M Y, H:i')
+    html_context = Context({'time': time})
+    text_context = Context({'time': time}, autoescape=False)
+
+    messages = []
+    for kind, issuance in events:
+        with html_context.push(issuance=issuance), text_context.push(issuance=issuance):
+            text, html = _render_pair(TEMPLATES[kind], html_context, text_context)
+        messages.append(Message(SUBJECTS[kind], text, html))
+    return messages
+
+
+def render_issuance(kind, issuance, now=None):
+    return render_issuances([(kind, issuance)], now)[0]
+
+
+def render_receipt(issuances, now=None):
+    """
+    One summary ``Message`` for a batch of returned issuances.
+    """
+    time = date_format(timezone.localtime(now), 'd M Y, H:i')
+    values = {
+        'issuances': issuances,
+        'total': len(issuances),
+        'quantity': sum(issuance.quantity for issuance in issuances),
+        'time': time,
+    }
+    text, html = _render_pair(
+        'inventory/emails/received_batch',
+        Context(values),
+        Context(values, autoescape=False),
+    )
+    return Message(f"📥 {len(issuances)} Components Received", text, html)
+
+
+def render_digest(rows, total, first, last):
+    """
+    ``(text, html)`` of a digest email for ``digest.summarize()`` rows.
+    """
+    values = {'rows': rows, 'total': total, 'first': first, 'last': last}
+    return _render_pair(
+        'inventory/emails/digest',
+        Context(values),
+        Context(values, autoescape=False),
+    )
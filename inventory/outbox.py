@@ -0,0 +1,271 @@
+"""
+Background sender for the email outbox.
+
+``enqueue()`` writes the message as an OutboundEmail row inside the
+caller's transaction and wakes the sender once that transaction commits.
+The sender is a single in-process thread (no external broker): it claims
+due rows in batches, sends each batch over one SMTP connection and
+reschedules failures with exponential backoff until
+``EMAIL_OUTBOX_MAX_ATTEMPTS``. Rows left behind by a restart are picked
+up by the next wake-up or by ``python manage.py send_outbox``.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import logging
+import threading
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_lock = threading.Lock()
+# A drain is queued but hasn't started yet
+_queued = False
+_timer = None
+
+
+def batch_size():
+    return getattr(settings, 'EMAIL_OUTBOX_BATCH_SIZE', 50)
+
+
+def max_attempts():
+    return getattr(settings, 'EMAIL_OUTBOX_MAX_ATTEMPTS', 5)
+
+
+def retry_delay(attempts):
+    """
+    Wait before retry number ``attempts``: 30s, 1m, 2m, ... capped.
+    """
+    base = getattr(settings, 'EMAIL_OUTBOX_RETRY_SECONDS', 30)
+    cap = getattr(settings, 'EMAIL_OUTBOX_RETRY_MAX_SECONDS', 60 * 60)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), cap))
+
+
+def lease():
+    # How long a claimed row stays invisible to other senders
+    return timedelta(seconds=getattr(settings, 'EMAIL_OUTBOX_LEASE_SECONDS', 5 * 60))
+
+
+def get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='email-outbox')
+        return _executor
+
+
+def enqueue(subject, body, recipients, html_body='', from_email=None):
+    """
+    Store a message for sending after the current transaction commits.
+    Returns the OutboundEmail, or None if there is nobody to send to.
+    """
+    recipients = [r for r in recipients if r]
+    if not recipients:
+        logger.warning("Dropping email %r: no recipients configured", subject)
+        return None
+
+    email = OutboundEmail.objects.create(
+        subject=subject[:255],
+        body=body,
+        html_body=html_body or '',
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL or '',
+        recipients=recipients,
+    )
+    wake()
+    return email
+
+
+def enqueue_many(messages, recipients, from_email=None):
+    """
+    ``enqueue()`` for ``[(subject, body, html_body)]`` with one INSERT.
+    """
+    recipients = [r for r in recipients if r]
+    if not recipients:
+        logger.warning("Dropping %s email(s): no recipients configured", len(messages))
+        return []
+
+    from_email = from_email or settings.DEFAULT_FROM_EMAIL or ''
+    emails = OutboundEmail.objects.bulk_create([
+        OutboundEmail(
+            subject=subject[:255],
+            body=body,
+            html_body=html_body or '',
+            from_email=from_email,
+            recipients=recipients,
+        )
+        for subject, body, html_body in messages
+    ])
+    if emails:
+        wake()
+    return emails
+
+
+def wake():
+    """
+    Start a drain once the current transaction commits.
+    """
+    transaction.on_commit(_submit)
+
+
+def _submit():
+    global _queued
+    with _lock:
+        if _queued:
+            return
+        _queued = True
+    get_executor().submit(_run)
+
+
+def _run():
+    global _queued
+    with _lock:
+        # Rows committed from here on need another drain
+        _queued = False
+
+    try:
+        close_old_connections()
+        drain()
+        _schedule_retry()
+    except Exception:
+        logger.exception("Email outbox drain failed")
+    finally:
+        connection.close()
+
+
+def _schedule_retry():
+    """
+    Wake up again when the earliest pending row becomes due.
+    """
+    global _timer
+
+    due = (
+        OutboundEmail.objects.filter(status=OutboundEmail.PENDING)
+        .order_by('next_attempt_at')
+        .values_list('next_attempt_at', flat=True)
+        .first()
+    )
+    if due is None:
+        return
+
+    delay = max((due - timezone.now()).total_seconds(), 0)
+    with _lock:
+        if _timer is not None:
+            _timer.cancel()
+        _timer = threading.Timer(delay, _submit)
+        _timer.daemon = True
+        _timer.start()
+
+
+def claim(limit):
+    """
+    Due pending rows, leased to this sender so no other process sends
+    them at the same time.
+    """
+    now = timezone.now()
+    due = list(
+        OutboundEmail.objects
+        .filter(status=OutboundEmail.PENDING, next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'id')[:limit]
+    )
+
+    claimed = []
+    for email in due:
+        # Conditional update: only one sender wins each row
+        won = OutboundEmail.objects.filter(
+            pk=email.pk,
+            status=OutboundEmail.PENDING,
+            next_attempt_at=email.next_attempt_at,
+        ).update(next_attempt_at=now + lease())
+        if won:
+            claimed.append(email)
+    return claimed
+
+
+def build_message(email, conn):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email or None,
+        to=email.recipients,
+        connection=conn,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, 'text/html')
+    return message
+
+
+def _mark_sent(email):
+    OutboundEmail.objects.filter(pk=email.pk).update(
+        status=OutboundEmail.SENT,
+        attempts=email.attempts + 1,
+        sent_at=timezone.now(),
+        last_error='',
+    )
+
+
+def _mark_failed(email, error):
+    attempts = email.attempts + 1
+    values = {'attempts': attempts, 'last_error': str(error)[:2000]}
+    if attempts >= max_attempts():
+        values['status'] = OutboundEmail.FAILED
+    else:
+        values['next_attempt_at'] = timezone.now() + retry_delay(attempts)
+    OutboundEmail.objects.filter(pk=email.pk).update(**values)
+    logger.warning("Email %s attempt %s failed: %s", email.pk, attempts, error)
+
+
+def send_batch(emails):
+    """
+    Send ``emails`` over one SMTP connection. Returns ``(sent, failed)``.
+    """
+    conn = get_connection(fail_silently=False)
+    try:
+        conn.open()
+    except Exception as e:
+        for email in emails:
+            _mark_failed(email, e)
+        return 0, len(emails)
+
+    sent = 0
+    try:
+        for i, email in enumerate(emails):
+            try:
+                build_message(email, conn).send()
+            except Exception as e:
+                _mark_failed(email, e)
+                # The session may be unusable after an error: start a new one
+                conn.close()
+                try:
+                    conn.open()
+                except Exception as e:
+                    for rest in emails[i + 1:]:
+                        _mark_failed(rest, e)
+                    break
+            else:
+                _mark_sent(email)
+                sent += 1
+    finally:
+        conn.close()
+
+    return sent, len(emails) - sent
+
+
+def drain():
+    """
+    Send every due message, batch by batch. Returns ``(sent, failed)``.
+    """
+    sent = failed = 0
+    while True:
+        batch = claim(batch_size())
+        if not batch:
+            return sent, failed
+        s, f = send_batch(batch)
+        sent += s
+        failed += f
@@ -0,0 +1,214 @@
+"""
+Keyset (seek) pagination.
+
+Instead of ``COUNT(*)`` plus ``OFFSET n LIMIT k`` (which gets slower the
+deeper the page), each page is fetched with a ``WHERE`` on the sort key
+of the row it continues from, e.g. ``serial_no > 1234`` for items or
+``(date, id) < (d, 42)`` for transactions, so every page costs the same.
+The position travels in a signed, opaque ``cursor`` token.
+"""
+import datetime
+import decimal
+import json
+
+from django.core import signing
+from django.db import connections
+from django.db.models import Q
+
+
+SIGNING_SALT = 'inventory.pagination'
+
+# Filtered lists are counted up to this many rows, then shown as "N+"
+COUNT_CAP = 1000
+
+# How ``KeysetPage.estimated_total`` was obtained
+EXACT, AT_LEAST, ABOUT = 'exact', 'at_least', 'about'
+
+
+class KeysetPage:
+    """
+    One page of results; iterable like a Django ``Page``.
+    """
+
+    def __init__(self, object_list, token, next_token, previous_token, total=None, total_kind=EXACT):
+        self.object_list = object_list
+        self.token = token
+        self.next_token = next_token
+        self.previous_token = previous_token
+        self.estimated_total = total
+        self.total_kind = total_kind
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_token is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_token is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+class KeysetPaginator:
+    """
+    Seek through ``queryset`` in its own ``order_by``, which must end in
+    a unique field (e.g. ``('serial_no',)`` or ``('-date', '-id')``).
+    Ordering by an annotation (such as a search rank) works too.
+
+    With ``estimate=True`` pages carry a total that is exact up to
+    ``COUNT_CAP`` rows and a bound or estimate above it.
+    """
+
+    def __init__(self, queryset, per_page=50, estimate=False):
+        self.ordering = [f for f in queryset.query.order_by if isinstance(f, str)]
+        if not self.ordering:
+            raise ValueError("KeysetPaginator needs an ordered queryset")
+
+        self.queryset = queryset
+        self.per_page = per_page
+        self.estimate = estimate
+        self.fields = [f.lstrip('-') for f in self.ordering]
+        # ``'pk'`` sorts fine but isn't an attribute name on every model row
+        self.attrs = ['pk' if f in ('pk', 'id') else f for f in self.fields]
+
+    def _key(self, obj):
+        return [getattr(obj, attr) for attr in self.attrs]
+
+    def _encode(self, direction, obj):
+        return signing.dumps(
+            {'d': direction, 'k': self._key(obj)},
+            salt=SIGNING_SALT,
+            compress=True,
+            serializer=_Serializer,
+        )
+
+    def _decode(self, token):
+        try:
+            data = signing.loads(token, salt=SIGNING_SALT, serializer=_Serializer)
+        except signing.BadSignature:
+            return None, None
+
+        key = data.get('k')
+        if data.get('d') not in ('after', 'before') or not isinstance(key, list) or len(key) != len(self.fields):
+            return None, None
+        return data['d'], key
+
+    def _seek(self, key, forward):
+        """
+        Rows after ``key`` in the page order (before it if not ``forward``),
+        as a lexicographic ``(a, b) > (x, y)`` condition.
+        """
+        condition = Q()
+        for i, (ordering, field) in enumerate(zip(self.ordering, self.fields)):
+            descending = ordering.startswith('-')
+            op = 'lt' if descending == forward else 'gt'
+            term = Q(**{f'{field}__{op}': key[i]})
+            for prev_field, value in zip(self.fields[:i], key[:i]):
+                term &= Q(**{prev_field: value})
+            condition |= term
+        return condition
+
+    def page(self, token=None):
+        direction, key = self._decode(token) if token else (None, None)
+        n = self.per_page
+
+        if direction == 'before':
+            reverse = [f[1:] if f.startswith('-') else f'-{f}' for f in self.ordering]
+            rows = list(self.queryset.filter(self._seek(key, False)).order_by(*reverse)[:n + 1])
+            if len(rows) < n:
+                # Not a full page left behind the cursor: start over
+                return self.page(None)
+            has_previous = len(rows) > n
+            rows = rows[:n][::-1]
+            has_next = True
+        else:
+            qs = self.queryset if key is None else self.queryset.filter(self._seek(key, True))
+            rows = list(qs[:n + 1])
+            has_next = len(rows) > n
+            rows = rows[:n]
+            has_previous = key is not None
+            if key is None:
+                token = ''
+
+        total, kind = (None, EXACT)
+        if self.estimate:
+            total, kind = estimate_count(self.queryset)
+
+        return KeysetPage(
+            rows,
+            token=token or '',
+            next_token=self._encode('after', rows[-1]) if has_next and rows else None,
+            previous_token=self._encode('before', rows[0]) if has_previous and rows else None,
+            total=total,
+            total_kind=kind,
+        )
+
+
+def _json_default(value):
+    # Full precision: seeking needs the exact stored value back
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+class _Serializer:
+    """
+    JSON serializer that round-trips datetimes and decimals as strings;
+    the ORM converts them back when they are compared to a field.
+    """
+
+    def dumps(self, obj):
+        return json.dumps(obj, separators=(',', ':'), default=_json_default).encode('latin-1')
+
+    def loads(self, data):
+        return json.loads(data.decode('latin-1'))
+
+
+def estimate_count(queryset, cap=COUNT_CAP):
+    """
+    ``(total, kind)``: the exact count if there are at most ``cap`` rows,
+    otherwise ``(cap, AT_LEAST)`` for a filtered list or a planner /
+    max-id estimate ``(n, ABOUT)`` for a whole table.
+    """
+    count = queryset.order_by()[:cap + 1].count()
+    if count <= cap:
+        return count, EXACT
+
+    if queryset.query.where:
+        return cap, AT_LEAST
+    return max(_table_estimate(queryset.model), cap), ABOUT
+
+
+def _table_estimate(model):
+    table = model._meta.db_table
+    connection = connections[model.objects.db]
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [table])
+        else:
+            # Ids are only ever appended, so MAX(pk) is an upper bound read off the index
+            cursor.execute(f"SELECT MAX({model._meta.pk.column}) FROM {connection.ops.quote_name(table)}")
+        row = cursor.fetchone()
+    return int(row[0] or 0) if row else 0
+
+
+def base_query(request, *drop):
+    """
+    The request's query string without ``drop`` (and the cursor), for
+    building pager links that keep the current filters.
+    """
+    params = request.GET.copy()
+    for name in ('cursor', 'page') + drop:
+        params.pop(name, None)
+    return params.urlencode()
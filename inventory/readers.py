@@ -0,0 +1,203 @@
+"""
+Streaming readers for import files.
+
+CSV is read with the ``csv`` module and .xlsx with openpyxl in
+``read_only`` mode, so rows are pulled from disk one at a time and fed
+to the importer as fixed-size DataFrame chunks. Peak memory depends on
+the chunk size, not on the file size.
+"""
+import codecs
+import csv
+from itertools import islice
+
+import pandas as pd
+
+
+ENCODING_SAMPLE_BYTES = 64 * 1024
+ROW_COUNT_BLOCK_BYTES = 1024 * 1024
+
+
+def file_kind(filename):
+    name = filename.lower()
+    if name.endswith('.xlsx'):
+        return 'xlsx'
+    if name.endswith('.xls'):
+        return 'xls'
+    return 'csv'
+
+
+def detect_encoding(path):
+    """
+    Pick a text encoding from a sample of the file (BOM, then a UTF-8
+    trial decode), instead of parsing the whole file twice.
+    """
+    with open(path, 'rb') as fh:
+        sample = fh.read(ENCODING_SAMPLE_BYTES)
+
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+
+    try:
+        # final=False: a multi-byte character may be cut at the sample edge
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'latin-1'
+
+
+def _csv_rows(path, encoding):
+    # errors='replace': a stray byte past the sample must not abort the import
+    with open(path, encoding=encoding, errors='replace', newline='') as fh:
+        yield from csv.reader(fh)
+
+
+def _open_workbook(path, **kwargs):
+    from openpyxl import load_workbook
+
+    # Pass a file object: openpyxl rejects paths without an .xlsx suffix
+    return load_workbook(open(path, 'rb'), read_only=True, **kwargs)
+
+
+def _xlsx_rows(path):
+    wb = _open_workbook(path, data_only=True)
+    try:
+        yield from wb.active.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _xls_rows(path):
+    # Legacy .xls has no streaming reader; load it through pandas
+    df = pd.read_excel(path, header=None, dtype=object, engine='xlrd')
+    for values in df.itertuples(index=False):
+        yield [None if pd.isna(v) else v for v in values]
+
+
+def iter_rows(path, filename, encoding=None):
+    """
+    Yield raw rows (lists of cell values) from an uploaded file.
+    """
+    kind = file_kind(filename)
+    if kind == 'xlsx':
+        return _xlsx_rows(path)
+    if kind == 'xls':
+        return _xls_rows(path)
+    return _csv_rows(path, encoding or detect_encoding(path))
+
+
+def _is_blank(row):
+    return all(v is None or (isinstance(v, str) and not v.strip()) for v in row)
+
+
+def _header_labels(row, width):
+    """
+    Column labels from the header row, made unique the way pandas does.
+    """
+    labels = []
+    seen = {}
+    for i in range(width):
+        value = row[i] if i < len(row) else None
+        label = str(value).strip() if value is not None and str(value).strip() else f"Unnamed: {i}"
+
+        if label in seen:
+            seen[label] += 1
+            label = f"{label}.{seen[label]}"
+        else:
+            seen[label] = 0
+        labels.append(label)
+    return labels
+
+
+def _fit(row, width):
+    row = list(row[:width])
+    if len(row) < width:
+        row.extend([None] * (width - len(row)))
+    return [None if isinstance(v, str) and not v.strip() else v for v in row]
+
+
+def estimate_rows(path, filename):
+    """
+    Cheap data-row estimate for progress reporting (0 if unknown).
+    """
+    kind = file_kind(filename)
+
+    if kind == 'xlsx':
+        wb = _open_workbook(path)
+        try:
+            return max((wb.active.max_row or 0) - 1, 0)
+        finally:
+            wb.close()
+
+    if kind == 'csv':
+        lines = 0
+        with open(path, 'rb') as fh:
+            for block in iter(lambda: fh.read(ROW_COUNT_BLOCK_BYTES), b''):
+                lines += block.count(b'\n')
+        return max(lines - 1, 0)
+
+    return 0
+
+
+def read_preview(path, filename, has_header=True, rows=5):
+    """
+    Read only the header and the first ``rows`` data rows.
+
+    Returns a dict with ``columns``, ``preview_rows``, ``encoding`` and
+    ``row_estimate`` that the staging store keeps next to the file.
+    """
+    encoding = detect_encoding(path) if file_kind(filename) == 'csv' else None
+    raw = iter_rows(path, filename, encoding)
+    try:
+        source = (r for r in raw if not _is_blank(r))
+        head = list(islice(source, rows + 1 if has_header else rows))
+    finally:
+        raw.close()
+
+    if not head:
+        raise ValueError("The file has no rows.")
+
+    width = max(len(r) for r in head)
+    if has_header:
+        columns = _header_labels(head[0], width)
+        data = head[1:]
+    else:
+        columns = [f"Column {i + 1}" for i in range(width)]
+        data = head
+
+    row_estimate = estimate_rows(path, filename)
+    if not has_header:
+        row_estimate += 1
+
+    return {
+        'columns': columns,
+        'preview_rows': [
+            ['' if v is None else str(v) for v in _fit(r, width)] for r in data
+        ],
+        'encoding': encoding,
+        'has_header': has_header,
+        'row_estimate': row_estimate,
+    }
+
+
+def iter_chunks(path, filename, meta, chunk_size=1000, skip=0):
+    """
+    Yield DataFrames of at most ``chunk_size`` data rows, labelled with
+    the staged column names. ``skip`` data rows are passed over first so
+    an interrupted import can resume.
+    """
+    columns = meta['columns']
+    width = len(columns)
+
+    rows = iter_rows(path, filename, meta.get('encoding'))
+    rows = (r for r in rows if not _is_blank(r))
+    if meta.get('has_header', True):
+        next(rows, None)
+
+    rows = islice(rows, skip, None)
+    while True:
+        block = [_fit(r, width) for r in islice(rows, chunk_size)]
+        if not block:
+            break
+        yield pd.DataFrame(block, columns=columns, dtype=object)
@@ -0,0 +1,118 @@
+"""
+Bulk return of issued components.
+
+``receive_many()`` handles a whole lab kit in one transaction: the
+issuances are locked with one query and saved with one ``bulk_update``,
+stock coming back is summed per item (``Item.adjust_stock_many``), and
+the head gets one summary email instead of one per component.
+"""
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Issuance, Item, StockLedgerEntry
+from . import rollups
+from .email import notify_receipt
+
+
+# Returned in working or repairable condition: goes back into stock
+RESTOCK_STATUSES = ('ok', 'faulty')
+
+# Ids per bulk_update statement
+UPDATE_BATCH_SIZE = 500
+
+
+class ReceiveError(Exception):
+    """
+    The batch can't be applied as given; nothing was changed.
+    """
+
+
+def clean_entries(entries):
+    """
+    ``{issuance_id: (status, remark)}`` from ``[(issuance_id, status,
+    remark)]``, rejecting unknown statuses and repeated ids.
+    """
+    statuses = {value for value, _ in Issuance.COMPONENT_STATUS}
+    cleaned = {}
+    for issuance_id, status, remark in entries:
+        try:
+            issuance_id = int(issuance_id)
+        except (TypeError, ValueError):
+            raise ReceiveError(f"Invalid issuance id: {issuance_id!r}")
+        if status not in statuses:
+            raise ReceiveError(f"Issuance {issuance_id}: unknown component status {status!r}")
+        if issuance_id in cleaned:
+            raise ReceiveError(f"Issuance {issuance_id} is listed more than once")
+        cleaned[issuance_id] = (status, (remark or '').strip())
+
+    if not cleaned:
+        raise ReceiveError("No issuances to receive.")
+    return cleaned
+
+
+def skip_reason(issuance):
+    """
+    Why ``issuance`` can't be received, or None if it can.
+    """
+    if issuance.received:
+        return "already received"
+    if issuance.issue_condition != 'returnable':
+        return "non-returnable"
+    return None
+
+
+def receive_many(entries, now=None):
+    """
+    Mark ``[(issuance_id, component_status, remark)]`` as received.
+
+    Unknown ids or statuses abort the whole batch with ``ReceiveError``.
+    Issuances already received (e.g. a retried request) or not returnable
+    are left alone and reported. Returns ``{'received': [ids],
+    'skipped': {id: reason}, 'restocked': {item_id: quantity}}``.
+    """
+    cleaned = clean_entries(entries)
+    now = now or timezone.now()
+
+    with transaction.atomic():
+        # One query locks the whole kit (only the issuance rows on PostgreSQL)
+        issuances = list(
+            Issuance.objects.select_for_update(of=('self',))
+            .select_related('item')
+            .filter(pk__in=cleaned)
+            .order_by('pk')
+        )
+        missing = sorted(cleaned.keys() - {issuance.pk for issuance in issuances})
+        if missing:
+            raise ReceiveError(f"Unknown issuance id(s): {', '.join(map(str, missing))}")
+
+        received, skipped, restock = [], {}, {}
+        for issuance in issuances:
+            reason = skip_reason(issuance)
+            if reason:
+                skipped[issuance.pk] = reason
+                continue
+
+            issuance.component_status, issuance.remark = cleaned[issuance.pk]
+            issuance.receive_date = now
+            issuance.received = True
+            received.append(issuance)
+
+            if issuance.component_status in RESTOCK_STATUSES:
+                restock[issuance.item_id] = restock.get(issuance.item_id, 0) + issuance.quantity
+
+        Issuance.objects.bulk_update(
+            received,
+            ['component_status', 'remark', 'receive_date', 'received'],
+            batch_size=UPDATE_BATCH_SIZE,
+        )
+        Item.adjust_stock_many(restock, StockLedgerEntry.RECEIVED)
+        rollups.record_received(received)
+
+        # 📧 one summary email (queued; sent after commit)
+        notify_receipt(received)
+
+    return {
+        'received': [issuance.pk for issuance in received],
+        'skipped': skipped,
+        'restocked': restock,
+    }
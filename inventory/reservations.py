@@ -0,0 +1,118 @@
+"""
+Stock reservation engine.
+
+Every outgoing stock movement goes through one conditional statement,
+``UPDATE inventory_item SET quantity = quantity - n WHERE id = ? AND
+quantity >= n``, and checks the affected-row count (``Item.adjust_stock``).
+There is no read-then-check-then-write window to race in and no row lock
+held while a request does other work, so two clerks issuing the last
+unit can't both succeed.
+
+Short-lived holds (``hold()``) take the stock off the same way and are
+settled exactly once: ``confirm()`` keeps it out, ``release()`` or expiry
+(``release_expired()``, also run by ``python manage.py
+release_stock_holds``) puts it back.
+"""
+from datetime import timedelta
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Item, StockHold, StockLedgerEntry
+
+
+logger = logging.getLogger(__name__)
+
+# Expired holds settled per sweep
+SWEEP_BATCH_SIZE = 200
+
+
+def hold_ttl():
+    return timedelta(seconds=getattr(settings, 'STOCK_HOLD_SECONDS', 5 * 60))
+
+
+def take(item_id, quantity, reason=StockLedgerEntry.STOCK_OUT):
+    """
+    Remove ``quantity`` units if (and only if) they are in stock. Returns
+    the new quantity, or None if the item is gone or short of stock.
+    """
+    if quantity <= 0:
+        raise ValueError("quantity must be positive")
+    return Item.adjust_stock(item_id, -quantity, reason)
+
+
+def hold(item_id, quantity, reference='', ttl=None):
+    """
+    Set ``quantity`` units aside until ``confirm()`` / ``release()`` or
+    until the hold expires. Returns the StockHold, or None if the stock
+    isn't there.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        if take(item_id, quantity, StockLedgerEntry.HELD) is None:
+            return None
+        held = StockHold.objects.create(
+            item_id=item_id,
+            quantity=quantity,
+            reference=reference[:100],
+            expires_at=now + (ttl or hold_ttl()),
+        )
+        # Piggy-back the expiry sweep on hold traffic
+        transaction.on_commit(release_expired)
+    return held
+
+
+def _settle(hold_id, **conditions):
+    """
+    Delete hold ``hold_id`` if it still exists (and matches
+    ``conditions``); returns it, or None if it was already settled. The
+    conditional DELETE is what makes settling happen once.
+    """
+    held = StockHold.objects.filter(pk=hold_id, **conditions).first()
+    if held is None:
+        return None
+    deleted, _ = StockHold.objects.filter(pk=held.pk).delete()
+    return held if deleted else None
+
+
+def confirm(hold_id, now=None, **match):
+    """
+    Turn an unexpired hold (matching ``match``, e.g. ``item_id=``,
+    ``quantity=``) into a real removal: the stock stays out. Returns the
+    settled StockHold, or None if it expired, is gone or doesn't match.
+    """
+    with transaction.atomic():
+        return _settle(hold_id, expires_at__gt=now or timezone.now(), **match)
+
+
+def release(hold_id):
+    """
+    Put a hold's stock back. Returns True if this call released it.
+    """
+    with transaction.atomic():
+        held = _settle(hold_id)
+        if held is None:
+            return False
+        Item.adjust_stock(held.item_id, held.quantity, StockLedgerEntry.RELEASED)
+    return True
+
+
+def release_expired(now=None, limit=SWEEP_BATCH_SIZE):
+    """
+    Release holds past their expiry; returns how many were released.
+    """
+    now = now or timezone.now()
+    released = 0
+    while True:
+        due = list(StockHold.objects.filter(expires_at__lte=now).values_list('pk', flat=True)[:limit])
+        if not due:
+            break
+        released += sum(release(pk) for pk in due)
+        if len(due) < limit:
+            break
+
+    if released:
+        logger.info("Released %s expired stock hold(s)", released)
+    return released
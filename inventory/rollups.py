@@ -0,0 +1,242 @@
+"""
+Daily stock movement rollups for the dashboard trend charts.
+
+Each stock movement adds its units to one ``ItemDailyMovement`` row and
+one ``CategoryDailyMovement`` row for its local day, in the same
+transaction as the movement (``record_transactions()``,
+``record_issued()``, ``record_received()``). The add is a single upsert
+(``INSERT ... ON CONFLICT DO UPDATE SET n = n + excluded.n``), so
+concurrent writers never lose a count. ``series()`` reads at most
+``days`` x categories rows whatever the length of the history.
+
+``rebuild()`` (``python manage.py backfill_movements``) recomputes days
+from the ``Transaction`` and ``Issuance`` rows.
+"""
+from datetime import datetime, timedelta
+
+from django.db import connections, router, transaction
+from django.db.models import Min, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import CategoryDailyMovement, Issuance, Item, ItemDailyMovement, Transaction
+
+
+FIELDS = ('units_in', 'units_out', 'issued', 'returned', 'lost')
+
+# Chart windows offered by the dashboard, in days
+RANGES = (30, 90, 365)
+
+# Days recomputed per rebuild transaction
+REBUILD_WINDOW_DAYS = 31
+
+
+def _received_field(component_status):
+    return 'lost' if component_status == 'lost' else 'returned'
+
+
+def _add(totals, key, counts):
+    row = totals.setdefault(key, dict.fromkeys(FIELDS, 0))
+    for field, units in counts.items():
+        row[field] += units
+
+
+def _upsert(model, key, rows):
+    """
+    Add ``{(day, key value): {field: units}}`` to ``model``'s rows,
+    creating the missing ones.
+    """
+    if not rows:
+        return
+
+    conn = connections[router.db_for_write(model)]
+    qn = conn.ops.quote_name
+    table = qn(model._meta.db_table)
+    columns = [qn('day'), qn(key)] + [qn(field) for field in FIELDS]
+    additions = ", ".join(f"{qn(field)} = {table}.{qn(field)} + excluded.{qn(field)}" for field in FIELDS)
+
+    with conn.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(['%s'] * len(columns))}) "
+            f"ON CONFLICT ({qn(key)}, {qn('day')}) DO UPDATE SET {additions}",
+            [(day, value, *(counts[field] for field in FIELDS)) for (day, value), counts in rows.items()],
+        )
+
+
+def _write(per_item):
+    """
+    Add ``{(day, item id): {field: units}}`` to the item rows and to the
+    rows of the items' current categories.
+    """
+    per_item = {key: counts for key, counts in per_item.items() if any(counts.values())}
+    if not per_item:
+        return
+
+    names = dict(Item.objects.filter(pk__in={pk for _, pk in per_item}).values_list('pk', 'category'))
+    per_category = {}
+    for (day, pk), counts in per_item.items():
+        _add(per_category, (day, names.get(pk, '')), counts)
+
+    with transaction.atomic():
+        _upsert(ItemDailyMovement, 'item_id', per_item)
+        _upsert(CategoryDailyMovement, 'category', per_category)
+
+
+def record(moves):
+    """
+    Add ``[(moment, item id, field, units)]`` to the rollups of each
+    movement's local day. Call inside the transaction that writes the
+    movement.
+    """
+    per_item = {}
+    for moment, item_id, field, units in moves:
+        _add(per_item, (timezone.localdate(moment), item_id), {field: units})
+    _write(per_item)
+
+
+def record_transactions(transactions):
+    record(
+        (txn.date, txn.item_id, 'units_in' if txn.transaction_type == 'IN' else 'units_out', txn.quantity)
+        for txn in transactions
+    )
+
+
+def record_issued(issuances):
+    record((issuance.issue_date, issuance.item_id, 'issued', issuance.quantity) for issuance in issuances)
+
+
+def record_received(issuances):
+    record(
+        (issuance.receive_date, issuance.item_id, _received_field(issuance.component_status), issuance.quantity)
+        for issuance in issuances
+    )
+
+
+def _day_bounds(first, last):
+    """
+    Aware datetimes from the start of local day ``first`` to the start of
+    the day after ``last``.
+    """
+    start = timezone.make_aware(datetime.combine(first, datetime.min.time()))
+    end = timezone.make_aware(datetime.combine(last + timedelta(days=1), datetime.min.time()))
+    return start, end
+
+
+def compute(first, last):
+    """
+    ``{(day, item id): {field: units}}`` for local days ``first`` to
+    ``last``, aggregated from the Transaction and Issuance rows.
+    """
+    start, end = _day_bounds(first, last)
+    per_item = {}
+
+    transactions = (
+        Transaction.objects.filter(date__gte=start, date__lt=end)
+        .annotate(day=TruncDate('date'))
+        .values('day', 'item', 'transaction_type').annotate(units=Sum('quantity'))
+    )
+    for row in transactions:
+        field = 'units_in' if row['transaction_type'] == 'IN' else 'units_out'
+        _add(per_item, (row['day'], row['item']), {field: row['units']})
+
+    issued = (
+        Issuance.objects.filter(issue_date__gte=start, issue_date__lt=end)
+        .annotate(day=TruncDate('issue_date'))
+        .values('day', 'item').annotate(units=Sum('quantity'))
+    )
+    for row in issued:
+        _add(per_item, (row['day'], row['item']), {'issued': row['units']})
+
+    received = (
+        Issuance.objects.filter(received=True, receive_date__gte=start, receive_date__lt=end)
+        .annotate(day=TruncDate('receive_date'))
+        .values('day', 'item', 'component_status').annotate(units=Sum('quantity'))
+    )
+    for row in received:
+        _add(per_item, (row['day'], row['item']), {_received_field(row['component_status']): row['units']})
+
+    return {key: counts for key, counts in per_item.items() if any(counts.values())}
+
+
+def stored(first, last):
+    """
+    ``{(day, item id): {field: units}}`` from the item rollup rows.
+    """
+    rows = ItemDailyMovement.objects.filter(day__gte=first, day__lte=last).values('day', 'item', *FIELDS)
+    return {(row['day'], row['item']): {field: row[field] for field in FIELDS} for row in rows}
+
+
+def history_start():
+    """
+    Local day of the oldest movement, or None without any.
+    """
+    oldest = [
+        Transaction.objects.aggregate(first=Min('date'))['first'],
+        Issuance.objects.aggregate(first=Min('issue_date'))['first'],
+    ]
+    oldest = [moment for moment in oldest if moment is not None]
+    return timezone.localdate(min(oldest)) if oldest else None
+
+
+def windows(first, last, size=REBUILD_WINDOW_DAYS):
+    """
+    ``(first day, last day)`` windows of ``size`` days covering
+    ``first`` to ``last``.
+    """
+    while first <= last:
+        end = min(first + timedelta(days=size - 1), last)
+        yield first, end
+        first = end + timedelta(days=1)
+
+
+def rebuild(first, last):
+    """
+    Replace the rollups of local days ``first`` to ``last`` with a fresh
+    aggregate, one window of days per transaction. Returns the number of
+    item-day rows written.
+
+    Movements of deleted items went with their Transaction / Issuance
+    rows, so a rebuilt day no longer counts them; category rows use each
+    item's current category.
+    """
+    written = 0
+    for start, end in windows(first, last):
+        with transaction.atomic():
+            ItemDailyMovement.objects.filter(day__gte=start, day__lte=end).delete()
+            CategoryDailyMovement.objects.filter(day__gte=start, day__lte=end).delete()
+            per_item = compute(start, end)
+            _write(per_item)
+        written += len(per_item)
+    return written
+
+
+def series(days, category=None, item_id=None, today=None):
+    """
+    Daily units for the last ``days`` local days (ending ``today``):
+    ``{'days': [iso dates], 'units_in': [...], ..., 'totals': {field:
+    units}}``. Reads the rollups of one item, one category or (by
+    default) all categories.
+    """
+    today = today or timezone.localdate()
+    first = today - timedelta(days=days - 1)
+
+    if item_id is not None:
+        rows = ItemDailyMovement.objects.filter(item=item_id)
+    elif category is not None:
+        rows = CategoryDailyMovement.objects.filter(category=category)
+    else:
+        rows = CategoryDailyMovement.objects.all()
+
+    rows = (
+        rows.filter(day__gte=first, day__lte=today)
+        .values('day')
+        .annotate(**{f"total_{field}": Sum(field) for field in FIELDS})
+    )
+    by_day = {row['day']: row for row in rows}
+
+    labels = [first + timedelta(days=n) for n in range(days)]
+    result = {'days': [day.isoformat() for day in labels]}
+    for field in FIELDS:
+        result[field] = [by_day[day][f"total_{field}"] if day in by_day else 0 for day in labels]
+    result['totals'] = {field: sum(result[field]) for field in FIELDS}
+    return result
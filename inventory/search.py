@@ -0,0 +1,243 @@
+"""
+Full-text search over item name / category / location.
+
+SQLite uses an external-content FTS5 table (``inventory_item_fts``) kept
+in sync by triggers, so bulk_create / bulk_update / queryset updates are
+indexed too. PostgreSQL uses a GIN index on the matching ``tsvector``
+expression. Both support prefix matching ("resis" finds "Resistor") and
+ranking; other backends fall back to ``icontains``.
+"""
+import re
+
+from django.db import OperationalError, connection
+from django.db.models import F, FloatField, Lookup, Q
+from django.db.models.expressions import RawSQL
+
+from .models import ItemSearchEntry
+
+
+FTS_TABLE = 'inventory_item_fts'
+
+# Queries must use exactly the indexed expression for PostgreSQL to pick the GIN index
+PG_VECTOR = (
+    "to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(category, '') "
+    "|| ' ' || coalesce(location, ''))"
+)
+
+PG_INDEX = 'inventory_item_search_idx'
+
+# External-content FTS5 table: the text lives in inventory_item only
+SQLITE_TABLE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name, category, location, "
+    "content='inventory_item', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+
+SQLITE_TRIGGERS = {
+    f'{FTS_TABLE}_ai': (
+        "AFTER INSERT ON inventory_item BEGIN "
+        f"INSERT INTO {FTS_TABLE}(rowid, name, category, location) "
+        "VALUES (new.id, new.name, new.category, new.location); END"
+    ),
+    f'{FTS_TABLE}_ad': (
+        "AFTER DELETE ON inventory_item BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category, location) "
+        "VALUES ('delete', old.id, old.name, old.category, old.location); END"
+    ),
+    # Stock movements don't touch the indexed columns and skip this trigger
+    f'{FTS_TABLE}_au': (
+        "AFTER UPDATE OF name, category, location ON inventory_item BEGIN "
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, category, location) "
+        "VALUES ('delete', old.id, old.name, old.category, old.location); "
+        f"INSERT INTO {FTS_TABLE}(rowid, name, category, location) "
+        "VALUES (new.id, new.name, new.category, new.location); END"
+    ),
+}
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_fts_ready = None
+
+
+def install_index(conn):
+    """
+    Create the text index for ``conn``'s backend if it is missing.
+
+    Safe to run repeatedly: on SQLite, Django rebuilds a table to alter
+    it and drops its triggers along the way, so this also puts missing
+    triggers back and re-indexes. Returns True if anything was created.
+    """
+    global _fts_ready
+    _fts_ready = None
+
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON inventory_item USING gin ({PG_VECTOR})")
+            return True
+
+        if conn.vendor != 'sqlite':
+            return False
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {row[0] for row in cursor.fetchall()}
+        missing = [name for name in SQLITE_TRIGGERS if name not in existing]
+        if FTS_TABLE in existing and not missing:
+            return False
+
+        try:
+            cursor.execute(SQLITE_TABLE)
+        except OperationalError:
+            # SQLite built without FTS5: search falls back to LIKE
+            return False
+
+        for name in missing:
+            cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {SQLITE_TRIGGERS[name]}")
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def drop_index(conn):
+    global _fts_ready
+    _fts_ready = None
+
+    with conn.cursor() as cursor:
+        if conn.vendor == 'postgresql':
+            cursor.execute(f"DROP INDEX IF EXISTS {PG_INDEX}")
+        elif conn.vendor == 'sqlite':
+            for name in SQLITE_TRIGGERS:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Match(Lookup):
+    """
+    ``document__match='"resis"*'`` -> ``inventory_item_fts MATCH %s``.
+    """
+    lookup_name = 'match'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} MATCH {rhs}", lhs_params + rhs_params
+
+
+ItemSearchEntry._meta.get_field('document').register_lookup(Match)
+
+
+def terms(query):
+    return TOKEN_RE.findall(query.lower())
+
+
+def fts_ready():
+    """
+    True when the backend has a usable text index.
+    """
+    global _fts_ready
+    if _fts_ready is None:
+        if connection.vendor == 'postgresql':
+            _fts_ready = True
+        elif connection.vendor == 'sqlite':
+            _fts_ready = FTS_TABLE in connection.introspection.table_names()
+        else:
+            _fts_ready = False
+    return _fts_ready
+
+
+def _sqlite_match(words):
+    # "word"* is an FTS5 prefix query; quoting keeps operators literal
+    return ' AND '.join(f'"{w}"*' for w in words)
+
+
+def _pg_tsquery(words):
+    return ' & '.join(f"{w}:*" for w in words)
+
+
+def match_ids(query):
+    """
+    RawSQL subquery of item ids matching ``query`` (None if no index).
+    """
+    words = terms(query)
+    if not words or not fts_ready():
+        return None
+
+    if connection.vendor == 'sqlite':
+        return RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            [_sqlite_match(words)],
+        )
+    return RawSQL(
+        f"SELECT id FROM inventory_item WHERE {PG_VECTOR} @@ to_tsquery('simple', %s)",
+        [_pg_tsquery(words)],
+    )
+
+
+def _pg_rank(words):
+    # Negated so that, as with FTS5's bm25, lower is better
+    return RawSQL(
+        f"-ts_rank({PG_VECTOR}, to_tsquery('simple', %s))",
+        [_pg_tsquery(words)],
+        output_field=FloatField(),
+    )
+
+
+def search_items(items, query, ranked=True):
+    """
+    Filter an Item queryset by ``query``; ordered by relevance (a
+    ``search_rank`` annotation, lower is better), then serial number,
+    when ``ranked``.
+    """
+    words = terms(query)
+    if not words or not fts_ready():
+        items = items.filter(
+            Q(name__icontains=query) |
+            Q(category__icontains=query) |
+            Q(location__icontains=query)
+        )
+        return items.order_by('serial_no') if ranked else items
+
+    if connection.vendor == 'sqlite':
+        # One join against the FTS table, which also exposes bm25 as rank
+        items = items.filter(search_entry__document__match=_sqlite_match(words))
+        if ranked:
+            items = items.annotate(search_rank=F('search_entry__rank'))
+    else:
+        items = items.filter(id__in=match_ids(query))
+        if ranked:
+            items = items.annotate(search_rank=_pg_rank(words))
+
+    return items.order_by('search_rank', 'serial_no') if ranked else items
+
+
+def search_transactions(transactions, query, type_choices):
+    """
+    Filter a Transaction queryset by item text or transaction type.
+    """
+    q = query.strip().lower()
+    types = [code for code, _ in type_choices if code.lower().startswith(q)]
+
+    ids = match_ids(query)
+    if ids is None:
+        condition = (
+            Q(item__name__icontains=query) |
+            Q(item__category__icontains=query)
+        )
+    else:
+        condition = Q(item_id__in=ids)
+
+    if types:
+        condition |= Q(transaction_type__in=types)
+    return transactions.filter(condition)
+
+
+def search_issuances(issuances, query):
+    """
+    Filter an Issuance queryset by item text.
+    """
+    ids = match_ids(query)
+    if ids is None:
+        return issuances.filter(
+            Q(item__name__icontains=query) |
+            Q(item__category__icontains=query)
+        )
+    return issuances.filter(item_id__in=ids)
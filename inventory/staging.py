@@ -0,0 +1,198 @@
+"""
+Disk-backed staging store for uploaded import files.
+
+The upload step streams the file to disk under a token (half the
+SHA-256 of its content plus a random half, so two uploads of the same
+file never share an entry) and stores the parsed header/preview next to
+it; the session only keeps that token. The mapping step reads the
+stored metadata instead of re-parsing the workbook, and the import job
+streams rows straight from the staged file. ``cleanup()`` never removes
+the file of a pending or running job.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+
+from django.conf import settings
+
+from .models import ImportJob
+from .readers import read_preview
+
+
+TOKEN_RE = re.compile(r'^[0-9a-f]{64}$')
+
+RAW_SUFFIX = '.upload'
+META_SUFFIX = '.meta.json'
+
+
+class StagingError(Exception):
+    """
+    Raised when an upload cannot be staged (e.g. it exceeds the size cap).
+    """
+
+
+def staging_dir():
+    path = Path(getattr(settings, 'IMPORT_STAGING_DIR', settings.BASE_DIR / 'import_staging'))
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def staging_ttl():
+    return getattr(settings, 'IMPORT_STAGING_TTL', 60 * 60)
+
+
+def staging_max_bytes():
+    return getattr(settings, 'IMPORT_STAGING_MAX_BYTES', 200 * 1024 * 1024)
+
+
+def _paths(token):
+    if not token or not TOKEN_RE.match(token):
+        return None
+    base = staging_dir()
+    return base / f"{token}{RAW_SUFFIX}", base / f"{token}{META_SUFFIX}"
+
+
+def _write_json(path, data):
+    tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+    tmp.write_text(json.dumps(data))
+    os.replace(tmp, path)
+
+
+def stage_upload(uploaded_file, filename, has_header=True):
+    """
+    Stream an UploadedFile to disk, parse its header and preview rows,
+    and return ``(token, meta)``.
+    """
+    limit = staging_max_bytes()
+    if uploaded_file.size and uploaded_file.size > limit:
+        raise StagingError("File is larger than the staging size cap.")
+
+    cleanup()
+
+    base = staging_dir()
+    tmp = base / f"{uuid.uuid4().hex}.tmp"
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(tmp, 'wb') as out:
+            for chunk in uploaded_file.chunks():
+                size += len(chunk)
+                if size > limit:
+                    raise StagingError("File is larger than the staging size cap.")
+                digest.update(chunk)
+                out.write(chunk)
+
+        token = digest.hexdigest()[:32] + uuid.uuid4().hex
+        raw_path, meta_path = _paths(token)
+        os.replace(tmp, raw_path)
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    try:
+        meta = read_preview(raw_path, filename, has_header=has_header)
+    except Exception:
+        discard(token)
+        raise
+
+    meta['filename'] = filename
+    _write_json(meta_path, meta)
+    return token, meta
+
+
+def load_meta(token):
+    """
+    Return the stored header/preview metadata for ``token`` or None if
+    the upload expired.
+    """
+    paths = _paths(token)
+    if paths is None:
+        return None
+
+    raw_path, meta_path = paths
+    try:
+        if time.time() - meta_path.stat().st_mtime > staging_ttl():
+            discard(token)
+            return None
+        if not raw_path.exists():
+            return None
+        return json.loads(meta_path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def raw_path(token):
+    """
+    Path of the staged upload for ``token`` (None for a malformed token).
+    """
+    paths = _paths(token)
+    return paths[0] if paths else None
+
+
+def touch(token):
+    """
+    Keep a staged upload alive while a job is still reading it.
+    """
+    paths = _paths(token)
+    if paths is None:
+        return
+    for path in paths:
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+
+def discard(token):
+    paths = _paths(token)
+    if paths is None:
+        return
+    for path in paths:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def cleanup(ttl=None, max_bytes=None):
+    """
+    Remove expired entries, then the oldest ones until the store fits
+    under the size cap, keeping those of pending and running jobs.
+    Returns the number of files removed.
+    """
+    ttl = staging_ttl() if ttl is None else ttl
+    max_bytes = staging_max_bytes() if max_bytes is None else max_bytes
+    now = time.time()
+    in_use = set(
+        ImportJob.objects.filter(status__in=[ImportJob.PENDING, ImportJob.RUNNING]).values_list('token', flat=True)
+    )
+
+    entries = []
+    removed = 0
+    for path in staging_dir().iterdir():
+        if path.name.split('.', 1)[0] in in_use:
+            continue
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+
+        if now - st.st_mtime > ttl:
+            path.unlink(missing_ok=True)
+            removed += 1
+        else:
+            entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+
+    return removed
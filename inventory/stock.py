@@ -0,0 +1,169 @@
+"""
+Batch stock adjustments: a delivery or a stock-out of many items at once.
+
+``apply_batch()`` reads every item the batch touches with one query and
+checks all lines against that snapshot in order, so an earlier line can
+free stock for a later one and the batch never drives an item below
+zero. If any line is invalid nothing is written. Otherwise each item gets
+one conditional UPDATE with its net change (``Item.adjust_stock_many``;
+if stock moved since the snapshot the batch is rolled back) and the
+Transaction rows are written with one ``bulk_create``. The quantities
+reported back are read after the UPDATEs, so they include movements
+made by others since the snapshot.
+"""
+from collections import namedtuple
+import csv
+
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Item, StockLedgerEntry, Transaction
+from . import rollups
+
+
+DIRECTIONS = {'IN': 1, 'OUT': -1}
+
+# Spellings accepted in pasted lines
+DIRECTION_ALIASES = {
+    'in': 'IN', '+': 'IN', 'add': 'IN', 'stock in': 'IN',
+    'out': 'OUT', '-': 'OUT', 'remove': 'OUT', 'stock out': 'OUT',
+}
+
+MAX_LINES = 5000
+
+INSERT_BATCH_SIZE = 500
+
+# ``item`` is ``('serial_no', n)`` or ``('pk', n)``
+Line = namedtuple('Line', 'number item direction quantity remark')
+
+
+class StockBatchError(Exception):
+    """
+    The batch was rejected; ``errors`` is ``[(line number, message)]``.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__("; ".join(f"line {number}: {message}" for number, message in errors))
+
+
+def clean_line(number, item, direction, quantity, remark=''):
+    """
+    ``Line`` from raw values, or raise ``StockBatchError`` for this line.
+    """
+    key, value = item
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise StockBatchError([(number, f"invalid item {'serial no.' if key == 'serial_no' else 'id'} {value!r}")])
+
+    direction = DIRECTION_ALIASES.get(str(direction or '').strip().lower())
+    if direction is None:
+        raise StockBatchError([(number, "direction must be IN or OUT")])
+
+    try:
+        quantity = int(quantity)
+    except (TypeError, ValueError):
+        quantity = 0
+    if quantity <= 0:
+        raise StockBatchError([(number, "quantity must be a positive whole number")])
+
+    return Line(number, (key, value), direction, quantity, (remark or '').strip())
+
+
+def parse_lines(text):
+    """
+    ``[Line]`` from pasted ``serial no, IN/OUT, quantity[, remark]`` rows
+    (comma or tab separated; blank lines and a header row are skipped).
+    """
+    rows = text.splitlines()
+    dialect = 'excel-tab' if any('\t' in row for row in rows) else 'excel'
+
+    lines, errors = [], []
+    for number, row in enumerate(csv.reader(rows, dialect=dialect), start=1):
+        row = [cell.strip() for cell in row]
+        if not any(row):
+            continue
+        if number == 1 and not row[0].isdigit() and row[0].lower().startswith(('serial', 'item')):
+            continue
+        if len(row) < 3:
+            errors.append((number, "expected: serial no, IN/OUT, quantity[, remark]"))
+            continue
+        try:
+            lines.append(clean_line(number, ('serial_no', row[0]), row[1], row[2], ','.join(row[3:])))
+        except StockBatchError as e:
+            errors.extend(e.errors)
+
+    if errors:
+        raise StockBatchError(errors)
+    return lines
+
+
+def apply_batch(lines):
+    """
+    Apply ``[Line]`` atomically. Returns ``{'transactions': n, 'items':
+    {pk: new quantity}}`` or raises ``StockBatchError`` (nothing written).
+    """
+    if not lines:
+        raise StockBatchError([(0, "no lines to apply")])
+    if len(lines) > MAX_LINES:
+        raise StockBatchError([(0, f"at most {MAX_LINES} lines per batch")])
+
+    pks = {value for key, value in (line.item for line in lines) if key == 'pk'}
+    serials = {value for key, value in (line.item for line in lines) if key == 'serial_no'}
+
+    with transaction.atomic():
+        # One snapshot of every item the batch touches; no row locks
+        snapshot = list(
+            Item.objects
+            .filter(Q(pk__in=pks) | Q(serial_no__in=serials))
+            .values_list('pk', 'serial_no', 'name', 'quantity')
+        )
+        by_key = {}
+        stock = {}
+        for pk, serial_no, name, quantity in snapshot:
+            by_key[('pk', pk)] = by_key[('serial_no', serial_no)] = (pk, name)
+            stock[pk] = quantity
+
+        errors, deltas, transactions = [], {}, []
+        for line in lines:
+            if line.item not in by_key:
+                key, value = line.item
+                errors.append((line.number, f"no item with {'serial no.' if key == 'serial_no' else 'id'} {value}"))
+                continue
+
+            pk, name = by_key[line.item]
+            delta = DIRECTIONS[line.direction] * line.quantity
+            if stock[pk] + delta < 0:
+                errors.append((line.number, f"only {stock[pk]} unit(s) of {name} left to remove"))
+                continue
+
+            stock[pk] += delta
+            deltas[pk] = deltas.get(pk, 0) + delta
+            transactions.append(Transaction(
+                item_id=pk,
+                transaction_type=line.direction,
+                quantity=line.quantity,
+                remarks=line.remark or None,
+            ))
+
+        if errors:
+            raise StockBatchError(errors)
+
+        applied = Item.adjust_stock_many(deltas, StockLedgerEntry.BATCH)
+        moved = [pk for pk, delta in deltas.items() if delta and pk not in applied]
+        if moved:
+            # Removed or sold out by someone else since the snapshot
+            names = {pk: name for pk, name in by_key.values()}
+            raise StockBatchError([
+                (0, f"stock of {names[pk]} changed while applying; nothing was changed, please retry")
+                for pk in moved
+            ])
+        # Lines that cancel out leave an item untouched: read its quantity as is
+        untouched = [pk for pk in deltas if pk not in applied]
+        if untouched:
+            applied.update(Item.objects.filter(pk__in=untouched).values_list('pk', 'quantity'))
+        Transaction.objects.bulk_create(transactions, batch_size=INSERT_BATCH_SIZE)
+        rollups.record_transactions(transactions)
+
+    return {'transactions': len(transactions), 'items': {pk: applied[pk] for pk in deltas}}
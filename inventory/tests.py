@@ -1,3 +1,950 @@
-from django.test import TestCase
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+import math
+import os
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+import numpy as np
+import pandas as pd
+
+from . import (
+    autocomplete, categories, digest, email, forecasting, jobs, ledger, merge, notifications, outbox, receiving,
+    reservations, rollups, search, staging, valuation, views,
+)
+from .importer import MAX_INT, coerce_columns, import_frame
+from .mailsink import MailSink
+from .pagination import KeysetPaginator
+from .readers import iter_chunks, read_preview
+from .stock import Line, StockBatchError, apply_batch
+from .models import (
+    Category, CategoryDailyMovement, ImportJob, Issuance, Item, ItemDailyMovement, NotificationEvent, OutboundEmail,
+    ReorderRecommendation, SerialCounter, StockHold, StockStatusCounter, Transaction, stock_summary,
+)
+
+
+def stored_counters():
+    return dict(StockStatusCounter.objects.values_list('status', 'count'))
+
+
+def actual_counters():
+    summary = stock_summary()
+    return {status: summary[status] for status, _ in StockStatusCounter.STATUS_CHOICES}
+
+
+class InventoryTestCase(TestCase):
+    def setUp(self):
+        # The per-process category set may hold rows rolled back by an earlier test
+        categories._categories = None
+        cache.clear()
+
+
+class ImportTests(InventoryTestCase):
+    def test_rejection_report(self):
+        existing = Item.objects.create(name="Old", category="Passive", quantity=1, reorder_level=0, unit_price=1)
+        frame = pd.DataFrame({
+            'Name': ["Resistor", "", "Diode", "LED", "Relay"],
+            'Qty': ["5", "3", "abc", "-2", "7"],
+            'Price': ["₹1,200.50", "1", "1", "1", "2"],
+            'ID': ["", "", "", "", str(existing.pk)],
+        }, dtype=object)
+
+        created, errors = import_frame(
+            frame, {'Name': 'name', 'Qty': 'quantity', 'Price': 'unit_price', 'ID': 'id'}, start=2
+        )
+
+        self.assertEqual(created, 1)
+        self.assertEqual([(e['row'], e['field'], e['value'], e['message']) for e in errors[:3]], [
+            (3, 'name', '', "is required"),
+            (4, 'quantity', 'abc', "is not a number"),
+            (5, 'quantity', '-2', "cannot be negative"),
+        ])
+        # Refused by the database (duplicate id): reported, not raised
+        self.assertEqual((len(errors), errors[3]['row'], errors[3]['field']), (4, 6, None))
+
+        item = Item.objects.get(name="Resistor")
+        self.assertEqual((item.quantity, str(item.unit_price), item.is_imported), (5, "1200.50", True))
+        self.assertEqual(stored_counters(), actual_counters())
+        self.assertEqual(ledger.reconcile(), [])
+
+
+class ReaderTests(TestCase):
+    def write(self, data, suffix='.csv'):
+        fh = tempfile.NamedTemporaryFile(suffix=suffix, delete=False)
+        self.addCleanup(os.unlink, fh.name)
+        with fh:
+            fh.write(data)
+        return fh.name
+
+    def test_chunks_skip_and_blank_rows(self):
+        rows = "".join(f"Part {n},{n}\n" + ("\n" if n == 3 else "") for n in range(1, 8))
+        path = self.write(f"Name,Qty,Name\n{rows}".encode())
+        meta = read_preview(path, "items.csv")
+        self.assertEqual(meta['columns'], ["Name", "Qty", "Name.1"])
+
+        chunks = list(iter_chunks(path, "items.csv", meta, chunk_size=3, skip=2))
+        self.assertEqual([len(df) for df in chunks], [3, 2])
+        self.assertEqual(chunks[0]['Name'].tolist(), ["Part 3", "Part 4", "Part 5"])
+        # Short rows are padded to the header's width
+        self.assertIsNone(chunks[0]['Name.1'].iat[0])
+
+    def test_xlsx_chunks(self):
+        from openpyxl import Workbook
+
+        path = self.write(b"", suffix='.xlsx')
+        wb = Workbook()
+        wb.active.append(["Name", "Qty"])
+        for n in range(1, 6):
+            wb.active.append([f"Part {n}", n])
+        wb.save(path)
+
+        meta = read_preview(path, "items.xlsx")
+        chunks = list(iter_chunks(path, "items.xlsx", meta, chunk_size=2, skip=1))
+        self.assertEqual([df['Qty'].tolist() for df in chunks], [[2, 3], [4, 5]])
+
+    def test_encodings(self):
+        cases = [
+            ("utf-8-sig", "\ufeffName\nRésistance\n".encode()),
+            ("utf-8", "Name\nRésistance\n".encode()),
+            ("latin-1", "Name\nRésistance\n".encode('latin-1')),
+        ]
+        for encoding, data in cases:
+            with self.subTest(encoding):
+                path = self.write(data)
+                meta = read_preview(path, "items.csv")
+                self.assertEqual((meta['encoding'], meta['columns']), (encoding, ["Name"]))
+                chunk, = iter_chunks(path, "items.csv", meta)
+                self.assertEqual(chunk['Name'].tolist(), ["Résistance"])
+
+
+class CoercionTests(TestCase):
+    MAPPING = {'name': 'name', 'qty': 'quantity', 'price': 'unit_price', 'location': 'location'}
+
+    def coerce(self, **columns):
+        frame = pd.DataFrame({'name': ["Part"] * len(next(iter(columns.values()))), **columns}, dtype=object)
+        mapping = {label: field for label, field in self.MAPPING.items() if label in frame}
+        return coerce_columns(frame, mapping)
+
+    def test_rejections(self):
+        rows, rejections = self.coerce(
+            qty=["1,200", "2.5", "-1", str(MAX_INT + 1), "many", "", "7"],
+            price=["₹ 3.456", "1", "1", "1", "1", "-4", "100000000"],
+        )
+
+        self.assertEqual([(number, kw['quantity'], kw['unit_price']) for number, kw in rows], [(1, 1200, 3.46)])
+        self.assertEqual([(e['row'], e['field'], e['message']) for e in rejections], [
+            (2, 'quantity', "must be a whole number"),
+            (3, 'quantity', "cannot be negative"),
+            (4, 'quantity', "is too large"),
+            (5, 'quantity', "is not a number"),
+            (6, 'unit_price', "cannot be negative"),
+            (7, 'unit_price', "is too large"),
+        ])
+
+    def test_text_cleaned_and_length_checked(self):
+        rows, rejections = self.coerce(location=["  Rack\t 3 ", "x" * 101])
+
+        self.assertEqual(rows[0][1]['location'], "Rack 3")
+        self.assertEqual([(e['row'], e['message']) for e in rejections], [(2, "is longer than 100 characters")])
+        # Blank cells fall back to the defaults
+        self.assertEqual(self.coerce(qty=[""])[0][0][1]['quantity'], 0)
+
+
+class MergeTests(InventoryTestCase):
+    def test_dry_run_summary_matches_apply(self):
+        resistor = Item.objects.create(name="Resistor", category="Passive", quantity=10, reorder_level=2, unit_price=1)
+        Item.objects.create(name="Diode", category="Passive", quantity=3, reorder_level=1, unit_price=1)
+        frame = pd.DataFrame({
+            'name': ["resistor ", "Diode", "Relay", "Relay"],
+            'category': ["Passive", "Passive", "Switch", "Switch"],
+            'qty': ["12", "3", "4", "5"],
+        }, dtype=object)
+        mapping = {'name': 'name', 'category': 'category', 'qty': 'quantity'}
+
+        summary = merge.empty_summary()
+        preview = merge.merge_frame(frame, mapping, merge.NaturalKeyIndex('name_category'), dry_run=True, summary=summary)
+        self.assertEqual(Item.objects.count(), 2)
+        self.assertEqual((summary['inserts'], summary['updates'], summary['unchanged']), (1, 1, 1))
+        self.assertEqual(summary['update_samples'][0]['changes'], {'quantity': ["10", "12"]})
+        self.assertEqual(preview[3][0]['message'], "duplicate of row 3 in this file")
+
+        applied = merge.merge_frame(frame, mapping, merge.NaturalKeyIndex('name_category'))
+        self.assertEqual(applied[:3], (1, 1, 1))
+        resistor.refresh_from_db()
+        self.assertEqual(resistor.quantity, 12)
+        self.assertEqual(Item.objects.get(name="Relay").quantity, 4)
+        self.assertEqual(ledger.reconcile(), [])
+
+    def test_stock_moved_during_merge(self):
+        item = Item.objects.create(name="Resistor 1k", category="Passive", quantity=10, reorder_level=2, unit_price=1)
+        index = merge.NaturalKeyIndex('serial_no')
+
+        # Issued after the index was built, before the sheet's chunk is applied
+        Item.adjust_stock(item.pk, -9)
+
+        frame = pd.DataFrame({'sn': [item.serial_no], 'qty': [4]})
+        created, updated, unchanged, errors = merge.merge_frame(frame, {'sn': 'serial_no', 'qty': 'quantity'}, index)
+
+        self.assertEqual((created, updated, unchanged, errors), (0, 1, 0, []))
+        item.refresh_from_db()
+        self.assertEqual(item.quantity, 4)
+        self.assertEqual(ledger.reconcile(), [])
+
+    def test_sheet_matches_stock_moved_during_merge(self):
+        item = Item.objects.create(name="Diode", category="Passive", quantity=10, reorder_level=2, unit_price=1)
+        index = merge.NaturalKeyIndex('serial_no')
+        Item.adjust_stock(item.pk, -6)
+
+        frame = pd.DataFrame({'sn': [item.serial_no], 'qty': [4]})
+        created, updated, unchanged, errors = merge.merge_frame(frame, {'sn': 'serial_no', 'qty': 'quantity'}, index)
+
+        self.assertEqual((created, updated, unchanged), (0, 0, 1))
+        self.assertEqual(ledger.reconcile(), [])
+
+    def test_status_counters_follow_stock_moved_during_merge(self):
+        item = Item.objects.create(name="Relay", category="Switch", quantity=10, reorder_level=2, unit_price=1)
+        index = merge.NaturalKeyIndex('serial_no')
+        # In stock when indexed, low stock by the time the chunk is applied
+        Item.adjust_stock(item.pk, -9)
+
+        frame = pd.DataFrame({'sn': [item.serial_no], 'qty': [4]})
+        merge.merge_frame(frame, {'sn': 'serial_no', 'qty': 'quantity'}, index)
+
+        self.assertEqual(stored_counters(), actual_counters())
+
+
+class SearchTests(TestCase):
+    def make(self, name, category="Passive"):
+        return Item.objects.create(name=name, category=category, quantity=1, reorder_level=0, unit_price=1)
+
+    def found(self, query):
+        return [item.name for item in search.search_items(Item.objects.all(), query)]
+
+    def test_prefix_match_ranked(self):
+        self.make("Carbon Film Resistor Assortment Kit")
+        self.make("Resistor", category="Resistors")
+        self.make("Diode")
+
+        self.assertTrue(search.fts_ready())
+        self.assertEqual(self.found("resis"), ["Resistor", "Carbon Film Resistor Assortment Kit"])
+        self.assertEqual(self.found("carb resis"), ["Carbon Film Resistor Assortment Kit"])
+
+    def test_index_follows_update_and_delete(self):
+        diode = self.make("Diode")
+        Item.objects.bulk_create([
+            Item(name="Zener", category="Passive", serial_no=900, quantity=1, reorder_level=0, unit_price=1),
+        ])
+        self.assertEqual(self.found("zen"), ["Zener"])
+
+        Item.objects.filter(pk=diode.pk).update(name="Rectifier")
+        self.assertEqual(self.found("diod"), [])
+        self.assertEqual(self.found("rect"), ["Rectifier"])
+
+        Item.objects.filter(name="Zener").delete()
+        self.assertEqual(self.found("zen"), [])
+        # Stock movements leave the index alone
+        Item.objects.filter(pk=diode.pk).update(quantity=5)
+        self.assertEqual(self.found("rect"), ["Rectifier"])
+
+
+class CategoryCacheTests(InventoryTestCase):
+    def test_other_process_bump_reloads(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Item.objects.create(name="Resistor", category="Passive", quantity=1, reorder_level=0, unit_price=1)
+        self.assertIn("Passive", categories.names())
+
+        # Another process adds a category and bumps the shared version row
+        sensor = Category.objects.create(name="Sensor")
+        Item.objects.bulk_create([
+            Item(name="LDR", category="Sensor", category_ref=sensor, serial_no=99, quantity=1, reorder_level=0, unit_price=1),
+        ])
+        SerialCounter.allocate(name=categories.VERSION_COUNTER)
+
+        self.assertIn("Sensor", categories.names())
+        self.assertEqual(categories.matching("sensor"), [sensor.pk])
+
+    def test_new_category_bumps_version_on_commit(self):
+        before = categories.current_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Item.objects.create(name="Relay", category="Switch", quantity=1, reorder_level=0, unit_price=1)
+        self.assertGreater(categories.current_version(), before)
+        self.assertIn("Switch", categories.names())
+
+    def test_unlinked_items_filtered_on_text(self):
+        linked = Item.objects.create(name="Resistor", category="Passive", quantity=1, reorder_level=0, unit_price=1)
+        # Written around Item.save: category text but no category_ref
+        unlinked, = Item.objects.bulk_create([
+            Item(name="Capacitor", category="passive", serial_no=99, quantity=1, reorder_level=0, unit_price=1),
+        ])
+        Transaction.objects.create(item=unlinked, transaction_type="IN", quantity=1)
+        SerialCounter.allocate(name=categories.VERSION_COUNTER)
+
+        found = Item.objects.filter(categories.condition("Passive")).order_by('serial_no')
+        self.assertEqual(list(found), [linked, unlinked])
+        exact = Transaction.objects.filter(categories.condition("passive", exact=True, prefix='item__'))
+        self.assertEqual([t.item for t in exact], [unlinked])
+        self.assertEqual(categories.names(), ["Passive", "passive"])
+
+        response = self.client.get(reverse('inventory_list'), {'category': "passive"})
+        self.assertEqual(list(response.context['page_obj']), [linked, unlinked])
+
+
+class ValuationCacheTests(InventoryTestCase):
+    def test_other_process_price_edit_recomputes(self):
+        item = Item.objects.create(name="Arduino", category="Board", quantity=2, reorder_level=0, unit_price=10)
+        self.assertEqual(valuation.report()['total_value'], 20.0)
+
+        # Another process reprices the item and bumps the shared version row
+        Item.objects.filter(pk=item.pk).update(unit_price=15)
+        SerialCounter.allocate(name=valuation.VERSION_COUNTER)
+
+        self.assertEqual(valuation.report()['total_value'], 30.0)
+
+    def test_cached_report_until_data_changes(self):
+        Item.objects.create(name="Arduino", category="Board", quantity=2, reorder_level=0, unit_price=10)
+        first = valuation.report()
+        self.assertEqual(valuation.report()['computed_at'], first['computed_at'])
+
+
+class SerialCounterTests(TransactionTestCase):
+    def test_seeded_after_existing_serials(self):
+        Item.objects.bulk_create([
+            Item(name="Legacy", category="Bench", serial_no=41, quantity=1, reorder_level=0, unit_price=1),
+        ])
+        self.assertEqual(SerialCounter.allocate(3), 42)
+        self.assertEqual(SerialCounter.allocate(), 45)
+
+    def test_concurrent_ranges_never_overlap(self):
+        def allocate(size):
+            try:
+                first = SerialCounter.allocate(size)
+                return list(range(first, first + size))
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(8) as pool:
+            ranges = list(pool.map(allocate, [1, 5, 50, 2] * 10))
+
+        numbers = [n for numbers in ranges for n in numbers]
+        self.assertEqual(sorted(numbers), list(range(1, len(numbers) + 1)))
+
+
+class ConcurrentReservationTests(TransactionTestCase):
+    """
+    Clerks racing for the same item on separate connections.
+    """
+
+    STOCK = 20
+    CLERKS = 8
+    ATTEMPTS = 10
+
+    def setUp(self):
+        self.item = Item.objects.create(
+            name="Hot part", category="Bench", quantity=self.STOCK, reorder_level=0, unit_price=1
+        )
+
+    def race(self, attempt):
+        def clerk(n):
+            try:
+                return [attempt(n, i) for i in range(self.ATTEMPTS)]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(self.CLERKS) as pool:
+            return [ok for results in pool.map(clerk, range(self.CLERKS)) for ok in results]
+
+    def assert_sold_out_exactly(self, taken):
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 0)
+        self.assertEqual(taken, self.STOCK)
+        self.assertEqual(ledger.reconcile(), [])
+
+    def test_take_never_oversells(self):
+        results = self.race(lambda n, i: reservations.take(self.item.pk, 1) is not None)
+        self.assert_sold_out_exactly(sum(results))
+
+    def test_hold_and_confirm_never_oversell(self):
+        def attempt(n, i):
+            held = reservations.hold(self.item.pk, 1, reference=f"clerk {n}")
+            return held is not None and reservations.confirm(held.pk, item_id=self.item.pk, quantity=1) is not None
+
+        results = self.race(attempt)
+        self.assert_sold_out_exactly(sum(results))
+        self.assertFalse(StockHold.objects.exists())
+
+
+class StockBatchTests(TestCase):
+    def setUp(self):
+        self.a = Item.objects.create(name="Resistor", category="Passive", quantity=5, reorder_level=0, unit_price=1)
+        self.b = Item.objects.create(name="Diode", category="Passive", quantity=5, reorder_level=0, unit_price=1)
+
+    def line(self, number, item, direction, quantity):
+        return Line(number, ('pk', item.pk), direction, quantity, '')
+
+    def concurrently(self, pk, delta):
+        """
+        Patch adjust_stock_many so another clerk moves ``pk``'s stock
+        after the batch has read its snapshot.
+        """
+        original = Item.adjust_stock_many
+
+        def adjust_stock_many(deltas, reason):
+            Item.adjust_stock(pk, delta)
+            return original(deltas, reason)
+
+        return mock.patch.object(Item, 'adjust_stock_many', side_effect=adjust_stock_many)
+
+    def assert_unchanged(self):
+        self.assertEqual(list(Item.objects.order_by('pk').values_list('quantity', flat=True)), [5, 5])
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(ledger.reconcile(), [])
+
+    def test_applies_net_change(self):
+        result = apply_batch([
+            self.line(1, self.a, 'OUT', 5), self.line(2, self.a, 'IN', 2), self.line(3, self.b, 'IN', 1),
+        ])
+        self.assertEqual(result, {'transactions': 3, 'items': {self.a.pk: 2, self.b.pk: 6}})
+
+    def test_failing_line_rejects_whole_batch(self):
+        with self.assertRaises(StockBatchError) as raised:
+            apply_batch([self.line(1, self.a, 'OUT', 2), self.line(2, self.b, 'OUT', 9)])
+
+        self.assertEqual([number for number, _ in raised.exception.errors], [2])
+        self.assert_unchanged()
+
+    def test_concurrent_sell_out_rejects_whole_batch(self):
+        with self.concurrently(self.b.pk, -4), self.assertRaises(StockBatchError):
+            apply_batch([self.line(1, self.a, 'OUT', 2), self.line(2, self.b, 'OUT', 3)])
+
+        self.assert_unchanged()
+
+    def test_reports_quantities_after_concurrent_movement(self):
+        with self.concurrently(self.a.pk, 10):
+            result = apply_batch([self.line(1, self.a, 'OUT', 2), self.line(2, self.a, 'IN', 2)])
+
+        self.assertEqual(result['items'], {self.a.pk: 15})
+
+
+class StagedFileTestCase(TestCase):
+    """
+    Stages uploads in a scratch directory.
+    """
+
+    def setUp(self):
+        scratch = tempfile.TemporaryDirectory()
+        self.addCleanup(scratch.cleanup)
+        settings = override_settings(IMPORT_STAGING_DIR=scratch.name)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def stage(self, content=b"name,quantity\nResistor,5\n", filename="items.csv"):
+        return staging.stage_upload(SimpleUploadedFile(filename, content), filename)[0]
+
+
+class StagingTests(StagedFileTestCase):
+    def test_same_file_twice_gets_separate_entries(self):
+        first, second = self.stage(), self.stage()
+        self.assertNotEqual(first, second)
+
+        staging.discard(first)
+        self.assertIsNone(staging.load_meta(first))
+        self.assertEqual(staging.load_meta(second)['filename'], "items.csv")
+
+    @override_settings(IMPORT_STAGING_MAX_BYTES=10)
+    def test_size_cap(self):
+        with self.assertRaises(staging.StagingError):
+            self.stage()
+        self.assertEqual(list(staging.staging_dir().iterdir()), [])
+
+    def test_expired_upload(self):
+        token = self.stage()
+        with override_settings(IMPORT_STAGING_TTL=-1):
+            self.assertIsNone(staging.load_meta(token))
+        self.assertFalse(staging.raw_path(token).exists())
+
+    def test_cleanup_keeps_files_of_active_jobs(self):
+        pending, running, finished = self.stage(), self.stage(), self.stage()
+        for token, status in [(pending, ImportJob.PENDING), (running, ImportJob.RUNNING), (finished, ImportJob.DONE)]:
+            ImportJob.objects.create(filename="items.csv", token=token, status=status)
+
+        staging.cleanup(ttl=-1)
+        self.assertTrue(staging.raw_path(pending).exists())
+        self.assertTrue(staging.raw_path(running).exists())
+        self.assertFalse(staging.raw_path(finished).exists())
+
+
+class ImportJobTests(StagedFileTestCase):
+    def make_job(self, **fields):
+        rows = "".join(f"Part {n},{n}\n" for n in range(1, 6))
+        token = self.stage(f"name,quantity\n{rows}".encode())
+        return ImportJob.objects.create(
+            filename="items.csv", token=token, mapping={'name': 'name', 'quantity': 'quantity'}, **fields
+        )
+
+    def go_quiet(self, job):
+        ImportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - jobs.stale_after() - timedelta(seconds=1))
+
+    def test_only_one_worker_claims(self):
+        job = self.make_job()
+        self.assertIsNotNone(jobs.claim(job.pk, "a" * 32))
+        self.assertIsNone(jobs.claim(job.pk, "b" * 32))
+        # A second run, e.g. queued by a poll in another process, does nothing
+        self.assertIsNone(jobs.run_job(job.pk))
+        self.assertFalse(Item.objects.exists())
+
+    def test_quiet_worker_is_taken_over_and_stops(self):
+        job = self.make_job()
+        first = jobs.claim(job.pk, "a" * 32)
+        self.go_quiet(job)
+
+        self.assertIsNotNone(jobs.claim(job.pk, "b" * 32))
+        self.assertFalse(jobs._still_owned(first))
+
+    @override_settings(IMPORT_JOB_CHUNK_SIZE=2)
+    def test_resume_after_rows_done(self):
+        # A worker died after committing the first two rows
+        job = self.make_job(status=ImportJob.RUNNING, rows_done=2, rows_created=2, owner="a" * 32)
+        self.go_quiet(job)
+
+        job = jobs.run_job(job.pk)
+
+        self.assertEqual((job.status, job.rows_done, job.rows_created), (ImportJob.DONE, 5, 5))
+        self.assertEqual(sorted(Item.objects.values_list('name', flat=True)), ["Part 3", "Part 4", "Part 5"])
+
+    def test_dry_run_applied_once(self):
+        job = self.make_job(mode=ImportJob.MERGE, match_key='name', dry_run=True, status=ImportJob.DONE)
+
+        applied = jobs.apply_dry_run(job)
+        self.assertIsNotNone(applied)
+        self.assertIsNone(jobs.apply_dry_run(job))
+        self.assertEqual(ImportJob.objects.filter(dry_run=False).count(), 1)
+
+
+class IssuanceFilterTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        # New categories reach the cache once the write commits
+        with self.captureOnCommitCallbacks(execute=True):
+            scope = Item.objects.create(
+                name="Oscilloscope", category="Instrument", quantity=5, reorder_level=0, unit_price=1,
+            )
+            relay = Item.objects.create(name="Relay", category="Switch", quantity=5, reorder_level=0, unit_price=1)
+
+        def issue(item, issuer, **fields):
+            return Issuance.objects.create(item=item, quantity=1, user="Lab", receiver="Bench", issuer=issuer, **fields)
+
+        self.out = issue(scope, "Harsh")
+        self.back = issue(scope, "Gaurav", received=True, component_status="faulty")
+        self.kept = issue(relay, "Harsh", issue_condition="non_returnable")
+        Issuance.objects.filter(pk=self.back.pk).update(issue_date=timezone.now() - timedelta(days=10))
+
+    def found(self, **params):
+        issuances, _ = views.filter_issuances(params)
+        return {issuance.pk for issuance in issuances}
+
+    def test_filters(self):
+        self.assertEqual(self.found(state="outstanding"), {self.out.pk})
+        self.assertEqual(self.found(state="received"), {self.back.pk})
+        self.assertEqual(self.found(issuer="harsh"), {self.out.pk, self.kept.pk})
+        self.assertEqual(self.found(status="faulty"), {self.back.pk})
+        self.assertEqual(self.found(category="Instrument"), {self.out.pk, self.back.pk})
+        self.assertEqual(self.found(q="rel"), {self.kept.pk})
+
+        today = timezone.localdate().isoformat()
+        self.assertEqual(self.found(**{'from': today, 'to': today}), {self.out.pk, self.kept.pk})
+
+    def test_category_includes_unlinked_items(self):
+        Item.objects.filter(category="Switch").update(category_ref=None)
+        self.assertEqual(self.found(category="Switch"), {self.kept.pk})
+
+    def test_live_search_applies_filters(self):
+        response = self.client.get(reverse('issuance_live_search'), {'category': "Switch"})
+
+        html = response.json()['html']
+        self.assertIn("Relay", html)
+        self.assertNotIn("Oscilloscope", html)
+
+        page = self.client.get(reverse('issuance_list'), {'category': "Switch"})
+        self.assertContains(page, '<option value="Switch" selected>')
+
+
+class ReceivingTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.item = Item.objects.create(name="Multimeter", category="Tool", quantity=5, reorder_level=0, unit_price=1)
+
+    def issue(self, quantity=1, **fields):
+        return Issuance.objects.create(
+            item=self.item, quantity=quantity, user="Lab", receiver="Bench", issuer="Harsh", **fields,
+        )
+
+    def test_bulk_receive_skips_and_restocks(self):
+        ok, faulty, lost = self.issue(2), self.issue(3), self.issue(4)
+        back = self.issue(received=True)
+        kept = self.issue(issue_condition="non_returnable")
+
+        with self.captureOnCommitCallbacks():
+            result = receiving.receive_many([
+                (ok.pk, "ok", ""), (faulty.pk, "faulty", " cracked "), (lost.pk, "lost", ""),
+                (back.pk, "ok", ""), (kept.pk, "ok", ""),
+            ])
+
+        self.assertEqual(result['received'], [ok.pk, faulty.pk, lost.pk])
+        self.assertEqual(result['skipped'], {back.pk: "already received", kept.pk: "non-returnable"})
+        # Lost components don't come back into stock
+        self.assertEqual(result['restocked'], {self.item.pk: 5})
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 10)
+        self.assertEqual(Issuance.objects.get(pk=faulty.pk).remark, "cracked")
+        self.assertFalse(Issuance.objects.get(pk=kept.pk).received)
+        self.assertEqual(ledger.reconcile(), [])
+
+    def test_bad_entry_rejects_whole_batch(self):
+        ok = self.issue()
+        for entries in ([(ok.pk, "ok", ""), (999, "ok", "")], [(ok.pk, "broken", "")], [(ok.pk, "ok", "")] * 2):
+            with self.assertRaises(receiving.ReceiveError):
+                receiving.receive_many(entries)
+        self.assertFalse(Issuance.objects.get(pk=ok.pk).received)
+
+    def test_single_receive_refuses_non_returnable(self):
+        kept = self.issue(2, issue_condition="non_returnable")
+
+        response = self.client.post(reverse('receive_item'), {'issuance_id': kept.pk, 'component_status': "ok"})
+
+        self.assertRedirects(response, reverse('issuance_list'), fetch_redirect_response=False)
+        self.assertFalse(Issuance.objects.get(pk=kept.pk).received)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.quantity, 5)
+
+
+class RollupTests(InventoryTestCase):
+    def setUp(self):
+        super().setUp()
+        self.item = Item.objects.create(name="Multimeter", category="Tool", quantity=5, reorder_level=0, unit_price=1)
+        for kind, quantity in (("IN", 4), ("OUT", 1), ("IN", 2)):
+            txn = Transaction.objects.create(item=self.item, transaction_type=kind, quantity=quantity)
+            rollups.record_transactions([txn])
+
+        issuances = [
+            Issuance.objects.create(item=self.item, quantity=q, user="Lab", receiver="Bench", issuer="Harsh")
+            for q in (3, 2)
+        ]
+        rollups.record_issued(issuances)
+        with self.captureOnCommitCallbacks():
+            receiving.receive_many([(issuances[0].pk, "ok", ""), (issuances[1].pk, "lost", "")])
+        self.today = timezone.localdate()
+
+    def rows(self):
+        return (
+            list(ItemDailyMovement.objects.values_list('day', 'item', *rollups.FIELDS)),
+            list(CategoryDailyMovement.objects.values_list('day', 'category', *rollups.FIELDS)),
+        )
+
+    def test_upserts_add_to_one_row_per_day(self):
+        expected = {'units_in': 6, 'units_out': 1, 'issued': 5, 'returned': 3, 'lost': 2}
+        self.assertEqual(rollups.stored(self.today, self.today), {(self.today, self.item.pk): expected})
+        self.assertEqual(rollups.compute(self.today, self.today), rollups.stored(self.today, self.today))
+        self.assertEqual(rollups.series(30, category="Tool")['totals'], expected)
+
+    def test_backfill_twice_is_idempotent(self):
+        live = self.rows()
+
+        out = StringIO()
+        call_command('backfill_movements', stdout=out)
+        call_command('backfill_movements', stdout=out)
+        call_command('backfill_movements', '--check', stdout=out)
+
+        self.assertEqual(self.rows(), live)
+        self.assertIn("Rebuilt", out.getvalue())
+        self.assertIn("Rollups match", out.getvalue())
+
+    def test_check_reports_drift(self):
+        ItemDailyMovement.objects.update(units_in=0)
+
+        with self.assertRaises(CommandError):
+            call_command('backfill_movements', '--check', stdout=StringIO())
+        call_command('backfill_movements', stdout=StringIO())
+        self.assertEqual(rollups.stored(self.today, self.today)[(self.today, self.item.pk)]['units_in'], 6)
+
+
+class ForecastTests(TestCase):
+    def test_known_demand_matrix(self):
+        demand = np.array([
+            [2.0] * 28,                 # steady
+            [9.0] * 18 + [4.0] * 10,    # created on day 18: earlier columns don't count
+            [0.0, 4.0] * 14,            # alternating around 2, ending on 4
+        ])
+        start = np.array([0, 18, 0])
+
+        result = forecasting.forecast(demand, start, lead_time=4, cover_days=30, z=1.0)
+
+        self.assertEqual(result['days_observed'].tolist(), [28, 10, 28])
+        np.testing.assert_allclose(result['daily_demand'][:2], [2, 4])
+        np.testing.assert_allclose(result['average_7_days'], [2, 4, 16 / 7])
+        np.testing.assert_allclose(result['average_28_days'], [2, 4, 2])
+        np.testing.assert_allclose(result['demand_std'], [0, 0, 2])
+        self.assertEqual(result['reorder_level'][:2].tolist(), [8, 16])
+        self.assertEqual(result['reorder_quantity'][:2].tolist(), [60, 120])
+
+        # The newest day (4) weighs most; safety stock = z x std x sqrt(lead time) = 4
+        rate = result['daily_demand'][2]
+        self.assertGreater(rate, 2)
+        self.assertEqual(result['reorder_level'][2], math.ceil(rate * 4 + 4))
+
+    def test_run_writes_items_with_enough_history(self):
+        today = timezone.localdate()
+        old, new = (
+            Item.objects.create(name=name, category="Tool", quantity=5, reorder_level=0, unit_price=1)
+            for name in ("Old", "New")
+        )
+        Item.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=60))
+        ItemDailyMovement.objects.bulk_create([
+            ItemDailyMovement(item=item, day=today - timedelta(days=n), units_out=3)
+            for item in (old, new) for n in range(1, 31)
+        ])
+
+        with override_settings(FORECAST_HISTORY_DAYS=30, FORECAST_LEAD_TIME_DAYS=7):
+            self.assertEqual(forecasting.run(today, workers=1), (2, 1))
+
+        recommendation = ReorderRecommendation.objects.get()
+        self.assertEqual(recommendation.item_id, old.pk)
+        self.assertEqual((recommendation.days_observed, recommendation.reorder_level), (30, 21))
+
+
+class DigestTests(TestCase):
+    def test_items_sharing_a_name_stay_apart(self):
+        for quantity in (1, 2):
+            item = Item.objects.create(name="Probe", category="Tool", quantity=10, reorder_level=0, unit_price=1)
+            issuance = Issuance.objects.create(
+                item=item, quantity=quantity, user="Lab", receiver="Bench", issuer="Harsh", issue_condition="returnable",
+            )
+            NotificationEvent.objects.create(kind=NotificationEvent.ISSUED, issuance=issuance)
+
+        rows = digest.summarize(NotificationEvent.objects.all())
+        self.assertEqual(sorted(row['issued_qty'] for row in rows), [1, 2])
+
+
+class NotificationRenderTests(TestCase):
+    def issuance(self, name, receiver):
+        item = Item.objects.create(name=name, category="Tool", quantity=10, reorder_level=0, unit_price=1)
+        return Issuance.objects.create(
+            item=item, quantity=1, user="Lab", receiver=receiver, issuer="Harsh", issue_condition="returnable",
+        )
+
+    def test_user_input_escaped_in_html_only(self):
+        issuance = self.issuance("<script>alert(1)</script>", "Tom & Jerry")
+
+        message = notifications.render_issuance(NotificationEvent.ISSUED, issuance)
+
+        self.assertNotIn("<script>", message.html)
+        self.assertIn("&lt;script&gt;alert(1)&lt;/script&gt;", message.html)
+        self.assertIn("Tom &amp; Jerry", message.html)
+        self.assertIn("Item:      <script>alert(1)</script>", message.text)
+        self.assertIn("Receiver:  Tom & Jerry", message.text)
+
+    def test_batch_renders_each_issuance(self):
+        events = [
+            (NotificationEvent.ISSUED, self.issuance("Oscilloscope", "Bench 1")),
+            (NotificationEvent.RECEIVED, self.issuance("Soldering Iron", "Bench 2")),
+        ]
+
+        first, second = notifications.render_issuances(events)
+
+        self.assertEqual((first.subject, second.subject), (
+            notifications.SUBJECTS[NotificationEvent.ISSUED], notifications.SUBJECTS[NotificationEvent.RECEIVED],
+        ))
+        self.assertIn("Oscilloscope", first.text)
+        self.assertNotIn("Oscilloscope", second.text)
+        self.assertIn("Soldering Iron", second.html)
+
+
+@mock.patch('inventory.email.HEAD_EMAIL', 'head@example.com')
+class NotificationEmailTests(TestCase):
+    """
+    The outbox sending over SMTP to the local mail sink.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.sink = MailSink(port=0).start()
+        cls.addClassCleanup(cls.sink.stop)
+
+    def setUp(self):
+        self.sink.messages.clear()
+        self.sink.connections = self.sink.fail_next = 0
+        smtp = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='localhost',
+            EMAIL_PORT=self.sink.port,
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='',
+        )
+        smtp.enable()
+        self.addCleanup(smtp.disable)
+
+    def issue(self, count):
+        item = Item.objects.create(name="Multimeter", category="Tool", quantity=10, reorder_level=0, unit_price=1)
+        # The background sender only starts on commit; drain() stands in for it
+        with self.captureOnCommitCallbacks():
+            for _ in range(count):
+                issuance = Issuance.objects.create(
+                    item=item, quantity=1, user="Lab", receiver="Bench", issuer="Harsh", issue_condition="returnable",
+                )
+                email.notify_issuance(NotificationEvent.ISSUED, issuance)
+
+    def enqueue(self, count):
+        with self.captureOnCommitCallbacks():
+            for n in range(count):
+                outbox.enqueue(f"Message {n}", "Body", ['head@example.com'])
+
+    @override_settings(NOTIFICATION_DIGEST=False)
+    def test_immediate_email_per_issuance(self):
+        self.issue(2)
+
+        self.assertEqual(outbox.drain(), (2, 0))
+        self.assertEqual(len(self.sink.messages), 2)
+        self.assertEqual(self.sink.messages[0]['To'], 'head@example.com')
+        self.assertIn("Multimeter", self.sink.messages[0].get_body(('plain',)).get_content())
+        self.assertFalse(OutboundEmail.objects.exclude(status=OutboundEmail.SENT).exists())
+
+    @override_settings(NOTIFICATION_DIGEST=True, NOTIFICATION_DIGEST_MAX_EVENTS=3)
+    def test_digest_one_email_when_full(self):
+        self.issue(3)
+        self.assertEqual(outbox.drain(), (0, 0))
+
+        digest.check()
+        self.assertEqual(outbox.drain(), (1, 0))
+        self.assertEqual(len(self.sink.messages), 1)
+        self.assertIn("3 issue/receive event(s)", self.sink.messages[0]['Subject'])
+        self.assertFalse(NotificationEvent.objects.filter(flushed_at__isnull=True).exists())
+
+    @override_settings(EMAIL_OUTBOX_BATCH_SIZE=3)
+    def test_one_connection_per_batch(self):
+        self.enqueue(5)
+
+        self.assertEqual(outbox.drain(), (5, 0))
+        self.assertEqual(len(self.sink.messages), 5)
+        self.assertEqual(self.sink.connections, 2)
+
+    @override_settings(EMAIL_OUTBOX_RETRY_SECONDS=30)
+    def test_failed_send_retried_with_backoff(self):
+        self.enqueue(2)
+        self.sink.fail_next = 1
+
+        before = timezone.now()
+        self.assertEqual(outbox.drain(), (1, 1))
+        failed = OutboundEmail.objects.get(status=OutboundEmail.PENDING)
+        self.assertEqual(failed.attempts, 1)
+        self.assertIn("451", failed.last_error)
+        self.assertGreaterEqual(failed.next_attempt_at, before + timedelta(seconds=30))
+
+        # Not due yet; then due again
+        self.assertEqual(outbox.drain(), (0, 0))
+        OutboundEmail.objects.filter(pk=failed.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(outbox.drain(), (1, 0))
+        self.assertEqual(len(self.sink.messages), 2)
+
+    @override_settings(EMAIL_OUTBOX_MAX_ATTEMPTS=1)
+    def test_gives_up_after_max_attempts(self):
+        self.enqueue(1)
+        self.sink.fail_next = 1
+
+        self.assertEqual(outbox.drain(), (0, 1))
+        self.assertEqual(OutboundEmail.objects.get().status, OutboundEmail.FAILED)
+
+
+class SqlitePragmaTests(TestCase):
+    def pragmas(self, *names):
+        # A fresh connection, so connection_created fires for it
+        conn = connections.create_connection('default')
+        self.addCleanup(conn.close)
+        with conn.cursor() as cursor:
+            values = []
+            for name in names:
+                cursor.execute(f"PRAGMA {name}")
+                values.append(cursor.fetchone()[0])
+        return values
+
+    @override_settings(SQLITE_PRAGMAS={'busy_timeout': 1234, 'cache_size': -2000, 'temp_store': 'MEMORY'})
+    def test_applied_to_new_connections(self):
+        # temp_store: 2 is MEMORY
+        self.assertEqual(self.pragmas('busy_timeout', 'cache_size', 'temp_store'), [1234, -2000, 2])
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_plain_profile_leaves_defaults(self):
+        self.assertEqual(self.pragmas('cache_size', 'temp_store'), [-2000, 0])
+
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command('check_query_plans', stdout=out)
+        self.assertNotIn("FAIL", out.getvalue())
+
+    def test_dropped_index_fails(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP INDEX {connection.ops.quote_name('inventory_hold_expiry_idx')}")
+
+        out = StringIO()
+        with self.assertRaises(CommandError):
+            call_command('check_query_plans', stdout=out)
+        self.assertIn("FAIL  stock holds, expired", out.getvalue())
+
+
+class KeysetPaginatorTests(TestCase):
+    def test_pages_walk_serial_order_both_ways(self):
+        Item.objects.bulk_create([
+            Item(name=f"Part {n}", category="Bench", serial_no=n, quantity=1, reorder_level=0, unit_price=1)
+            for n in range(1, 8)
+        ])
+        paginator = KeysetPaginator(Item.objects.order_by('serial_no'), per_page=3)
+
+        pages = [paginator.page()]
+        while pages[-1].has_next:
+            pages.append(paginator.page(pages[-1].next_token))
+        self.assertEqual([[i.serial_no for i in page] for page in pages], [[1, 2, 3], [4, 5, 6], [7]])
+
+        back = paginator.page(pages[1].previous_token)
+        self.assertEqual([i.serial_no for i in back], [1, 2, 3])
+
+
+class AutocompleteTests(TestCase):
+    def make_index(self):
+        index = autocomplete.AutocompleteIndex()
+        # Enough items for "relay" and "module" to keep bitmaps
+        for pk in range(1, 1001):
+            name = ["Relay Module", "Relay Board", "Sensor Module", "Relay"][pk % 4]
+            index.add(pk, f"{name} {pk}", 'Other', 1)
+        return index
+
+    def test_frequent_words_intersect(self):
+        index = self.make_index()
+        self.assertIn("relay", index.bitmaps)
+        self.assertIn("module", index.bitmaps)
+
+        matches = index.suggest("relay mod", limit=1000)
+        self.assertEqual(len(matches), autocomplete.CANDIDATE_LIMIT)
+        self.assertTrue(all(name.startswith("Relay Module") for _, name, *_ in matches))
+
+    def test_removed_items_leave_bitmaps(self):
+        index = self.make_index()
+        for pk in range(4, 1001, 4):
+            index.remove(pk)
+
+        self.assertEqual(index.suggest("relay mod"), [])
+        # "module" is still frequent (Sensor Module) and its bitmap agrees
+        self.assertEqual(
+            int.from_bytes(index.bitmaps["module"], 'little'),
+            int.from_bytes(autocomplete._bitmap(index.words["module"]), 'little'),
+        )
@@ -4,6 +4,9 @@ from . import views
 urlpatterns = [
     # Dashboard (Home page)
     path('', views.dashboard, name='dashboard'),
+    path('dashboard/movements/', views.dashboard_movements, name='dashboard_movements'),
+    path('valuation/', views.valuation_report, name='valuation_report'),
+    path('valuation/api/', views.valuation_report_api, name='valuation_report_api'),
 
     # Inventory
     path('inventory/', views.inventory_list, name='inventory_list'),
@@ -16,6 +19,11 @@ urlpatterns = [
     # Stock management
     path('add_stock/<int:item_id>/', views.add_stock, name='add_stock'),
     path('remove_stock/<int:item_id>/', views.remove_stock, name='remove_stock'),
+    path('stock/batch/', views.stock_batch, name='stock_batch'),
+    path('stock/batch/api/', views.stock_batch_api, name='stock_batch_api'),
+    path('stock/holds/', views.stock_hold_create, name='stock_hold_create'),
+    path('stock/holds/<int:hold_id>/release/', views.stock_hold_release, name='stock_hold_release'),
+    path('stock/history/<int:item_id>/', views.item_stock_history, name='item_stock_history'),
 
     # Transactions
     path('transactions/', views.transaction_history, name='transaction_history'),
@@ -31,8 +39,10 @@ urlpatterns = [
     # path("autocomplete/items/", views.item_autocomplete, name="item_autocomplete"),
 
     path("issuances/", views.issuance_list, name="issuance_list"),
+    path("issuances/live-search/", views.issuance_live_search, name="issuance_live_search"),
     path("issuances/issue/", views.issue_item, name="issue_item"),
     path("issuances/receive/", views.receive_item, name="receive_item"),
+    path("issuances/receive/bulk/", views.receive_items_bulk, name="receive_items_bulk"),
     path("items/autocomplete/", views.item_autocomplete, name="item_autocomplete"),
 
 
@@ -42,6 +52,9 @@ urlpatterns = [
      # ... your existing urls ...
     path('import-items/', views.import_items_upload, name='import_items_upload'),
     path('import-items/mapping/', views.import_items_map, name='import_items_map'),
+    path('import-items/jobs/<int:job_id>/', views.import_job_detail, name='import_job_detail'),
+    path('import-items/jobs/<int:job_id>/progress/', views.import_job_progress, name='import_job_progress'),
+    path('import-items/jobs/<int:job_id>/apply/', views.import_job_apply, name='import_job_apply'),
 ]
 
 
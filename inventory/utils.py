@@ -1,11 +1,8 @@
-from .models import Item
+from . import categories
 
 def get_all_categories():
-    return (
-        Item.objects
-        .exclude(category__isnull=True)
-        .exclude(category__exact='')
-        .values_list('category', flat=True)
-        .distinct()
-        .order_by('category')
-    )
+    """
+    Sorted names of the categories in use, from the per-process
+    category cache (see ``inventory.categories``).
+    """
+    return categories.names()
@@ -0,0 +1,262 @@
+"""
+Stock valuation analytics over a columnar snapshot of the items table.
+
+``load_columns()`` reads the valued columns of every item with one
+``values_list`` query into NumPy arrays; ``summarize()`` computes value
+by category and location, ABC classes, percentiles and low-stock
+exposure with array operations instead of a Python loop per item.
+Money is handled in integer cents.
+
+``report()`` caches the summary in Django's cache under a data version
+stamp. The stamp combines the newest stock ledger entry (every quantity
+change writes one) with a ``SerialCounter`` row. Item writes that don't
+touch the quantity (price, category, location, reorder level) bump that
+row when they commit (``invalidate()``). Both parts live in the
+database, so every process sees a change. A changed stamp is a cache
+miss, so a report is never served for data it wasn't computed from.
+"""
+from collections import namedtuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import FloatField, Value
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+import numpy as np
+
+
+# SerialCounter row bumped by item writes
+VERSION_COUNTER = 'valuation_version'
+REPORT_KEY = 'inventory:valuation:report:{}'
+
+# Cumulative share of total value that closes classes A and B
+ABC_SHARES = (0.80, 0.95)
+ABC_CLASSES = ('A', 'B', 'C')
+
+PERCENTILES = (50, 90, 99)
+
+# Most valuable items listed in the report
+TOP_ITEMS = 20
+
+NO_CATEGORY = '(no category)'
+NO_LOCATION = '(no location)'
+
+# Item columns as arrays; ``category`` / ``location`` are codes into the name lists
+Columns = namedtuple(
+    'Columns',
+    'pk category category_names location location_names quantity reorder_level price_cents',
+)
+
+
+def current_version():
+    from .models import SerialCounter
+
+    return SerialCounter.current(VERSION_COUNTER)
+
+
+def _bump():
+    from .models import SerialCounter
+
+    SerialCounter.allocate(name=VERSION_COUNTER)
+
+
+def invalidate():
+    """
+    Drop cached reports once the current transaction commits.
+    """
+    transaction.on_commit(_bump)
+
+
+def data_version():
+    """
+    Stamp that changes whenever a valued item column may have changed.
+    """
+    from .models import StockLedgerEntry
+
+    last_entry = StockLedgerEntry.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+    return f"{last_entry}.{current_version()}"
+
+
+def _factorize(values):
+    """
+    ``(codes array, names)`` for a sequence of hashable values, in order
+    of first appearance (one dict lookup per value, no sort).
+    """
+    index = {}
+    codes = np.fromiter((index.setdefault(v, len(index)) for v in values), dtype=np.int64, count=len(values))
+    return codes, list(index)
+
+
+def load_columns(queryset=None):
+    """
+    One ``values_list`` query over the items into a ``Columns`` of arrays.
+    """
+    from .models import Category, Item
+
+    queryset = Item.objects.all() if queryset is None else queryset
+    rows = list(
+        queryset
+        .order_by()
+        .values_list(
+            'pk',
+            Coalesce('category_ref', 0),
+            Coalesce('location', Value('')),
+            'quantity',
+            'reorder_level',
+            Cast('unit_price', FloatField()),
+        )
+        .iterator(chunk_size=10_000)
+    )
+    count = len(rows)
+    pks, categories, locations, quantities, reorder_levels, prices = zip(*rows) if rows else ((),) * 6
+
+    category_ids, category_codes = np.unique(np.fromiter(categories, dtype=np.int64, count=count), return_inverse=True)
+    names = dict(Category.objects.filter(pk__in=category_ids.tolist()).values_list('pk', 'name'))
+    location_codes, location_names = _factorize(locations)
+
+    return Columns(
+        pk=np.fromiter(pks, dtype=np.int64, count=count),
+        category=category_codes.reshape(-1),
+        category_names=[names.get(pk, NO_CATEGORY) for pk in category_ids.tolist()],
+        location=location_codes,
+        location_names=[name or NO_LOCATION for name in location_names],
+        quantity=np.fromiter(quantities, dtype=np.int64, count=count),
+        reorder_level=np.fromiter(reorder_levels, dtype=np.int64, count=count),
+        price_cents=np.rint(np.fromiter(prices, dtype=np.float64, count=count) * 100).astype(np.int64),
+    )
+
+
+def _money(cents):
+    return round(float(cents) / 100, 2)
+
+
+def _groups(codes, names, quantity, value, total):
+    """
+    Items, units and value per group, most valuable first.
+    """
+    size = len(names)
+    items = np.bincount(codes, minlength=size)
+    units = np.bincount(codes, weights=quantity, minlength=size)
+    values = np.bincount(codes, weights=value, minlength=size)
+
+    return [
+        {
+            'name': names[i],
+            'items': int(items[i]),
+            'units': int(units[i]),
+            'value': _money(values[i]),
+            'share': float(values[i] / total) if total else 0.0,
+        }
+        for i in np.argsort(-values, kind='stable').tolist()
+        if items[i]
+    ]
+
+
+def _percentiles(cents):
+    points = np.percentile(cents, PERCENTILES) if len(cents) else [0] * len(PERCENTILES)
+    return {f"p{p}": _money(v) for p, v in zip(PERCENTILES, points)}
+
+
+def abc_classes(value):
+    """
+    Class index (0 = A, 1 = B, 2 = C) per item: ranked by value, an item
+    is A while the items before it hold less than ``ABC_SHARES[0]`` of
+    the total, B below ``ABC_SHARES[1]``, and C after that (or if it has
+    no value).
+    """
+    total = value.sum()
+    classes = np.full(len(value), 2, dtype=np.int64)
+    if not total:
+        return classes
+
+    order = np.argsort(-value, kind='stable')
+    before = (np.cumsum(value[order]) - value[order]) / total
+    ranked = np.searchsorted(np.asarray(ABC_SHARES), before, side='right')
+    classes[order] = np.where(value[order] > 0, ranked, 2)
+    return classes
+
+
+def summarize(columns):
+    """
+    The valuation report for ``columns`` as a JSON-ready dict.
+    """
+    quantity, reorder_level, price = columns.quantity, columns.reorder_level, columns.price_cents
+    value = quantity * price
+    total = int(value.sum())
+
+    classes = abc_classes(value)
+    class_items = np.bincount(classes, minlength=3)
+    class_values = np.bincount(classes, weights=value, minlength=3)
+
+    low = (quantity > 0) & (quantity <= reorder_level)
+    out = quantity == 0
+    short = low | out
+    # Units (and their cost) needed to bring each short item back to its reorder level
+    shortfall = np.where(short, np.maximum(reorder_level - quantity, 0), 0)
+    restock = shortfall * price
+
+    top = np.argsort(-value, kind='stable')[:TOP_ITEMS]
+    top = top[value[top] > 0]
+
+    return {
+        'items': int(len(quantity)),
+        'units': int(quantity.sum()),
+        'total_value': _money(total),
+        'by_category': _groups(columns.category, columns.category_names, quantity, value, total),
+        'by_location': _groups(columns.location, columns.location_names, quantity, value, total),
+        'abc': [
+            {
+                'class': name,
+                'items': int(class_items[i]),
+                'value': _money(class_values[i]),
+                'share': float(class_values[i] / total) if total else 0.0,
+            }
+            for i, name in enumerate(ABC_CLASSES)
+        ],
+        'percentiles': {
+            'item_value': _percentiles(value),
+            'unit_price': _percentiles(price),
+        },
+        'exposure': {
+            'low_stock_items': int(low.sum()),
+            'out_of_stock_items': int(out.sum()),
+            'value_in_low_stock': _money(value[low].sum()),
+            'shortfall_units': int(shortfall.sum()),
+            'restock_cost': _money(restock.sum()),
+            'by_category': [
+                {'name': group['name'], 'items': group['items'], 'shortfall_units': group['units'],
+                 'restock_cost': group['value']}
+                for group in _groups(
+                    columns.category[short], columns.category_names, shortfall[short], restock[short], restock.sum()
+                )
+            ],
+        },
+        'top_items': [
+            {'item_id': int(columns.pk[i]), 'class': ABC_CLASSES[classes[i]], 'value': _money(value[i])}
+            for i in top.tolist()
+        ],
+    }
+
+
+def report():
+    """
+    The valuation report for the current data, from the cache when the
+    data version hasn't moved since it was computed.
+    """
+    from .models import Item
+
+    version = data_version()
+    key = REPORT_KEY.format(version)
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    result = summarize(load_columns())
+    names = dict(Item.objects.filter(pk__in=[row['item_id'] for row in result['top_items']]).values_list('pk', 'name'))
+    for row in result['top_items']:
+        row['name'] = names.get(row['item_id'], '')
+    result['version'] = version
+    result['computed_at'] = timezone.now().isoformat()
+
+    cache.set(key, result, getattr(settings, 'VALUATION_CACHE_SECONDS', 60 * 60))
+    return result
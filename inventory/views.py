@@ -1,51 +1,39 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from .models import Item, Transaction, Issuance
+from .models import Item, Transaction, Issuance, ImportJob, StockStatusCounter, NotificationEvent, StockLedgerEntry
 from django.db.models import F
-from django.core.paginator import Paginator
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.db import transaction
-from .forms import IssuanceForm, ReceiveForm
-import io
-import pandas as pd
+from datetime import datetime, timedelta
+import json
 from django.urls import reverse
-from .forms import ExcelUploadForm, ColumnMappingForm, IssuanceForm, ReceiveForm
+from urllib.parse import urlencode
+from .forms import ExcelUploadForm, IssuanceForm, ReceiveForm, StockBatchForm
 from .utils import get_all_categories
+from .importer import IMPORTABLE_FIELDS
+from .merge import MATCH_KEYS
+from .staging import stage_upload, load_meta, StagingError
+from .search import search_items, search_issuances, search_transactions
+from .receiving import RESTOCK_STATUSES, receive_many, ReceiveError, skip_reason
+from .stock import apply_batch, clean_line, StockBatchError
+from . import reservations
+from . import ledger
+from . import rollups
+from . import valuation
+from . import autocomplete, categories
+from .pagination import KeysetPaginator, base_query
+from . import jobs
 from django.template.loader import render_to_string
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST, require_GET
-from django.db.models import Q, CharField
-from django.db.models.functions import Cast
-from django.db.models import Q
-from django.core.paginator import Paginator
-from django.http import JsonResponse
-from django.db import transaction
-from django.shortcuts import get_object_or_404, redirect
-from django.utils import timezone
-from django.contrib import messages
-from inventory.email import notify_head
+from inventory.email import notify_issuance
 
 
 # Predefined categories for dropdown
 PREDEFINED_CATEGORIES = ["Sensor", "Connector", "Resistor", "Microcontroller"]
 
-# Fields you allow to import and their friendly labels.
-# Keys are model field names, values are display labels in mapping UI.
-
-IMPORTABLE_FIELDS = {
-    'id': 'Item ID (Auto)',
-    'name': 'Item Name (Required)',
-    'category': 'Item Category',
-    'quantity': 'Initial Stock',
-    'reorder_level': 'Minimum Stock Level',
-    'unit_price': 'Unit Price (₹)',
-    'location': 'Storage Location / Rack',
-}
-
-
 ALLOWED_EXTENSIONS = ('.xlsx', '.xls', '.csv')
-MAX_ROWS_PREVIEW = 5
-MAX_IMPORT_ROWS = 5000  # safety cap; adjust as needed
 
 def import_items_upload(request):
     """
@@ -67,90 +55,70 @@ def import_items_upload(request):
             )
             return redirect('import_items_upload')
 
-        try:
-            # Read file ONCE
-            file_bytes = f.read()
-
-            if filename.endswith(('.xls', '.xlsx')):
-                df = pd.read_excel(
-                    io.BytesIO(file_bytes),
-                    engine='openpyxl' if filename.endswith('.xlsx') else None
-                )
-            else:
-                try:
-                    df = pd.read_csv(io.BytesIO(file_bytes), encoding='utf-8')
-                except Exception:
-                    df = pd.read_csv(io.BytesIO(file_bytes), encoding='latin-1')
-
-            preview = df.head(MAX_ROWS_PREVIEW)
+        has_header = bool(form.cleaned_data.get('has_header', True))
 
+        # Stream the file to the staging store; only the header and the
+        # first rows are parsed here, the session just keeps the token
+        try:
+            token, meta = stage_upload(f, filename, has_header=has_header)
+        except StagingError as e:
+            messages.error(request, str(e))
+            return redirect('import_items_upload')
         except Exception as e:
             messages.error(request, f"Failed to parse file: {e}")
             return redirect('import_items_upload')
 
-        # Store file safely in session (used by mapping step)
-        try:
-            import base64
-            request.session['import_file_name'] = filename
-            request.session['import_file_bytes'] = base64.b64encode(file_bytes).decode('ascii')
-            request.session['import_has_header'] = bool(form.cleaned_data.get('has_header', True))
-        except Exception:
-            messages.warning(
-                request,
-                "Failed to store file in session — you may need to re-upload on mapping step."
-            )
-            request.session.pop('import_file_bytes', None)
+        request.session['import_token'] = token
+        request.session['import_file_name'] = filename
+        request.session['import_has_header'] = has_header
 
-        cols = list(preview.columns.astype(str))
-        preview_rows = preview.fillna('').astype(str).values.tolist()
+        cols = meta['columns']
+        preview_rows = meta['preview_rows']
 
         context = {
             'cols': cols,
             'preview_rows': preview_rows,
             'importable_fields': IMPORTABLE_FIELDS,
+            'match_keys': MATCH_KEYS,
             'filename': filename,
-            'has_header': form.cleaned_data.get('has_header', True),
+            'has_header': has_header,
         }
 
         return render(request, 'inventory/import_mapping.html', context)
 
     # GET request
     form = ExcelUploadForm()
-    return render(request, 'inventory/import_upload.html', {'form': form})
+
+    # Let the user get back to an import that is still running
+    active_job = ImportJob.objects.filter(
+        pk=request.session.get('import_job_id'),
+        status__in=[ImportJob.PENDING, ImportJob.RUNNING],
+    ).first()
+
+    return render(request, 'inventory/import_upload.html', {
+        'form': form,
+        'active_job': active_job,
+    })
 
 
 def import_items_map(request):
     """
     Mapping step: user posted mapping selection -> perform import.
-    Expects the uploaded file in session as 'import_file_bytes'.
+    Expects the staged upload token in session as 'import_token'.
     """
-    import base64
-
-    file_b64 = request.session.get('import_file_bytes')
+    token = request.session.get('import_token')
     filename = request.session.get('import_file_name')
 
-    if not file_b64 or not filename:
+    if not token or not filename:
         messages.error(request, "Upload file first.")
         return redirect('import_items_upload')
 
-    file_bytes = base64.b64decode(file_b64)
-
-    try:
-        if filename.endswith(('.xls', '.xlsx')):
-            df = pd.read_excel(
-                io.BytesIO(file_bytes),
-                engine='openpyxl' if filename.endswith('.xlsx') else None
-            )
-        else:
-            try:
-                df = pd.read_csv(io.BytesIO(file_bytes), encoding='utf-8')
-            except Exception:
-                df = pd.read_csv(io.BytesIO(file_bytes), encoding='latin-1')
-    except Exception as e:
-        messages.error(request, f"Could not read uploaded file: {e}")
+    meta = load_meta(token)
+    if meta is None:
+        messages.error(request, "Uploaded file expired. Please upload it again.")
         return redirect('import_items_upload')
 
-    cols = list(df.columns.astype(str))
+    cols = meta['columns']
 
     if request.method == 'POST':
         mapping = {}
@@ -168,77 +136,88 @@ def import_items_map(request):
             messages.error(request, "Each item field can only be mapped once.")
             return redirect('import_items_upload')
 
-        rows = []
-        for _, row in df.iterrows():
-            item_kwargs = {}
-            for col_name, model_field in mapping.items():
-                raw_value = row.get(col_name)
-                if pd.isna(raw_value):
-                    raw_value = None
-
-                if model_field in ('quantity', 'reorder_level'):
-                    try:
-                        item_kwargs[model_field] = int(raw_value) if raw_value is not None else 0
-                    except Exception:
-                        item_kwargs[model_field] = 0
-                elif model_field == 'unit_price':
-                    try:
-                        item_kwargs[model_field] = float(raw_value) if raw_value is not None else 0.0
-                    except Exception:
-                        item_kwargs[model_field] = 0.0
-                else:
-                    item_kwargs[model_field] = str(raw_value).strip() if raw_value is not None else ''
-
-            rows.append(item_kwargs)
-
-        if len(rows) > MAX_IMPORT_ROWS:
-            messages.error(request, f"File too large. Max {MAX_IMPORT_ROWS} rows allowed.")
-            return redirect('import_items_upload')
-
-        created = 0
-        errors = []
+        mode = request.POST.get('import_mode', ImportJob.CREATE)
+        match_key = request.POST.get('match_key', '')
 
-        with transaction.atomic():
-            for idx, kw in enumerate(rows, start=1):
-                item_data = {k: v for k, v in kw.items() if k in IMPORTABLE_FIELDS}
+        if mode == ImportJob.MERGE:
+            if match_key not in MATCH_KEYS:
+                messages.error(request, "Choose which field to match existing items on.")
+                return redirect('import_items_map')
 
-                if 'category' in item_data and not item_data['category']:
-                    item_data['category'] = 'Other'
-
-                item_data.setdefault('quantity', 0)
-                item_data.setdefault('reorder_level', 0)
-                item_data.setdefault('unit_price', 0.0)
-
-                item_data['is_imported'] = True
-
-                try:
-                    Item.objects.create(**item_data)
-                    created += 1
-                except Exception as e:
-                    errors.append(f"Row {idx}: {e}")
+            key_field = 'serial_no' if match_key == 'serial_no' else 'name'
+            if key_field not in mapping.values():
+                messages.error(request, f"Map a column to {IMPORTABLE_FIELDS[key_field]} to merge on it.")
+                return redirect('import_items_map')
+        else:
+            mode, match_key = ImportJob.CREATE, ''
+
+        # Hand the import to the background worker pool; a merge starts
+        # as a dry run so the diff can be reviewed first
+        job = ImportJob.objects.create(
+            filename=filename,
+            token=token,
+            mapping=mapping,
+            mode=mode,
+            match_key=match_key,
+            dry_run=(mode == ImportJob.MERGE),
+            total_rows=meta['row_estimate'],
+        )
+        jobs.submit(job.pk)
 
-        request.session.pop('import_file_bytes', None)
+        request.session.pop('import_token', None)
         request.session.pop('import_file_name', None)
+        request.session['import_job_id'] = job.pk
 
-        messages.success(request, f"Imported {created} rows.")
-        if errors:
-            messages.warning(
-                request,
-                f"Import completed with errors: {len(errors)}. First error: {errors[0]}"
-            )
-
-        return redirect('inventory_list')
-
-    preview = df.head(MAX_ROWS_PREVIEW).fillna('').astype(str).values.tolist()
+        return redirect('import_job_detail', job_id=job.pk)
 
     return render(request, 'inventory/import_mapping.html', {
         'cols': cols,
-        'preview_rows': preview,
+        'preview_rows': meta['preview_rows'],
         'importable_fields': IMPORTABLE_FIELDS,
+        'match_keys': MATCH_KEYS,
         'filename': filename,
     })
 
 
+def import_job_detail(request, job_id):
+    """
+    Progress page for a background import; polls import_job_progress.
+    """
+    job = get_object_or_404(ImportJob, pk=job_id)
+    jobs.ensure_running(job)
+
+    return render(request, 'inventory/import_progress.html', {
+        'job': job,
+        'progress': jobs.progress(job),
+    })
+
+
+@require_GET
+def import_job_progress(request, job_id):
+    job = get_object_or_404(ImportJob, pk=job_id)
+    jobs.ensure_running(job)
+    return JsonResponse(jobs.progress(job))
+
+
+@require_POST
+def import_job_apply(request, job_id):
+    """
+    Apply a reviewed merge dry run.
+    """
+    job = get_object_or_404(ImportJob, pk=job_id, dry_run=True, status=ImportJob.DONE)
+
+    if load_meta(job.token) is None:
+        messages.error(request, "Uploaded file expired. Please upload it again.")
+        return redirect('import_items_upload')
+
+    applied = jobs.apply_dry_run(job)
+    if applied is None:
+        messages.error(request, "This merge preview has already been applied.")
+        return redirect('import_job_detail', job_id=job.applied_job_id or job.pk)
+    request.session['import_job_id'] = applied.pk
+    return redirect('import_job_detail', job_id=applied.pk)
+
+
 # def dashboard(request):
 #     total_items = Item.objects.count()
 #     low_stock = Item.objects.filter(quantity__gt=0, quantity__lte=F('reorder_level')).count()
@@ -258,35 +237,85 @@ def import_items_map(request):
 #     return render(request, 'inventory/dashboard.html', context)
 
 def dashboard(request):
-    total_items = Item.objects.count()
-    low_stock = Item.objects.filter(
-        quantity__gt=0,
-        quantity__lte=F('reorder_level')
-    ).count()
-    out_stock = Item.objects.filter(quantity=0).count()
+    # O(1): maintained counters instead of three full-table counts
+    counts = StockStatusCounter.snapshot()
+    total_items = counts['total']
+    low_stock = counts[StockStatusCounter.LOW_STOCK]
+    out_stock = counts[StockStatusCounter.OUT_OF_STOCK]
 
     items_qs = Item.objects.order_by('serial_no')
 
-    paginator = Paginator(items_qs, 50)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Seek on serial_no instead of COUNT + OFFSET
+    page_obj = KeysetPaginator(items_qs, 50).page(request.GET.get('cursor'))
 
     context = {
         'total_items': total_items,
         'low_stock': low_stock,
         'out_stock': out_stock,
         'page_obj': page_obj,
+        'pager_url': reverse('dashboard'),
+        'pager_query': base_query(request),
     }
 
     return render(request, 'inventory/dashboard.html', context)
 
+
+@require_GET
+def dashboard_movements(request):
+    """
+    JSON API: daily units in / out / issued / returned / lost over the
+    last ``days`` (30, 90 or 365), for every item, one ``category`` or
+    one ``item``, read from the daily rollups.
+    """
+    try:
+        days = int(request.GET.get("days", rollups.RANGES[0]))
+        item_id = int(request.GET["item"]) if request.GET.get("item") else None
+    except ValueError:
+        days = None
+    if days not in rollups.RANGES:
+        return JsonResponse(
+            {"error": f"days must be one of {', '.join(map(str, rollups.RANGES))}; item must be an id"},
+            status=400,
+        )
+
+    category = request.GET.get("category", "").strip() or None
+    return JsonResponse({
+        "range": days,
+        "category": category,
+        "item": item_id,
+        **rollups.series(days, category=category, item_id=item_id),
+    })
+
+# =====================================================
+# STOCK VALUATION REPORT
+# =====================================================
+def valuation_report(request):
+    return render(request, "inventory/valuation_report.html", {
+        "report": valuation.report(),
+        "abc_shares": [round(share * 100) for share in valuation.ABC_SHARES],
+    })
+
+
+@require_GET
+def valuation_report_api(request):
+    return JsonResponse(valuation.report())
+
+
+def inventory_list_url(request):
+    """
+    Inventory list URL at the page the request came from (``?cursor=``).
+    """
+    cursor = request.GET.get("cursor")
+    url = reverse("inventory_list")
+    return f"{url}?{urlencode({'cursor': cursor})}" if cursor else url
+
+
 def inventory_list(request):
     query = request.GET.get("q", "").strip()
     category = request.GET.get("category", "").strip()
-    page_number = request.GET.get("page")
 
     filter_type = request.GET.get("filter")
-    items = Item.objects.all()
+    items = Item.objects.select_related("reorder_recommendation")
 
     if filter_type == "low":
         items = items.filter(quantity__gt=0, quantity__lte=F("reorder_level"))
@@ -295,26 +324,23 @@ def inventory_list(request):
         items = items.filter(quantity=0)
     # ==============================
 
-    # 🔍 GLOBAL SEARCH (ALL TEXT COLUMNS)
-    if query:
-        items = items.filter(
-            Q(name__icontains=query) |
-            Q(category__icontains=query) |
-            Q(location__icontains=query)
-        )
-
     # 🏷 CATEGORY FILTER (INDEPENDENT)
     if category:
-        items = items.filter(category__iexact=category)
+        items = items.filter(categories.condition(category))
 
-    items = items.order_by("serial_no")
+    # 🔍 GLOBAL SEARCH (full-text index, best matches first)
+    if query:
+        items = search_items(items, query)
+    else:
+        items = items.order_by("serial_no")
 
-    paginator = Paginator(items, 50)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    # Seek on (rank,) serial_no; the total is an estimate past a few pages
+    page_obj = KeysetPaginator(items, 50, estimate=True).page(request.GET.get("cursor"))
 
     context = {
         "page_obj": page_obj,
+        "pager_url": reverse("inventory_list"),
+        "pager_query": base_query(request),
         "CATEGORIES": get_all_categories(),
         "query": query,
         "selected_category": category,
@@ -327,29 +353,37 @@ def inventory_live_search(request):
     query = request.GET.get("q", "").strip()
     category = request.GET.get("category", "").strip()
 
-    items = Item.objects.all()
-
-    # 🔍 GLOBAL WORD SEARCH (across fields)
-    if query:
-        items = items.filter(
-            Q(name__icontains=query) |
-            Q(category__icontains=query) |
-            Q(location__icontains=query)
-        )
+    items = Item.objects.select_related("reorder_recommendation")
 
     # 🏷 CATEGORY FILTER (if selected)
     if category:
-        items = items.filter(category__iexact=category)
+        items = items.filter(categories.condition(category))
 
-    items = items.order_by("serial_no")
+    # 🔍 GLOBAL WORD SEARCH (full-text index, best matches first)
+    if query:
+        items = search_items(items, query)
+    else:
+        items = items.order_by("serial_no")
+
+    page_obj = KeysetPaginator(items, 50, estimate=True).page()
 
     html = render_to_string(
         "inventory/partials/inventory_rows.html",
-        {"page_obj": items[:50]},  # no pagination for live search
+        {"page_obj": page_obj},
+        request=request
+    )
+    # Pager links go to the full list page with the same filters
+    pager = render_to_string(
+        "inventory/partials/pager.html",
+        {
+            "page_obj": page_obj,
+            "pager_url": reverse("inventory_list"),
+            "pager_query": base_query(request),
+        },
         request=request
     )
 
-    return JsonResponse({"html": html})
+    return JsonResponse({"html": html, "pager": pager})
 
 
 
@@ -430,8 +464,7 @@ def edit_item(request, item_id):
         item.save()
         messages.success(request, "Item updated successfully!")
         # ✅ keep user on same page
-        page = request.GET.get("page", 1)
-        return redirect(f"/inventory/?page={page}")
+        return redirect(inventory_list_url(request))
 
     return render(request, 'inventory/edit_item.html', {
         'item': item,
@@ -474,21 +507,20 @@ def add_stock(request, item_id):
             messages.error(request, "Please enter a valid positive quantity.")
             return redirect('add_stock', item_id=item.id)
 
-        # Atomic quantity update
-        Item.objects.filter(id=item.id).update(
-            quantity=F('quantity') + qty
-        )
+        with transaction.atomic():
+            # Atomic quantity update (+ stock-status counters)
+            Item.adjust_stock(item.id, qty, StockLedgerEntry.STOCK_IN)
 
-        Transaction.objects.create(
-            item=item,
-            transaction_type='IN',
-            quantity=qty
-        )
+            txn = Transaction.objects.create(
+                item=item,
+                transaction_type='IN',
+                quantity=qty
+            )
+            rollups.record_transactions([txn])
 
         messages.success(request, f"{qty} units added to {item.name}")
         # ✅ keep user on same page
-        page = request.GET.get("page", 1)
-        return redirect(f"/inventory/?page={page}")
+        return redirect(inventory_list_url(request))
 
     return render(request, 'inventory/add_stock.html', {'item': item})
 
@@ -505,28 +537,22 @@ def remove_stock(request, item_id):
             messages.error(request, "Please enter a valid positive quantity.")
             return redirect('remove_stock', item_id=item.id)
 
-        # Re-fetch current quantity safely
-        item.refresh_from_db()
-
-        if qty > item.quantity:
-            messages.error(request, "Not enough stock available.")
-            return redirect('inventory_list')
-
-        # Atomic quantity update
-        Item.objects.filter(id=item.id).update(
-            quantity=F('quantity') - qty
-        )
-
-        Transaction.objects.create(
-            item=item,
-            transaction_type='OUT',
-            quantity=qty
-        )
+        with transaction.atomic():
+            # Conditional decrement: succeeds only while qty is still in stock
+            if reservations.take(item.id, qty) is None:
+                messages.error(request, "Not enough stock available.")
+                return redirect('inventory_list')
+
+            txn = Transaction.objects.create(
+                item=item,
+                transaction_type='OUT',
+                quantity=qty
+            )
+            rollups.record_transactions([txn])
 
         messages.success(request, f"{qty} units removed from {item.name}")
         # ✅ keep user on same page
-        page = request.GET.get("page", 1)
-        return redirect(f"/inventory/?page={page}")
+        return redirect(inventory_list_url(request))
 
     return render(request, 'inventory/remove_stock.html', {'item': item})
 
@@ -553,26 +579,23 @@ def transaction_history(request):
     search = request.GET.get("search", "").strip()
     category = request.GET.get("category", "").strip()
 
-    transactions = Transaction.objects.select_related("item").order_by("-date")
+    transactions = Transaction.objects.select_related("item").order_by("-date", "-id")
 
     # 🔍 GLOBAL SEARCH (across fields)
     if search:
-        transactions = transactions.filter(
-            Q(item__name__icontains=search) |
-            Q(item__category__icontains=search) |
-            Q(transaction_type__icontains=search)
-        )
+        transactions = search_transactions(transactions, search, Transaction.TRANSACTION_TYPES)
 
     # 🏷 CATEGORY FILTER
     if category:
-        transactions = transactions.filter(item__category=category)
+        transactions = transactions.filter(categories.condition(category, exact=True, prefix="item__"))
 
-    paginator = Paginator(transactions, 10)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    # Seek on (date, id) instead of COUNT + OFFSET
+    page_obj = KeysetPaginator(transactions, 10, estimate=True).page(request.GET.get("cursor"))
 
     context = {
         "page_obj": page_obj,
+        "pager_url": reverse("transaction_history"),
+        "pager_query": base_query(request),
         "search": search,
         "category": category,
         "CATEGORIES": get_all_categories(),
@@ -580,35 +603,95 @@ def transaction_history(request):
 
     return render(request, "inventory/transaction_history.html", context)
 
-from django.db.models import Q
-from django.template.loader import render_to_string
-from django.http import JsonResponse
 
 def transaction_live_search(request):
     query = request.GET.get("q", "").strip()
     category = request.GET.get("category", "").strip()
 
-    transactions = Transaction.objects.select_related("item").order_by("-date")
+    transactions = Transaction.objects.select_related("item").order_by("-date", "-id")
 
     # 🔍 GLOBAL SEARCH
     if query:
-        transactions = transactions.filter(
-            Q(item__name__icontains=query) |
-            Q(item__category__icontains=query) |
-            Q(transaction_type__icontains=query)
-        )
+        transactions = search_transactions(transactions, query, Transaction.TRANSACTION_TYPES)
 
     # 🏷 CATEGORY FILTER
     if category:
-        transactions = transactions.filter(item__category=category)
+        transactions = transactions.filter(categories.condition(category, exact=True, prefix="item__"))
+
+    page_obj = KeysetPaginator(transactions, 10, estimate=True).page()
 
     html = render_to_string(
         "inventory/partials/transaction_rows.html",
-        {"page_obj": transactions[:50]},  # limit for live search
+        {"page_obj": page_obj},
+        request=request
+    )
+    # The history page takes the search text as ?search=
+    pager = render_to_string(
+        "inventory/partials/pager.html",
+        {
+            "page_obj": page_obj,
+            "pager_url": reverse("transaction_history"),
+            "pager_query": urlencode({k: v for k, v in (("search", query), ("category", category)) if v}),
+        },
         request=request
     )
 
-    return JsonResponse({"html": html})
+    return JsonResponse({"html": html, "pager": pager})
+
+
+
+# =====================================================
+# BATCH STOCK ADJUSTMENT (many items, one transaction)
+# =====================================================
+def stock_batch(request):
+    form = StockBatchForm(request.POST or None)
+    result = None
+
+    if request.method == "POST" and form.is_valid():
+        try:
+            result = apply_batch(form.cleaned_data["lines"])
+        except StockBatchError as e:
+            for number, message in e.errors:
+                form.add_error("lines", f"Line {number}: {message}")
+        else:
+            # Start the next batch from an empty form
+            form = StockBatchForm()
+
+    return render(request, "inventory/stock_batch.html", {"form": form, "result": result})
+
+
+@require_POST
+def stock_batch_api(request):
+    """
+    JSON API: ``{"lines": [{"item_id" or "serial_no", "direction", "quantity", "remark"}]}``.
+    """
+    try:
+        payload = json.loads(request.body)
+        raw = list(payload["lines"])
+        lines, errors = [], []
+        for number, entry in enumerate(raw, start=1):
+            item = ("pk", entry["item_id"]) if "item_id" in entry else ("serial_no", entry["serial_no"])
+            try:
+                lines.append(clean_line(number, item, entry.get("direction"), entry.get("quantity"), entry.get("remark")))
+            except StockBatchError as e:
+                errors.extend(e.errors)
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JsonResponse(
+            {"error": 'Expected {"lines": [{"item_id" or "serial_no", "direction", "quantity", "remark"}]}'},
+            status=400,
+        )
+
+    try:
+        if errors:
+            raise StockBatchError(errors)
+        result = apply_batch(lines)
+    except StockBatchError as e:
+        return JsonResponse({"errors": [{"line": number, "error": message} for number, message in e.errors]}, status=400)
+
+    return JsonResponse({
+        "transactions": result["transactions"],
+        "items": [{"item_id": pk, "quantity": quantity} for pk, quantity in result["items"].items()],
+    })
 
 
 
@@ -632,18 +715,110 @@ def transaction_live_search(request):
 # =====================================================
 # ISSUANCE LIST PAGE
 # =====================================================
+ISSUANCE_PAGE_SIZE = 25
+
+
+def _day_start(value, days=0):
+    """
+    Start of the local day ``value`` (``YYYY-MM-DD``) plus ``days``, or
+    None if ``value`` isn't a date.
+    """
+    try:
+        day = parse_date(value)
+    except ValueError:
+        return None
+    if day is None:
+        return None
+    return timezone.make_aware(datetime.combine(day + timedelta(days=days), datetime.min.time()))
+
+
+def filter_issuances(params):
+    """
+    Issuances matching the list filters in ``params`` (``q``, ``state``,
+    ``issuer``, ``status``, ``category``, ``from``, ``to``), newest first,
+    and the filter values that were applied.
+    """
+    names = ("q", "state", "issuer", "status", "category", "from", "to")
+    filters = {name: params.get(name, "").strip() for name in names}
+    issuances = Issuance.objects.select_related("item").order_by("-issue_date", "-id")
+
+    # ⏳ OUTSTANDING = returnable and not back yet
+    if filters["state"] == "outstanding":
+        issuances = issuances.filter(received=False, issue_condition="returnable")
+    elif filters["state"] == "received":
+        issuances = issuances.filter(received=True)
+
+    if filters["issuer"]:
+        issuances = issuances.filter(issuer__iexact=filters["issuer"])
+
+    # Component status is only known once the item is back
+    if filters["status"]:
+        issuances = issuances.filter(received=True, component_status=filters["status"])
+
+    # 🏷 CATEGORY (indexed id, like the transaction history)
+    if filters["category"]:
+        issuances = issuances.filter(categories.condition(filters["category"], exact=True, prefix="item__"))
+
+    # 📅 DATE RANGE (whole local days, index-friendly bounds)
+    start = _day_start(filters["from"])
+    if start:
+        issuances = issuances.filter(issue_date__gte=start)
+    end = _day_start(filters["to"], days=1)
+    if end:
+        issuances = issuances.filter(issue_date__lt=end)
+
+    # 🔍 ITEM TEXT
+    if filters["q"]:
+        issuances = search_issuances(issuances, filters["q"])
+
+    return issuances, filters
+
+
 def issuance_list(request):
-    issuances = Issuance.objects.select_related("item").order_by("-issue_date")
-    items = Item.objects.all().order_by("name")  # for dropdown / autocomplete
+    issuances, filters = filter_issuances(request.GET)
+
+    # Seek on (issue_date, id); items are picked through the autocomplete
+    page_obj = KeysetPaginator(issuances, ISSUANCE_PAGE_SIZE, estimate=True).page(request.GET.get("cursor"))
 
     return render(request, "inventory/issuance_list.html", {
-        "issuances": issuances,
-        "items": items,
+        "page_obj": page_obj,
+        "pager_url": reverse("issuance_list"),
+        "pager_query": base_query(request),
+        "filters": filters,
+        "filtered": any(filters.values()),
+        "ISSUERS": Issuance.ISSUER_CHOICES,
+        "STATUSES": Issuance.COMPONENT_STATUS,
+        "CATEGORIES": get_all_categories(),
         "issuance_form": IssuanceForm(),
         "receive_form": ReceiveForm(),
     })
 
 
+@require_GET
+def issuance_live_search(request):
+    issuances, filters = filter_issuances(request.GET)
+
+    page_obj = KeysetPaginator(issuances, ISSUANCE_PAGE_SIZE, estimate=True).page()
+
+    html = render_to_string(
+        "inventory/partials/issuance_rows.html",
+        {"page_obj": page_obj, "filtered": any(filters.values())},
+        request=request
+    )
+    # Same parameter names as the list page, so pager links keep the filters
+    pager = render_to_string(
+        "inventory/partials/pager.html",
+        {
+            "page_obj": page_obj,
+            "pager_url": reverse("issuance_list"),
+            "pager_query": base_query(request),
+        },
+        request=request
+    )
+
+    return JsonResponse({"html": html, "pager": pager})
+
+
 # =====================================================
 # ITEM AUTOCOMPLETE (330 Ω behaviour)
 # =====================================================
@@ -651,19 +826,17 @@ def issuance_list(request):
 def item_autocomplete(request):
     q = request.GET.get("q", "").strip()
 
-    items = Item.objects.filter(
-        name__icontains=q,
-        quantity__gt=0   # ✅ only available items
-    )[:10]
+    # ✅ in-memory index of available items, best matches first
+    matches = autocomplete.suggest(q, limit=10)
 
     return JsonResponse([
         {
-            "id": item.id,
-            "name": item.name,
-            "category": item.category,
-            "quantity": item.quantity
+            "id": pk,
+            "name": name,
+            "category": category,
+            "quantity": quantity
         }
-        for item in items
+        for pk, name, category, quantity in matches
     ], safe=False)
 
 
@@ -672,110 +845,117 @@ def item_autocomplete(request):
 # =====================================================
 
 
-@transaction.atomic
 def issue_item(request):
     if request.method != 'POST':
         return redirect('issuance_list')
 
     item_id = request.POST.get("item_id")
-    quantity = int(request.POST.get("quantity"))
+    hold_id = request.POST.get("hold_id")
+    try:
+        quantity = int(request.POST.get("quantity"))
+        if quantity <= 0:
+            raise ValueError
+    except (TypeError, ValueError):
+        messages.error(request, "Please enter a valid positive quantity.")
+        return redirect("issuance_list")
 
-    item = Item.objects.select_for_update().get(id=item_id)
+    item = get_object_or_404(Item, id=item_id)
 
-    # ❌ Block issuing if no stock
-    if item.quantity <= 0:
-        messages.error(request, "No available item to issue.")
-        return redirect("issuance_list")
+    # Only the writes run in the transaction; no row lock is held while waiting
+    with transaction.atomic():
+        if hold_id:
+            # Stock set aside while the form was open
+            if not hold_id.isdigit() or reservations.confirm(hold_id, item_id=item.id, quantity=quantity) is None:
+                messages.error(request, "The reservation expired or doesn't match; please try again.")
+                return redirect("issuance_list")
+        elif reservations.take(item.id, quantity, StockLedgerEntry.ISSUED) is None:
+            # ❌ Block if requested quantity exceeds stock (checked by the UPDATE itself)
+            item.refresh_from_db(fields=["quantity"])
+            if item.quantity <= 0:
+                messages.error(request, "No available item to issue.")
+            else:
+                messages.error(request, f"Only {item.quantity} unit(s) available for {item.name}.")
+            return redirect("issuance_list")
 
-    # ❌ Block if requested quantity exceeds stock
-    if quantity > item.quantity:
-        messages.error(
-            request,
-            f"Only {item.quantity} unit(s) available for {item.name}."
+        issuance = Issuance.objects.create(
+            item=item,
+            quantity=quantity,
+            user=request.POST.get("user"),
+            receiver=request.POST.get("receiver"),
+            issuer=request.POST.get("issuer"),
+            issue_condition=request.POST.get("issue_condition"),
+            remark=request.POST.get("remark", "")
         )
-        return redirect("issuance_list")
+        rollups.record_issued([issuance])
 
-    issuance =Issuance.objects.create(
-        item=item,
-        quantity=quantity,
-        user=request.POST.get("user"),
-        receiver=request.POST.get("receiver"),
-        issuer=request.POST.get("issuer"),
-        issue_condition=request.POST.get("issue_condition"),
-        remark=request.POST.get("remark", "")
-    )
+        # 🔔 EMAIL (queued; sent after commit)
+        notify_issuance(NotificationEvent.ISSUED, issuance)
 
-    item.quantity -= quantity
-    item.save()
+    messages.success(request, "Component issued successfully.")
+    return redirect("issuance_list")
 
-     # 🔔 EMAIL (THIS MUST EXECUTE)
-       # 🔔 EMAIL (THIS MUST EXECUTE)
-    notify_head(
-        subject="📤 Component Issued",
-        html_message=f"""
-<!DOCTYPE html>
-<html>
-<body style="font-family: Arial, sans-serif; background-color:#f4f6f8; padding:20px;">
 
-<div style="max-width:600px; background:#ffffff; padding:20px; border:1px solid #ddd;">
+# =====================================================
+# STOCK HOLDS (short-lived reservations)
+# =====================================================
+@require_POST
+def stock_hold_create(request):
+    """
+    JSON API: ``{"item_id", "quantity", "reference"}`` -> the hold, or 409
+    if the stock isn't there.
+    """
+    try:
+        payload = json.loads(request.body)
+        item_id = int(payload["item_id"])
+        quantity = int(payload["quantity"])
+        if quantity <= 0:
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"error": 'Expected {"item_id", "quantity" > 0, "reference"}'}, status=400)
+
+    held = reservations.hold(item_id, quantity, reference=str(payload.get("reference", "")))
+    if held is None:
+        available = Item.objects.filter(pk=item_id).values_list("quantity", flat=True).first()
+        return JsonResponse({"error": "Not enough stock available.", "available": available}, status=409)
+
+    return JsonResponse({
+        "hold_id": held.pk,
+        "item_id": held.item_id,
+        "quantity": held.quantity,
+        "expires_at": held.expires_at.isoformat(),
+    }, status=201)
 
-    <div style="background:#2e7d32; color:white; padding:10px 15px; font-size:16px;">
-    Inventory Notification
-    </div>
 
-    
-    <h2 style="color:#2e7d32; margin-bottom:10px;">
-        📦 Component Issued Successfully
-    </h2>
-
-    <p style="font-size:14px;">
-        The following component has been <strong>successfully issued</strong>.
-    </p>
-
-    <table width="100%" cellpadding="8" cellspacing="0" style="border-collapse:collapse; font-size:14px;">
-        <tr>
-            <td><strong>Item</strong></td>
-            <td>{item.name}</td>
-        </tr>
-        <tr style="background:#f9f9f9;">
-            <td><strong>Quantity</strong></td>
-            <td>{quantity}</td>
-        </tr>
-        <tr>
-            <td><strong>Issued By</strong></td>
-            <td>{issuance.issuer}</td>
-        </tr>
-        <tr style="background:#f9f9f9;">
-            <td><strong>Receiver</strong></td>
-            <td>{issuance.receiver}</td>
-        </tr>
-        <tr>
-            <td><strong>User</strong></td>
-            <td>{issuance.user}</td>
-        </tr>
-        <tr style="background:#f9f9f9;">
-            <td><strong>Condition</strong></td>
-            <td>{issuance.issue_condition.capitalize()}</td>
-        </tr>
-    </table>
-
-    <hr style="margin-top:20px;">
-    <p style="font-size:12px; color:#777;">
-        This is an automated notification from Inventory Management System.
-        <br>
-        Time: {timezone.now().strftime('%d %b %Y, %H:%M')}
-    </p>
-
-
-</div>
-
-</body>
-</html>
-"""
-    )
+@require_POST
+def stock_hold_release(request, hold_id):
+    return JsonResponse({"released": reservations.release(hold_id)})
 
-    messages.success(request, "Component issued successfully.")
-    return redirect("issuance_list")
+
+# =====================================================
+# STOCK LEDGER (point-in-time quantities)
+# =====================================================
+@require_GET
+def item_stock_history(request, item_id):
+    """
+    JSON API: the item's quantity at the start of ``from`` (default 30
+    days ago) and every ledger entry up to the end of ``to`` (default
+    now). Works for deleted items too.
+    """
+    start = _day_start(request.GET.get("from", "")) or timezone.now() - timedelta(days=30)
+    end = _day_start(request.GET.get("to", ""), days=1)
+
+    opening, entries = ledger.history(item_id, start, end)
+    if not entries and not opening and not Item.objects.filter(pk=item_id).exists():
+        return JsonResponse({"error": "No such item."}, status=404)
+
+    return JsonResponse({
+        "item_id": item_id,
+        "from": start.isoformat(),
+        "to": (end or timezone.now()).isoformat(),
+        "opening": opening,
+        "closing": entries[-1]["quantity"] if entries else opening,
+        "entries": [{**entry, "at": entry["at"].isoformat()} for entry in entries],
+    })
 
 
 # =====================================================
@@ -784,13 +964,6 @@ def issue_item(request):
 @transaction.atomic
 def receive_item(request):
 
-    # issuance = get_object_or_404(Issuance, pk=form.cleaned_data['issuance_id'])
-
-    # # 🚫 HARD STOP for non-returnable
-    # if issuance.issue_condition != "returnable":
-    #     messages.error(request, "This item is non-returnable and cannot be received.")
-    #     return redirect("issuance_list")
-
     if request.method != "POST":
         return redirect("issuance_list")
 
@@ -800,8 +973,10 @@ def receive_item(request):
 
     issuance = Issuance.objects.select_for_update().get(id=issuance_id)
 
-    if issuance.received:
-        messages.warning(request, "This item is already received.")
+    # 🚫 Same rules as the bulk receive: already back, or non-returnable
+    reason = skip_reason(issuance)
+    if reason:
+        messages.warning(request, f"This item can't be received: {reason}.")
         return redirect("issuance_list")
 
     issuance.component_status = component_status
@@ -811,76 +986,46 @@ def receive_item(request):
     issuance.save()
 
     # 🔼 add stock back ONLY if OK or FAULTY
-    if component_status in ["ok", "faulty"]:
-        Item.objects.filter(id=issuance.item.id).update(
-            quantity=F("quantity") + issuance.quantity
-        )
+    if component_status in RESTOCK_STATUSES:
+        Item.adjust_stock(issuance.item_id, issuance.quantity, StockLedgerEntry.RECEIVED)
+    rollups.record_received([issuance])
 
-    # 📧 EMAIL TO HEAD
-        # 📧 EMAIL TO HEAD
-    notify_head(
-        subject="📥 Component Received",
-        html_message=f"""
-<!DOCTYPE html>
-<html>
-<body style="font-family: Arial, sans-serif; background-color:#f4f6f8; padding:20px;">
-
-<div style="max-width:600px; background:#ffffff; padding:20px; border:1px solid #ddd;">
-
-    <div style="background:#2e7d32; color:white; padding:10px 15px; font-size:16px;">
-    Inventory Notification
-    </div>
-
-
-    <h2 style="color:#1565c0; margin-bottom:10px;">
-        📥 Component Received
-    </h2>
-
-    <table width="100%" cellpadding="8" cellspacing="0" style="border-collapse:collapse; font-size:14px;">
-        <tr>
-            <td><strong>Item</strong></td>
-            <td>{issuance.item.name}</td>
-        </tr>
-        <tr style="background:#f9f9f9;">
-            <td><strong>Quantity</strong></td>
-            <td>{issuance.quantity}</td>
-        </tr>
-        <tr>
-            <td><strong>Issued By</strong></td>
-            <td>{issuance.issuer}</td>
-        </tr>
-        <tr style="background:#f9f9f9;">
-            <td><strong>Receiver</strong></td>
-            <td>{issuance.receiver}</td>
-        </tr>
-        <tr>
-            <td><strong>Status</strong></td>
-            <td>{component_status.capitalize()}</td>
-        </tr>
-        <tr style="background:#f9f9f9;">
-            <td><strong>Remark</strong></td>
-            <td>{remark or "None"}</td>
-        </tr>
-    </table>
-
-    <hr style="margin-top:20px;">
-    <p style="font-size:12px; color:#777;">
-        This is an automated notification from Inventory Management System.
-        <br>
-        Time: {timezone.now().strftime('%d %b %Y, %H:%M')}
-    </p>
-
-</div>
-
-</body>
-</html>
-"""
-    )
+    # 📧 EMAIL TO HEAD (queued; sent after commit)
+    notify_issuance(NotificationEvent.RECEIVED, issuance)
 
 
     messages.success(request, "Component received successfully.")
     return redirect("issuance_list")
 # =====================================================
+# BULK RECEIVE (return a whole kit in one transaction)
+# =====================================================
+@require_POST
+def receive_items_bulk(request):
+    """
+    JSON API: ``{"items": [{"issuance_id", "component_status", "remark"}]}``.
+    """
+    try:
+        payload = json.loads(request.body)
+        entries = [
+            (entry.get("issuance_id"), entry.get("component_status"), entry.get("remark", ""))
+            for entry in payload["items"]
+        ]
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JsonResponse({"error": 'Expected {"items": [{"issuance_id", "component_status", "remark"}]}'}, status=400)
+
+    try:
+        result = receive_many(entries)
+    except ReceiveError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    return JsonResponse({
+        "received": result["received"],
+        "skipped": [{"issuance_id": pk, "reason": reason} for pk, reason in result["skipped"].items()],
+        "restocked": [{"item_id": pk, "quantity": qty} for pk, qty in result["restocked"].items()],
+    })
+
+
+# =====================================================
 
 # bulk delete imported items
 @require_POST
@@ -888,7 +1033,7 @@ def delete_imported_items(request):
     """
     Delete all items that were imported via Excel.
     """
-    with transaction.atomic():
+    with StockStatusCounter.batched(), StockLedgerEntry.batched():
         imported_items = Item.objects.filter(is_imported=True)
         count = imported_items.count()
         imported_items.delete()